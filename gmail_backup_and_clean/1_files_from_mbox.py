@@ -1,32 +1,46 @@
 import mailbox
 import email
+import base64
 import os
 import re
 import shutil
 import json
 from datetime import datetime
+from email.header import decode_header, make_header
 from email.utils import parsedate_to_datetime
+from functools import lru_cache
 from pathlib import Path
 
 # PDF libraries
 from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Preformatted, Spacer
 from reportlab.lib.styles import ParagraphStyle
 from reportlab.lib.units import inch
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+_IS_WINDOWS = os.name == 'nt'
+_LONG_PATH_PREFIX = '\\\\?\\'
+
+# Invalid Windows filename characters -> '_', control characters dropped (one translate pass)
+_FILENAME_TABLE = str.maketrans({**{c: '_' for c in '<>:"/\\|?*'},
+                                 **{chr(c): None for c in (*range(0x20), 0x7f)}})
+_UNDERSCORES_RE = re.compile(r'_+')
+
+# 8pt Times New Roman, built once for every email
+EMAIL_STYLE = ParagraphStyle('Normal', fontName='Times-Roman', fontSize=8, leading=10)
+_BODY_WIDTH = letter[0] - 2*inch - 12  # 1-inch margins, Frame pads 6pt on each side
 
 def sanitize_filename(filename):
     """Remove invalid characters from filename and ensure it's valid for Windows"""
     if not filename:
         return "unnamed"
     
-    # Remove invalid Windows characters
-    filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
-    
-    # Remove control characters
-    filename = re.sub(r'[\x00-\x1f\x7f]', '', filename)
+    # Replace invalid Windows characters and remove control characters
+    filename = filename.translate(_FILENAME_TABLE)
     
     # Replace multiple underscores with single
-    filename = re.sub(r'_+', '_', filename)
+    filename = _UNDERSCORES_RE.sub('_', filename)
     
     # Remove leading/trailing spaces and dots (Windows issue)
     filename = filename.strip(' .')
@@ -50,14 +64,45 @@ def sanitize_filename(filename):
     
     return filename
 
+def decode_attachment_payload(part):
+    """Return the decoded bytes of an attachment part.
+
+    Base64 is by far the most common transfer encoding for attachments, so
+    decode it directly with the C-implemented base64 module instead of going
+    through the email package's generic decode path (which makes an extra copy).
+    """
+    cte = part.get('Content-Transfer-Encoding', '').strip().lower()
+    if cte == 'base64':
+        payload = part.get_payload()
+        if isinstance(payload, str):
+            try:
+                return base64.b64decode(payload)
+            except (ValueError, TypeError):
+                pass  # Malformed padding etc. - let the email package cope
+    return part.get_payload(decode=True)
+
+@lru_cache(maxsize=4096)
+def decode_header_value(raw):
+    """Decode RFC 2047 encoded-words (=?UTF-8?B?...?=) into plain Unicode.
+
+    Cached because mailing lists and newsletters repeat the same headers constantly.
+    """
+    try:
+        return str(make_header(decode_header(raw)))
+    except Exception:
+        # Unknown charset or malformed encoded-word - keep the raw header
+        return raw
+
+# Gmail system labels that are not user tags
+SYSTEM_LABELS = frozenset({'Inbox', 'Sent', 'Draft', 'Spam', 'Trash', 'Important', 'Starred', 'Chat'})
+
 def extract_tags(message):
     """Extract Gmail tags/labels from email"""
     tags = []
     x_labels = message.get('X-Gmail-Labels', '')
     if x_labels:
         raw_tags = [tag.strip() for tag in x_labels.split(',')]
-        exclude_labels = ['Inbox', 'Sent', 'Draft', 'Spam', 'Trash', 'Important', 'Starred', 'Chat']
-        tags = [tag for tag in raw_tags if tag not in exclude_labels and not tag.startswith('Category_')]
+        tags = [tag for tag in raw_tags if tag not in SYSTEM_LABELS and not tag.startswith('Category_')]
     if not tags:
         tags = ['Unfiled']
     return tags
@@ -86,26 +131,33 @@ def parse_email_date(date_str):
     
     return datetime.now()
 
+def decode_text_part(part):
+    """Decode a text part's payload using its declared charset (UTF-8 if missing or unknown)."""
+    payload = part.get_payload(decode=True)
+    if not payload:
+        return ''
+    charset = part.get_content_charset() or 'utf-8'
+    try:
+        return payload.decode(charset, errors='ignore')
+    except LookupError:
+        return payload.decode('utf-8', errors='ignore')
+
 def extract_email_body(message):
     """Extract plain text body from email"""
-    body = ""
-    if message.is_multipart():
-        for part in message.walk():
-            if part.get_content_type() == "text/plain":
-                try:
-                    payload = part.get_payload(decode=True)
-                    if payload:
-                        body += payload.decode('utf-8', errors='ignore')
-                except:
-                    pass
-    else:
+    if not message.is_multipart():
         try:
-            payload = message.get_payload(decode=True)
-            if payload:
-                body += payload.decode('utf-8', errors='ignore')
+            return decode_text_part(message)
         except:
-            pass
-    return body
+            return ""
+    parts = []
+    for part in message.walk():
+        # A text/plain attachment is not body text - don't decode it just to include it
+        if part.get_content_type() == "text/plain" and part.get_content_disposition() != 'attachment':
+            try:
+                parts.append(decode_text_part(part))
+            except:
+                pass
+    return ''.join(parts)
 
 def create_email_pdf(email_body, metadata, output_path):
     """Convert email body to PDF with 8pt Times New Roman"""
@@ -118,12 +170,7 @@ def create_email_pdf(email_body, metadata, output_path):
         bottomMargin=1*inch
     )
     
-    style = ParagraphStyle(
-        'Normal',
-        fontName='Times-Roman',
-        fontSize=8,
-        leading=10
-    )
+    style = EMAIL_STYLE
     
     story = []
     
@@ -135,42 +182,40 @@ def create_email_pdf(email_body, metadata, output_path):
     story.append(Paragraph(f"Tags: {', '.join(metadata['tags'])}", style))
     story.append(Spacer(1, 0.2*inch))
     
-    # Add email body
+    # Add email body as one Preformatted block (plain text, no markup parse per line).
+    # Preformatted does not wrap, so long lines are word-wrapped to the frame here.
+    body_lines = []
     for line in email_body.split('\n'):
-        if line.strip():
-            line = line.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-            story.append(Paragraph(line, style))
+        line = line.strip().expandtabs(4)
+        if not line:
+            continue
+        if stringWidth(line, style.fontName, style.fontSize) <= _BODY_WIDTH:
+            body_lines.append(line)
+        else:
+            body_lines.extend(simpleSplit(line, style.fontName, style.fontSize, _BODY_WIDTH))
+    if body_lines:
+        story.append(Preformatted('\n'.join(body_lines), style))
     
     doc.build(story)
 
 def create_safe_folder_path(base_dir, year_month, folder_name):
-    """Create a safe folder path, handling long names and invalid chars"""
-    # Sanitize each component
+    """Create a safe folder path, handling invalid chars"""
+    # Sanitize each component. Long Windows paths are handled by the \\?\
+    # prefix applied to base_dir in process_mbox, so no truncation is needed.
     year_month = sanitize_filename(year_month)
     folder_name = sanitize_filename(folder_name)
     
-    # Create full path
-    folder_path = os.path.join(base_dir, year_month, folder_name)
-    
-    # For Windows, ensure path isn't too long
-    if os.name == 'nt':  # Windows
-        # Use short path if needed
-        if len(folder_path) > 240:
-            # Try to use short folder name
-            short_folder = folder_name[:50]
-            folder_path = os.path.join(base_dir, year_month, short_folder)
-            
-            # If still too long, use absolute path with short names
-            if len(folder_path) > 240:
-                # Use drive letter and truncate more
-                drive = os.path.splitdrive(base_dir)[0]
-                rest = base_dir[len(drive):]
-                if len(rest) > 100:
-                    rest = rest[:100]
-                base_short = drive + rest
-                folder_path = os.path.join(base_short, year_month[:20], short_folder[:30])
-    
-    return folder_path
+    return os.path.join(base_dir, year_month, folder_name)
+
+def long_path(path):
+    r"""On Windows, prefix an absolute path with \\?\ to lift the 260-char MAX_PATH limit"""
+    path = os.path.abspath(path)
+    if _IS_WINDOWS and not path.startswith(_LONG_PATH_PREFIX):
+        if path.startswith('\\\\'):
+            # UNC share: \\server\share -> \\?\UNC\server\share
+            return _LONG_PATH_PREFIX + 'UNC\\' + path[2:]
+        return _LONG_PATH_PREFIX + path
+    return path
 
 def process_mbox(mbox_path, output_dir):
     """Process mbox file and organize emails by year/month"""
@@ -184,12 +229,15 @@ def process_mbox(mbox_path, output_dir):
     print(f"📊 Processing {total} messages...")
     print("=" * 60)
     
+    # Extended-length prefix once up front so every path built below can exceed MAX_PATH
+    base_dir = long_path(output_dir)
+    
     for key, message in mbox.items():
         try:
             # Extract metadata
-            from_ = str(message.get('From', 'Unknown'))
-            to_ = str(message.get('To', 'Unknown'))
-            subject = str(message.get('Subject', 'No Subject'))
+            from_ = decode_header_value(str(message.get('From', 'Unknown')))
+            to_ = decode_header_value(str(message.get('To', 'Unknown')))
+            subject = decode_header_value(str(message.get('Subject', 'No Subject')))
             date_str = message.get('Date')
             
             # Parse date safely
@@ -213,7 +261,7 @@ def process_mbox(mbox_path, output_dir):
             folder_name = f"{date_prefix}_{clean_subject}"
             
             # Get safe folder path
-            email_dir = create_safe_folder_path(output_dir, year_month, folder_name)
+            email_dir = create_safe_folder_path(base_dir, year_month, folder_name)
             
             # Create directory (with parents)
             os.makedirs(email_dir, exist_ok=True)
@@ -238,7 +286,7 @@ def process_mbox(mbox_path, output_dir):
                 for part in message.walk():
                     filename = part.get_filename()
                     if filename:
-                        data = part.get_payload(decode=True)
+                        data = decode_attachment_payload(part)
                         if data:
                             safe_name = sanitize_filename(filename)
                             att_path = os.path.join(email_dir, safe_name)
@@ -1,12 +1,31 @@
 import os
+import atexit
 import json
+import logging
+import logging.handlers
 import shutil
+import signal
+import string
 import io
+import functools
+import hashlib
+import html
+import importlib.util
+import contextlib
+import itertools
+import mmap
+import multiprocessing
+import queue
 import tempfile
 import re
 import subprocess
 import sys
+import threading
 import time
+import zipfile
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 from pathlib import Path
 
@@ -15,6 +34,22 @@ class ConversionError(Exception):
     """Raised when attachment conversion fails"""
     pass
 
+# Progress messages go through a queue drained by a background thread, so
+# conversion workers never block on console writes.
+# CONSOLIDATE_LOG_LEVEL=DEBUG also shows commands run and files read.
+LOG_LEVEL = os.environ.get('CONSOLIDATE_LOG_LEVEL', 'INFO').upper()
+LOG_BUFFER_LINES = 500  # per-email progress held back at most this many lines
+log = logging.getLogger('consolidate')
+log.setLevel(LOG_LEVEL)
+log.propagate = False
+_log_queue = queue.SimpleQueue()
+log.addHandler(logging.handlers.QueueHandler(_log_queue))
+_log_console = logging.StreamHandler(sys.stdout)
+_log_console.setFormatter(logging.Formatter('%(message)s'))
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_console)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
 # Optional imports with fallbacks
 try:
     import magic
@@ -24,19 +59,50 @@ except ImportError:
     MAGIC_AVAILABLE = False
 
 try:
-    import PyPDF2
-    from PyPDF2 import PdfReader, PdfWriter
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    xxhash = None
+    XXHASH_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+# pypdf (PyPDF2's maintained successor) when installed - it can deduplicate identical
+# objects across merged files; PyPDF2 otherwise
+try:
+    from pypdf import PdfReader, PdfWriter
     PDF_AVAILABLE = True
+    PDF_LIBRARY = 'pypdf'
+except ImportError:
+    try:
+        from PyPDF2 import PdfReader, PdfWriter
+        PDF_AVAILABLE = True
+        PDF_LIBRARY = 'PyPDF2'
+    except ImportError:
+        PdfReader = PdfWriter = None
+        PDF_AVAILABLE = False
+        PDF_LIBRARY = None
+        print("⚠️ pypdf/PyPDF2 not installed - run: pip install pypdf")
+
+try:
+    import pikepdf
+    PIKEPDF_AVAILABLE = True
 except ImportError:
-    PdfReader = PdfWriter = None
-    PDF_AVAILABLE = False
-    print("⚠️ PyPDF2 not installed - run: pip install PyPDF2")
+    pikepdf = None
+    PIKEPDF_AVAILABLE = False
 
 try:
     from reportlab.lib.pagesizes import letter
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Preformatted, Spacer, PageBreak, Table
     from reportlab.lib.styles import ParagraphStyle
     from reportlab.lib.units import inch
+    from reportlab.lib.utils import simpleSplit
+    from reportlab.pdfbase.pdfmetrics import stringWidth
     REPORTLAB_AVAILABLE = True
 except ImportError:
     REPORTLAB_AVAILABLE = False
@@ -57,13 +123,26 @@ except ImportError:
     img2pdf = None
     IMG2PDF_AVAILABLE = False
 
-# Office document libraries (optional)
-try:
-    import pandas as pd
-    PANDAS_AVAILABLE = True
-except ImportError:
-    pd = None
-    PANDAS_AVAILABLE = False
+# Office document libraries (optional). pandas, openpyxl and textract are slow to import
+# (pandas alone ~0.2 s per process), so they are only located here and imported on first use.
+PANDAS_AVAILABLE = importlib.util.find_spec('pandas') is not None
+OPENPYXL_AVAILABLE = importlib.util.find_spec('openpyxl') is not None
+TEXTRACT_AVAILABLE = importlib.util.find_spec('textract') is not None
+
+@functools.lru_cache(maxsize=None)
+def _pandas():
+    import pandas
+    return pandas
+
+@functools.lru_cache(maxsize=None)
+def _openpyxl():
+    import openpyxl
+    return openpyxl
+
+@functools.lru_cache(maxsize=None)
+def _textract():
+    import textract
+    return textract
 
 try:
     import xlrd
@@ -73,23 +152,101 @@ except ImportError:
     XLRD_AVAILABLE = False
 
 try:
-    import openpyxl
-    OPENPYXL_AVAILABLE = True
+    import vobject
+    VOBJECT_AVAILABLE = True
 except ImportError:
-    openpyxl = None
-    OPENPYXL_AVAILABLE = False
+    vobject = None
+    VOBJECT_AVAILABLE = False
 
+# python-uno ships with LibreOffice's bundled Python (optional)
 try:
-    import textract
-    TEXTRACT_AVAILABLE = True
+    import uno
+    from com.sun.star.beans import PropertyValue
+    UNO_AVAILABLE = True
 except ImportError:
-    textract = None
-    TEXTRACT_AVAILABLE = False
+    uno = None
+    PropertyValue = None
+    UNO_AVAILABLE = False
 
 # ========== CONFIGURATION ==========
 MAX_EMBED_SIZE_MB = 50  # Files larger than this will be embedded only
+EMBED_PDF_ORIGINALS = False  # Also embed PDF attachments whose pages were merged unchanged
 LIBREOFFICE_TIMEOUT = 200  # seconds
+LIBREOFFICE_UNO_PORT = 2202  # socket for the persistent LibreOffice server
+LIBREOFFICE_STARTUP_TIMEOUT = 60  # seconds to wait for the server to accept connections
+LIBREOFFICE_BATCH_SIZE = 32  # documents per soffice invocation (keeps argv length sane)
+LIBREOFFICE_BATCH_TIMEOUT = 600  # seconds for a whole batch; documents it misses are retried one by one
 LARGE_PDF_THRESHOLD = 100  # pages
+PDF_WRITE_BUFFER = 1024 * 1024  # bytes; PyPDF2 serializes the merged PDF in many small writes
+CONVERSION_WORKERS = min(8, os.cpu_count() or 1)  # emails (or one email's attachments) converted in parallel
+ATTACHMENT_THREADS = 4  # attachments of one email converted side by side inside a pool worker
+# Scratch space for intermediates (per-email temp dirs, LibreOffice profiles, conversion cache).
+# Point GMAIL_SCRATCH at a local SSD when the archive lives on an HDD or network share.
+SCRATCH_DIR = os.environ.get('GMAIL_SCRATCH') or tempfile.gettempdir()
+# Conversion cache across runs - off by default; set to e.g. os.path.join(SCRATCH_DIR, 'email_pdf_conversion_cache')
+CONVERSION_CACHE_DIR = None
+CONVERSION_CACHE_MAX_MB = 2048  # least recently used entries are evicted past this
+
+# Formats img2pdf can wrap losslessly without decoding
+IMG2PDF_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png'})
+
+# Image modes Pillow's PDF writer embeds as-is
+_PDF_SAFE_MODES = frozenset({'RGB', 'L', 'CMYK', '1'})
+
+# Above this many pixels, non-JPEG/PNG images go through img2pdf instead of a Pillow copy
+LARGE_IMAGE_PIXELS = 50_000_000
+
+# Binary text extraction works on raw bytes - no full-file decode to str
+BINARY_EXTRACT_LIMIT = 64 * 1024 * 1024  # bytes scanned for text in unparseable PDFs
+_PRINTABLE_BYTES_RE = re.compile(rb'[a-zA-Z0-9\s\.\,\;\:\-\_]+')
+_WS_BYTES_RE = re.compile(rb'\s+')
+_NON_PRINTABLE_BYTES = bytes(b for b in range(256) if chr(b) not in string.printable)
+_WS_COLLAPSE_RE = re.compile(r'\s+')
+
+# Escape text for reportlab Paragraph markup in a single pass
+_XML_ESCAPE = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;'})
+_FILENAME_TABLE = str.maketrans({c: '_' for c in '<>:"/\\|?*'})  # invalid Windows filename chars
+_UNDERSCORES_RE = re.compile(r'_+')
+_MONTH_FOLDER_RE = re.compile(r'\d{4}-[A-Z][a-z]{2}')
+HTML_TEXT_LIMIT = 200_000  # characters of stripped HTML text rendered per attachment
+
+# Markup stripping for HTML/calendar attachments, compiled once
+_BLANK_LINES_RE = re.compile(r'\n\s*\n')
+_HTML_SCRIPT_RE = re.compile(r'<script.*?>.*?</script>', re.DOTALL | re.IGNORECASE)
+_HTML_STYLE_RE = re.compile(r'<style.*?>.*?</style>', re.DOTALL | re.IGNORECASE)
+_HTML_TAG_RE = re.compile(r'<[^>]+>')
+_ICAL_COMPONENT_RE = {name: re.compile(rf'BEGIN:{name}(.*?)END:{name}', re.DOTALL | re.IGNORECASE)
+                      for name in ('VEVENT', 'VTODO', 'VJOURNAL', 'VCARD')}
+# One pass per VEVENT/VTODO/VCARD block: property name, optional ;PARAMS, value
+_ICAL_FIELD_NAMES = ('SUMMARY', 'DTSTART', 'DTEND', 'LOCATION', 'DUE', 'STATUS',
+                     'FN', 'N', 'EMAIL', 'TEL', 'ORG')
+_ICAL_FIELDS_RE = re.compile(
+    rf'^({"|".join(_ICAL_FIELD_NAMES)})(?:;[^:\r\n]*)?[:\s]+([^\r\n]*)',
+    re.IGNORECASE | re.MULTILINE)
+
+# ========== PDF STYLES ==========
+
+# Built once and shared by every generated page instead of per conversion
+if REPORTLAB_AVAILABLE:
+    STYLE_NORMAL = ParagraphStyle('Normal', fontName='Times-Roman', fontSize=8, leading=10)
+    STYLE_BOLD = ParagraphStyle('Bold', fontName='Times-Bold', fontSize=9, leading=12)
+    STYLE_HEADER = ParagraphStyle('Header', fontName='Times-Bold', fontSize=10, leading=12)
+    STYLE_TABLE_NORMAL = ParagraphStyle('Normal', fontName='Times-Roman', fontSize=7, leading=9)
+    STYLE_TABLE_BOLD = ParagraphStyle('Bold', fontName='Times-Bold', fontSize=8, leading=10)
+
+@functools.lru_cache(maxsize=None)
+def text_styles(font_size):
+    """(body, header) styles for plain-text pages at the given font size."""
+    return (ParagraphStyle('Normal', fontName='Times-Roman', fontSize=font_size, leading=font_size + 2),
+            ParagraphStyle('Header', fontName='Times-Bold', fontSize=font_size + 2, leading=font_size + 4))
+
+@functools.lru_cache(maxsize=None)
+def separator_reader():
+    """The one-page "ATTACHMENTS" separator, rendered once per process and reused for every email."""
+    sep = io.BytesIO()
+    SimpleDocTemplate(sep, pagesize=letter).build([Paragraph("ATTACHMENTS", STYLE_HEADER)])
+    sep.seek(0)
+    return PdfReader(sep)
 
 # ========== FILE TYPE DETECTION ==========
 
@@ -136,19 +293,206 @@ OFFICE_TYPES = {
     '.ppsm': 'application/vnd.ms-powerpoint.slideshow.macroEnabled.12',
 }
 
+VISIO_EXTENSIONS = frozenset({'.vsd', '.vsdx', '.vss', '.vst', '.vsw', '.vsdm', '.vssx', '.vssm', '.vstx', '.vstm'})
+
+# Images - comprehensive list of all common image extensions
+IMAGE_EXTENSIONS = frozenset({
+    # JPEG variants
+    '.jpg', '.jpeg', '.jpe', '.jfif', '.jif', '.jfi',
+    # PNG and GIF
+    '.png', '.gif',
+    # BMP variants
+    '.bmp', '.dib', '.rle',
+    # TIFF variants
+    '.tiff', '.tif',
+    # WebP
+    '.webp',
+    # HEIC/HEIF (modern iPhone formats)
+    '.heic', '.heif', '.heics', '.heifs',
+    # Icons
+    '.ico', '.cur',
+    # Vector formats (may be handled as text/images)
+    '.svg', '.svgz', '.eps', '.ai', '.cdr',
+    # Photoshop and GIMP
+    '.psd', '.psb', '.xcf',
+    # Camera RAW formats
+    '.raw', '.cr2', '.cr3', '.nef', '.nrw', '.arw', '.srf', '.sr2',
+    '.dng', '.orf', '.ptx', '.pef', '.rw2', '.raf', '.3fr', '.kdc',
+    '.dcr', '.mrw', '.bay', '.erf', '.mef', '.mos', '.iiq',
+    # Other common image formats
+    '.jp2', '.j2k', '.jpf', '.jpx', '.jpm',  # JPEG 2000
+    '.pgm', '.ppm', '.pbm', '.pnm',  # Netpbm formats
+    '.pcx', '.tga', '.icns', '.hdp', '.jxr', '.wdp',  # Other formats
+    '.dds', '.dcm', '.dicm',  # Medical/texture formats
+    '.exr', '.hdr',  # HDR formats
+})
+
+# Calendar and contact files
+CALENDAR_EXTENSIONS = frozenset({
+    '.ics', '.ical', '.icalendar', '.ifb', '.vcs',  # iCalendar formats
+    '.vcf', '.vcard',  # vCard contact formats
+    '.cal', '.calendar',  # Generic calendar
+    '.event', '.todo', '.task',  # Event formats
+    '.vcalendar',  # vCalendar
+    '.xcal', '.xcs',  # XML calendar formats
+})
+ICALENDAR_EXTENSIONS = frozenset({'.ics', '.ical', '.icalendar', '.ifb', '.vcs', '.vcalendar'})
+VCARD_EXTENSIONS = frozenset({'.vcf', '.vcard'})
+
+# Python/Code files - treat as text
+CODE_EXTENSIONS = frozenset({
+    '.py', '.js', '.java', '.c', '.cpp', '.h', '.cs', '.php', '.rb', '.go',
+    '.rs', '.swift', '.kt', '.scala', '.pl', '.pm', '.tcl', '.lua', '.r',
+    '.m', '.sql', '.sh', '.bash', '.zsh', '.fish', '.ps1', '.bat', '.cmd',
+    '.xml', '.json', '.yaml', '.yml', '.toml', '.ini', '.cfg', '.conf',
+    '.css', '.scss', '.less', '.md', '.markdown', '.rst'
+})
+
+# Media files, signatures, and other unconvertible types - get a skip summary
+UNCONVERTIBLE_EXTENSIONS = frozenset({
+    '.p7s', '.p7m', '.p7c', '.pub', '.sig', '.asc', '.spv', '.sav', '.emz', '.mso',  # Signatures & proprietary
+    '.mp3', '.mp4', '.wav', '.avi', '.mov', '.wmv', '.flv', '.mkv', '.opus', # Audio/Video
+    '.m4a', '.aac', '.ogg', '.flac', '.wma', '.pages', # More audio
+    '.zip', '.zap', '.rar', '.7z', '.tar', '.gz', '.msg', '.rpmsg', # Archives & Installer packages
+    '.exe', '.dll', '.msi',  # Executables
+    '.iso', '.bin', '.dat', '.img',  # Disk images and binary files
+    '.cab', '.dmg', '.vhd', '.vmdk',  # More disk images
+    '.reg', '.ini', '.cfg', '.config',  # Configuration files
+    '.log', '.tmp', '.bak', '.old',  # Temporary/backup files
+    '.m4v', '.webm', '.3gp', '.mpg', '.mpeg', '.aif', '.aiff', '.mid', '.midi', '.amr',  # More media
+    '.bz2', '.xz', '.tgz', '.lz', '.zst', '.jar', '.apk', '.ipa', '.deb', '.rpm',  # More archives & packages
+    '.msp', '.sys', '.drv', '.so', '.dylib', '.o', '.class', '.pyc', '.lnk',  # More binaries
+    '.vhdx', '.qcow2', '.wim', '.pst', '.ost', '.db', '.sqlite', '.mdb', '.accdb',  # Disk images & databases
+    '.ttf', '.otf', '.woff', '.woff2', '.swf', '.torrent',  # Fonts & other binary formats
+})
+
+# One libmagic handle for the whole run instead of re-initializing it per file
+try:
+    _MAGIC = magic.Magic(mime=True) if MAGIC_AVAILABLE else None
+except Exception:
+    _MAGIC = None
+
+@functools.lru_cache(maxsize=4096)
 def get_file_type(file_path):
     """Detect actual file type using magic numbers or extension fallback"""
-    if MAGIC_AVAILABLE and magic:
+    if _MAGIC is not None:
         try:
-            mime = magic.from_file(file_path, mime=True)
-            return mime
-        except:
+            # libmagic only needs the header - don't let it read large attachments
+            with open(file_path, 'rb') as f:
+                head = f.read(2048)
+            return _MAGIC.from_buffer(head)
+        except Exception:
             pass
     ext = os.path.splitext(file_path)[1].lower()
     return OFFICE_TYPES.get(ext, 'application/octet-stream')
 
+# Leading bytes -> extension the router knows how to handle
+_BINARY_SIGNATURES = (
+    (b'%PDF-', '.pdf'),
+    (b'\xff\xd8\xff', '.jpg'),
+    (b'\x89PNG\r\n\x1a\n', '.png'),
+    (b'GIF87a', '.gif'),
+    (b'GIF89a', '.gif'),
+    (b'II*\x00', '.tif'),
+    (b'MM\x00*', '.tif'),
+    (b'{\\rtf', '.rtf'),
+)
+
+_OLE2_MAGIC = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+
+# OLE2 stream names (UTF-16LE in the directory sectors) -> extension. Outlook .msg is
+# checked first: it is also OLE2 and LibreOffice can only fail on it, slowly.
+_OLE2_STREAM_TYPES = tuple((name.encode('utf-16-le'), ext) for name, ext in (
+    ('__substg1.0_', '.msg'),
+    ('WordDocument', '.doc'),
+    ('Workbook', '.xls'),
+    ('PowerPoint Document', '.ppt'),
+))
+
+# Office Open XML top-level part folder / OpenDocument mimetype -> extension
+_ZIP_MEMBER_TYPES = {
+    'word': '.docx',
+    'xl': '.xlsx',
+    'ppt': '.pptx',
+}
+_ODF_MIMETYPES = {
+    'application/vnd.oasis.opendocument.text': '.odt',
+    'application/vnd.oasis.opendocument.spreadsheet': '.ods',
+    'application/vnd.oasis.opendocument.presentation': '.odp',
+}
+
+# Text prefixes (lowercased, leading whitespace stripped) -> extension
+_TEXT_SIGNATURES = (
+    ('begin:vcalendar', '.ics'),
+    ('begin:vcard', '.vcf'),
+    ('<!doctype html', '.html'),
+    ('<html', '.html'),
+    ('<?xml', '.xml'),
+    ('\\documentclass', '.tex'),
+)
+
+def sniff_extension(path):
+    """
+    Guess an extension for an extensionless attachment from its first 4 KB, so it can be
+    routed to one converter. Undecodable binaries map to '.bin' (skip summary), other text to '.txt'.
+    """
+    with open(path, 'rb') as f:
+        head = f.read(4096)
+    
+    for magic_bytes, ext in _BINARY_SIGNATURES:
+        if head.startswith(magic_bytes):
+            return ext
+    if head.startswith(_OLE2_MAGIC):
+        # The directory usually sits near the end - search the mapped file, don't read it
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for name, ext in _OLE2_STREAM_TYPES:
+                if mm.find(name) != -1:
+                    return ext
+        return '.doc'  # unknown OLE2 - let LibreOffice try
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return '.webp'
+    if b'%PDF-' in head[:1024]:
+        return '.pdf'  # Some PDFs carry junk before the header
+    
+    if head.startswith(b'PK\x03\x04'):
+        try:
+            with zipfile.ZipFile(path) as zf:
+                names = zf.namelist()
+                if 'mimetype' in names:
+                    odf = _ODF_MIMETYPES.get(zf.read('mimetype').decode('ascii', 'ignore').strip())
+                    if odf:
+                        return odf
+        except (zipfile.BadZipFile, OSError):
+            return '.zip'
+        for name in names:
+            folder, sep, _ = name.partition('/')
+            if sep and folder in _ZIP_MEMBER_TYPES:
+                return _ZIP_MEMBER_TYPES[folder]
+        return '.zip'
+    
+    if b'\x00' in head:
+        return '.bin'
+    try:
+        text = head.decode('utf-8')
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off by the 4 KB window is fine; anything else is binary
+        if e.start < len(head) - 3:
+            return '.bin'
+        text = head[:e.start].decode('utf-8')
+    start = text.lstrip().lower()
+    for prefix, ext in _TEXT_SIGNATURES:
+        if start.startswith(prefix):
+            return ext
+    return '.txt'
+
 # ========== LIBREOFFICE PATH DETECTION ==========
 
+@functools.lru_cache(maxsize=None)
+def _which(name):
+    """shutil.which, but each helper tool (antiword, catdoc, catppt, pdflatex...) is
+    looked up on PATH once per process - missing tools are skipped without trying to run them."""
+    return shutil.which(name)
+
 def find_libreoffice():
     """Find LibreOffice executable (soffice.exe) in common locations."""
     # Common installation paths
@@ -161,8 +505,9 @@ def find_libreoffice():
         r'C:\Program Files (x86)\LibreOffice\program\swriter.exe',
     ]
     for path in candidates:
-        if shutil.which(path):
-            return shutil.which(path)
+        found = _which(path)
+        if found:
+            return found
         if os.path.exists(path):
             return path
     # Try searching in common directories
@@ -174,8 +519,9 @@ def find_libreoffice():
                     return full
     return None
 
+@functools.lru_cache(maxsize=None)
 def get_soffice_path():
-    """Return path to soffice.exe (required for conversion)."""
+    """Return path to soffice.exe (required for conversion). Looked up once per process."""
     lo = find_libreoffice()
     if not lo:
         return None
@@ -188,6 +534,26 @@ def get_soffice_path():
         return soffice
     return None
 
+
+def extract_text_with_tool(tool, *args, timeout=30):
+    """
+    Run a text-dump helper (antiword, catdoc, catppt) and return its stdout as text,
+    or '' if the tool is missing, fails or times out. stderr goes to DEVNULL, so only the
+    output we use is piped back.
+    """
+    path = _which(tool)
+    if not path:
+        return ''
+    try:
+        result = subprocess.run([path, *args], stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, timeout=timeout)
+    except (subprocess.SubprocessError, OSError):
+        return ''
+    if result.returncode != 0:
+        return ''
+    text = result.stdout.decode('utf-8', errors='ignore')
+    return text if text.strip() else ''
+
 def create_isolated_env():
     """Environment to avoid MS Office conflicts."""
     env = os.environ.copy()
@@ -204,258 +570,696 @@ def create_isolated_env():
     })
     return env
 
+def start_soffice(cmd, **kwargs):
+    """Popen soffice in its own process group so a timeout can kill exactly its process tree."""
+    if os.name == 'nt':
+        kwargs['creationflags'] = kwargs.get('creationflags', 0) | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs['start_new_session'] = True
+    return subprocess.Popen(cmd, **kwargs)
+
+def kill_soffice(proc):
+    """
+    Kill one soffice invocation and its children (soffice.bin) - never other workers'.
+    Replaces the old `taskkill /f /im soffice.exe`, which killed every LibreOffice on the machine.
+    """
+    if proc.poll() is not None:
+        return
+    try:
+        if os.name == 'nt':
+            subprocess.run(['taskkill', '/f', '/t', '/pid', str(proc.pid)],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        else:
+            os.killpg(proc.pid, signal.SIGKILL)
+    except OSError:
+        proc.kill()
+    proc.wait()
+
+# ========== PERSISTENT LIBREOFFICE SERVER ==========
+
+def _uno_props(**kwargs):
+    """Build a UNO PropertyValue tuple from keyword arguments."""
+    props = []
+    for name, value in kwargs.items():
+        prop = PropertyValue()
+        prop.Name = name
+        prop.Value = value
+        props.append(prop)
+    return tuple(props)
+
+class _LOServer:
+    """
+    One headless soffice instance reused for every conversion via the UNO bridge.
+    Pays LibreOffice's startup + profile init once per run instead of once per file.
+    """
+    
+    # Export filter per document service - writer_pdf_Export only handles text documents
+    EXPORT_FILTERS = (
+        ('com.sun.star.sheet.SpreadsheetDocument', 'calc_pdf_Export'),
+        ('com.sun.star.presentation.PresentationDocument', 'impress_pdf_Export'),
+        ('com.sun.star.drawing.DrawingDocument', 'draw_pdf_Export'),
+        ('com.sun.star.text.TextDocument', 'writer_pdf_Export'),
+    )
+    
+    def __init__(self, soffice, port=LIBREOFFICE_UNO_PORT):
+        self.soffice = soffice
+        self.port = port
+        self.proc = None
+        self.desktop = None
+        self.profile_dir = None
+        self.lock = threading.Lock()  # the UNO desktop is not safe for concurrent loads
+        # Forked pool workers inherit this object, but the soffice child (and killing it
+        # from the watchdog) only works from the process that started it
+        self.owner_pid = os.getpid()
+    
+    def __enter__(self):
+        self.start()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+    
+    def start(self):
+        self.profile_dir = tempfile.mkdtemp(prefix=f"lo_profile_{os.getpid()}_", dir=SCRATCH_DIR)
+        connect = f"socket,host=127.0.0.1,port={self.port};urp;StarOffice.ComponentContext"
+        cmd = [
+            self.soffice,
+            '--headless',
+            '--invisible',
+            '--nologo',
+            '--nodefault',
+            '--nofirststartwizard',
+            '--norestore',
+            f'-env:UserInstallation={Path(self.profile_dir).as_uri()}',
+            f'--accept={connect}'
+        ]
+        self.proc = start_soffice(cmd, env=create_isolated_env(),
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        
+        # Poll until soffice accepts connections on the socket
+        local_ctx = uno.getComponentContext()
+        resolver = local_ctx.ServiceManager.createInstanceWithContext(
+            'com.sun.star.bridge.UnoUrlResolver', local_ctx)
+        deadline = time.time() + LIBREOFFICE_STARTUP_TIMEOUT
+        while True:
+            try:
+                ctx = resolver.resolve(f"uno:{connect}")
+                break
+            except Exception:
+                if self.proc.poll() is not None or time.time() > deadline:
+                    self.stop()
+                    raise ConversionError("LibreOffice server did not start")
+                time.sleep(0.25)
+        self.desktop = ctx.ServiceManager.createInstanceWithContext('com.sun.star.frame.Desktop', ctx)
+    
+    def convert(self, abs_input, abs_outdir, timeout=LIBREOFFICE_TIMEOUT):
+        """
+        Convert one document to PDF in abs_outdir, returning the PDF path (or None).
+        A document that hangs LibreOffice for longer than timeout gets the server killed,
+        which makes the pending UNO call raise; the caller then calls restart_if_dead().
+        """
+        base = os.path.splitext(os.path.basename(abs_input))[0]
+        pdf_path = os.path.join(abs_outdir, f"{base}.pdf")
+        with self.lock:
+            watchdog = threading.Timer(timeout, kill_soffice, (self.proc,))
+            watchdog.daemon = True
+            watchdog.start()
+            try:
+                doc = self.desktop.loadComponentFromURL(
+                    Path(abs_input).as_uri(), '_blank', 0, _uno_props(Hidden=True))
+                if doc is None:
+                    return None
+                try:
+                    export_filter = 'writer_pdf_Export'
+                    for service, name in self.EXPORT_FILTERS:
+                        if doc.supportsService(service):
+                            export_filter = name
+                            break
+                    doc.storeToURL(Path(pdf_path).as_uri(), _uno_props(FilterName=export_filter))
+                finally:
+                    doc.close(True)
+            finally:
+                watchdog.cancel()
+        return pdf_path
+    
+    def restart_if_dead(self):
+        """
+        Replace soffice with a fresh one if it has exited (crashed, or killed by the
+        watchdog on a hung document). A document LibreOffice merely rejected leaves it
+        running, and so does a restart another thread already did - then nothing happens.
+        Returns True if soffice was restarted.
+        """
+        with self.lock:
+            if self.proc is not None and self.proc.poll() is None:
+                return False
+            self.stop()
+            self.start()
+            return True
+    
+    def stop(self):
+        if self.desktop is not None:
+            try:
+                self.desktop.terminate()
+            except Exception:
+                pass  # the bridge dies with the process
+            self.desktop = None
+        if self.proc is not None:
+            try:
+                self.proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                kill_soffice(self.proc)
+            self.proc = None
+        if self.profile_dir:
+            shutil.rmtree(self.profile_dir, ignore_errors=True)
+            self.profile_dir = None
+
+_LO_SERVER = None
+_LO_SERVER_FAILED = False
+
+def get_lo_server():
+    """Return the shared LibreOffice server, starting it on first use (None if unavailable)."""
+    global _LO_SERVER, _LO_SERVER_FAILED
+    if _LO_SERVER is not None and _LO_SERVER.owner_pid != os.getpid():
+        # Inherited from the parent through fork - its soffice is not ours to drive
+        _LO_SERVER = None
+        _LO_SERVER_FAILED = True
+    if _LO_SERVER is not None or _LO_SERVER_FAILED or not UNO_AVAILABLE:
+        return _LO_SERVER
+    soffice = get_soffice_path()
+    if not soffice:
+        _LO_SERVER_FAILED = True
+        return None
+    try:
+        server = _LOServer(soffice)
+        server.start()
+    except Exception as e:
+        log.warning(f"          ⚠️ LibreOffice server unavailable, using per-file soffice: {e}")
+        _LO_SERVER_FAILED = True
+        return None
+    atexit.register(shutdown_lo_server)
+    _LO_SERVER = server
+    return server
+
+def restart_lo_server():
+    """
+    After a failed conversion, respawn the shared server if its soffice died;
+    give up on it if that fails too.
+    """
+    global _LO_SERVER, _LO_SERVER_FAILED
+    if _LO_SERVER is None or _LO_SERVER.owner_pid != os.getpid():
+        return
+    try:
+        if _LO_SERVER.restart_if_dead():
+            log.info(f"          🔄 LibreOffice server restarted")
+    except Exception as e:
+        log.warning(f"          ⚠️ LibreOffice server could not be restarted, using per-file soffice: {e}")
+        _LO_SERVER = None
+        _LO_SERVER_FAILED = True
+
+def shutdown_lo_server():
+    """Stop the shared server (safe to call more than once)."""
+    global _LO_SERVER
+    if _LO_SERVER is not None:
+        if _LO_SERVER.owner_pid == os.getpid():
+            _LO_SERVER.stop()
+        _LO_SERVER = None
+
+# ========== CONVERSION CACHE ==========
+
+def _cache_key(path):
+    """Content hash of a file, computed over an mmap so the file is never read into Python bytes."""
+    hasher = xxhash.xxh3_128() if XXHASH_AVAILABLE else hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                hasher.update(mm)
+    return hasher.hexdigest()
+
+def _produced_pdf(result, input_path):
+    """The single PDF a converter wrote, or None (nothing written / several files / passthrough)."""
+    items = result if isinstance(result, list) else [result]
+    paths = {item.path if isinstance(item, PageRef) else item for item in items}
+    if len(paths) != 1:
+        return None
+    path = paths.pop()
+    if path and path != input_path and os.path.isfile(path):
+        return path
+    return None
+
+def _link_or_copy(src, dst):
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+def _cache_lookup(name, input_path, temp_dir):
+    """
+    Return (key, path) for a converter's cached output. path is the cached PDF
+    hard-linked into temp_dir, or None on a miss. key is None if caching is off.
+    """
+    if not CONVERSION_CACHE_DIR:
+        return None, None
+    try:
+        key = f"{name}-{_cache_key(input_path)}"
+    except OSError:
+        return None, None
+    cache_path = os.path.join(CONVERSION_CACHE_DIR, f"{key}.pdf")
+    if not os.path.exists(cache_path):
+        return key, None
+    out = os.path.join(temp_dir, f"cached_{key}.pdf")
+    if not os.path.exists(out):
+        _link_or_copy(cache_path, out)
+    try:
+        os.utime(cache_path)  # mtime doubles as last use for eviction
+    except OSError:
+        pass
+    log.debug(f"          ♻️ Reusing cached conversion")
+    return key, out
+
+def _cache_store(key, produced):
+    """Store a converter's output PDF under key."""
+    if not key or not produced:
+        return
+    cache_path = os.path.join(CONVERSION_CACHE_DIR, f"{key}.pdf")
+    try:
+        os.makedirs(CONVERSION_CACHE_DIR, exist_ok=True)
+        # Copy rather than link: the temp file could be rewritten in place later
+        tmp = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        shutil.copyfile(produced, tmp)
+        os.replace(tmp, cache_path)  # atomic - concurrent workers never see partial files
+    except OSError as e:
+        log.warning(f"          ⚠️ Could not cache conversion: {e}")
+
+def prune_conversion_cache():
+    """Delete the least recently used cache entries until the cache fits CONVERSION_CACHE_MAX_MB."""
+    if not CONVERSION_CACHE_DIR or not os.path.isdir(CONVERSION_CACHE_DIR):
+        return
+    entries = []
+    with os.scandir(CONVERSION_CACHE_DIR) as it:
+        for e in it:
+            if e.is_file() and e.name.endswith('.pdf'):
+                st = e.stat()
+                entries.append((st.st_mtime, st.st_size, e.path))
+    entries.sort(reverse=True)  # newest first - whatever overflows the budget goes
+    budget = CONVERSION_CACHE_MAX_MB * 1024 * 1024
+    removed = 0
+    for _, size, path in entries:
+        budget -= size
+        if budget < 0:
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+    if removed:
+        log.info(f"  ♻️ Evicted {removed} old conversions from the cache")
+
+def cached_conversion(returns_list=True):
+    """
+    Memoize a converter by input content: its PDF is stored as <cache>/<name>-<hash>.pdf,
+    so re-runs and retries hard-link the previous result instead of converting again.
+    Works for converters returning a path (returns_list=False), a list of paths or PageRefs.
+    Only decorate steps whose output is a complete conversion - fallbacks that salvage
+    part of a file must stay outside, or their degraded result would be reused forever.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(input_path, temp_dir, *args, **kwargs):
+            key, hit = _cache_lookup(func.__name__, input_path, temp_dir)
+            if hit:
+                return [hit] if returns_list else hit
+            
+            result = func(input_path, temp_dir, *args, **kwargs)
+            if key and result:
+                _cache_store(key, _produced_pdf(result, input_path))
+            return result
+        return wrapper
+    return decorator
+
 # ========== CONVERSION FUNCTIONS ==========
 
-def convert_pdf_to_pdf_pages(pdf_path, temp_dir):
+# A single page of a source PDF. Converters hand these to the merge stage instead of
+# writing every page out to its own temp file and reading it back again.
+PageRef = namedtuple('PageRef', ['path', 'index', 'strict'])
+
+def output_size_kb(path):
+    """Size of a converter's output in KB, or None if it was not written (one stat, not exists + getsize)."""
+    try:
+        return os.stat(path).st_size / 1024
+    except OSError:
+        return None
+
+@functools.lru_cache(maxsize=16)
+def _cached_pdf_reader(pdf_path, strict):
+    return PdfReader(pdf_path, strict=strict)
+
+def get_pdf_reader(pdf_path, strict=False):
     """
-    Convert a PDF to a list of single-page PDFs.
-    For large PDFs (>100 pages) or PDFs that can't be parsed, return the original path.
+    Open a PdfReader once and share it between the converters and the merge stage.
+    The cache is keyed positionally, so get_pdf_reader(p), get_pdf_reader(p, False) and
+    get_pdf_reader(p, strict=False) all hit the same entry.
     """
-    # First attempt: strict=True (default) - proper PDF parsing
+    return _cached_pdf_reader(pdf_path, bool(strict))
+
+def repair_pdf_with_pikepdf(pdf_path, temp_dir):
+    """
+    Rewrite a damaged PDF with pikepdf (libqpdf), which rebuilds broken xref tables.
+    Returns the path of the repaired copy.
+    """
+    base = os.path.splitext(os.path.basename(pdf_path))[0]
+    out = os.path.join(temp_dir, f"{base}_repaired.pdf")
+    with pikepdf.open(pdf_path, suppress_warnings=True) as src:
+        src.save(out, linearize=False, object_stream_mode=pikepdf.ObjectStreamMode.preserve)
+    return out
+
+@cached_conversion()
+def recover_pdf_pages(pdf_path, temp_dir):
+    """
+    Pages of a PDF that failed strict parsing: pikepdf repair, forgiving parse, then a
+    LibreOffice round trip. Returns None if none of them worked. Only this step is
+    cached - a PDF that parses cleanly is cheaper to re-read than to hash.
+    """
+    name = os.path.basename(pdf_path)
+    base = os.path.splitext(name)[0]
+    
+    # Second attempt: let pikepdf rebuild the file, then reference its pages
+    if PIKEPDF_AVAILABLE:
+        log.info(f"          🔄 Attempting pikepdf repair...")
+        try:
+            repaired = repair_pdf_with_pikepdf(pdf_path, temp_dir)
+            reader = get_pdf_reader(repaired, strict=False)
+            total = len(reader.pages)
+            if total > LARGE_PDF_THRESHOLD:
+                log.info(f"          📚 Large PDF after repair: {total} pages - adding directly")
+                return [repaired]
+            if total:
+                log.info(f"          ✅ pikepdf repaired PDF ({total} pages)")
+                return [PageRef(repaired, i, False) for i in range(total)]
+        except Exception as e0:
+            log.warning(f"          ⚠️ pikepdf repair failed: {e0}")
+    
+    log.info(f"          🔄 Attempting with strict=False...")
+    
+    # Third attempt: strict=False - more forgiving for corrupt PDFs
     try:
-        reader = PdfReader(pdf_path, strict=True)
+        reader = get_pdf_reader(pdf_path, strict=False)
         total = len(reader.pages)
         
         if total > LARGE_PDF_THRESHOLD:
-            print(f"          📚 Large PDF: {total} pages - adding directly")
+            log.info(f"          📚 Large PDF: {total} pages - adding directly")
             return [pdf_path]
         
-        page_paths = []
-        for i, page in enumerate(reader.pages):
-            writer = PdfWriter()
-            writer.add_page(page)
-            out = os.path.join(temp_dir, f"pdf_page_{i+1:04d}.pdf")
-            with open(out, 'wb') as f:
-                writer.write(f)
-            page_paths.append(out)
-            if total > 50 and (i+1) % 20 == 0:
-                print(f"          📄 Processed {i+1}/{total} pages")
-        return page_paths
+        page_refs = []
+        failed_pages = 0
+        progress_every = max(1, total // 20)  # ~20 progress lines per PDF at most
         
-    except Exception as e1:
-        print(f"          ⚠️ Strict parsing failed: {e1}")
-        print(f"          🔄 Attempting with strict=False...")
+        for i, page in enumerate(reader.pages):
+            try:
+                # Resolve the content stream now so broken pages are skipped here,
+                # not discovered halfway through the merge
+                page.get_contents()
+                page_refs.append(PageRef(pdf_path, i, False))
+            except Exception as page_error:
+                log.warning(f"          ⚠️ Could not process page {i+1}: {page_error}")
+                failed_pages += 1
+                
+            if total > 50 and (i+1) % progress_every == 0:
+                log.debug(f"          📄 Processed {i+1}/{total} pages ({failed_pages} failed)")
         
-        # Second attempt: strict=False - more forgiving for corrupt PDFs
-        try:
-            reader = PdfReader(pdf_path, strict=False)
-            total = len(reader.pages)
+        if page_refs:
+            if failed_pages > 0:
+                log.warning(f"          ⚠️ {failed_pages} out of {total} pages failed - using {len(page_refs)} pages")
+            return page_refs
+        else:
+            log.info(f"          📄 No pages could be extracted with strict=False")
             
-            if total > LARGE_PDF_THRESHOLD:
-                print(f"          📚 Large PDF: {total} pages - adding directly")
-                return [pdf_path]
+    except Exception as e2:
+        log.warning(f"          ⚠️ Forgiving parsing also failed: {e2}")
+    
+    # Fourth attempt: Try LibreOffice
+    log.info(f"          🔄 Attempting LibreOffice PDF import...")
+    try:
+        soffice = get_soffice_path()
+        if soffice:
+            # Create a temporary output PDF
+            lo_output = os.path.join(temp_dir, f"{base}_libreoffice.pdf")
+            
+            # Use LibreOffice to import PDF and export as PDF again
+            # This can sometimes fix corrupted PDFs
+            env = create_isolated_env()
+            cmd = [
+                soffice, '--headless', '--safe-mode', '--nologo',
+                '--nodefault', '--nofirststartwizard', '--norestore',
+                '--infilter=writer_pdf_import',  # Import as PDF
+                '--convert-to', 'pdf',
+                '--outdir', temp_dir, pdf_path
+            ]
             
-            page_paths = []
-            failed_pages = 0
+            proc = start_soffice(cmd, env=env, stdout=subprocess.DEVNULL,
+                                 stderr=subprocess.DEVNULL)
+            try:
+                proc.wait(timeout=LIBREOFFICE_TIMEOUT * 2)  # Double timeout for PDFs
+            except subprocess.TimeoutExpired:
+                kill_soffice(proc)
+                raise
             
-            for i, page in enumerate(reader.pages):
-                try:
-                    writer = PdfWriter()
-                    writer.add_page(page)
-                    out = os.path.join(temp_dir, f"pdf_page_{i+1:04d}.pdf")
-                    with open(out, 'wb') as f:
-                        writer.write(f)
-                    page_paths.append(out)
-                except Exception as page_error:
-                    print(f"          ⚠️ Could not process page {i+1}: {page_error}")
-                    failed_pages += 1
-                    
-                if total > 50 and (i+1) % 20 == 0:
-                    print(f"          📄 Processed {i+1}/{total} pages ({failed_pages} failed)")
+            # LibreOffice might output with different name pattern
+            possible_outputs = [
+                os.path.join(temp_dir, f"{base}.pdf"),
+                os.path.join(temp_dir, name)
+            ]
             
-            if page_paths:
-                if failed_pages > 0:
-                    print(f"          ⚠️ {failed_pages} out of {total} pages failed - using {len(page_paths)} pages")
-                return page_paths
-            else:
-                print(f"          📄 No pages could be extracted with strict=False")
-                
-        except Exception as e2:
-            print(f"          ⚠️ Forgiving parsing also failed: {e2}")
+            for possible in possible_outputs:
+                if os.path.exists(possible) and os.path.getsize(possible) > 0:
+                    # Reference the repaired PDF's pages through the shared reader
+                    # instead of writing one file per page
+                    try:
+                        repaired_total = len(get_pdf_reader(possible).pages)
+                        
+                        if repaired_total > LARGE_PDF_THRESHOLD:
+                            log.info(f"          📚 Large PDF after repair: {repaired_total} pages - adding directly")
+                            return [possible]
+                        
+                        if repaired_total:
+                            log.info(f"          ✅ LibreOffice repaired PDF ({repaired_total} pages)")
+                            return [PageRef(possible, j, False) for j in range(repaired_total)]
+                    except:
+                        # If splitting fails, return the repaired PDF as-is
+                        log.info(f"          ✅ LibreOffice repaired PDF (returning as single file)")
+                        return [possible]
+                        
+            log.warning(f"          ⚠️ LibreOffice PDF import produced no output")
+        else:
+            log.warning(f"          ⚠️ LibreOffice not available")
+            
+    except subprocess.TimeoutExpired:
+        log.warning(f"          ⚠️ LibreOffice timed out on PDF import")
+    except Exception as e3:
+        log.warning(f"          ⚠️ LibreOffice PDF import failed: {e3}")
+    
+    return None
+
+def convert_pdf_to_pdf_pages(pdf_path, temp_dir):
+    """
+    Convert a PDF to a list of PageRefs into the source file (nothing is written).
+    PDFs that can't be parsed are repaired or re-rendered into temp_dir first
+    (recover_pdf_pages), and as a last resort replaced by a PDF of their extracted text.
+    """
+    name = os.path.basename(pdf_path)
+    
+    # First attempt: strict=True (default) - proper PDF parsing
+    try:
+        reader = get_pdf_reader(pdf_path, strict=True)
+        total = len(reader.pages)
         
-        # Third attempt: Try LibreOffice
-        print(f"          🔄 Attempting LibreOffice PDF import...")
-        try:
-            soffice = get_soffice_path()
-            if soffice:
-                # Create a temporary output PDF
-                base = os.path.splitext(os.path.basename(pdf_path))[0]
-                lo_output = os.path.join(temp_dir, f"{base}_libreoffice.pdf")
-                
-                # Use LibreOffice to import PDF and export as PDF again
-                # This can sometimes fix corrupted PDFs
-                env = create_isolated_env()
-                cmd = [
-                    soffice, '--headless', '--safe-mode', '--nologo',
-                    '--nodefault', '--nofirststartwizard', '--norestore',
-                    '--infilter=writer_pdf_import',  # Import as PDF
-                    '--convert-to', 'pdf',
-                    '--outdir', temp_dir, pdf_path
-                ]
+        # PageRefs (not the bare path) so the merge reuses this strict reader instead of
+        # parsing the file a second time; its pages go in with one bulk append either way
+        return [PageRef(pdf_path, i, True) for i in range(total)]
+        
+    except Exception as e1:
+        log.warning(f"          ⚠️ Strict parsing failed: {e1}")
+    
+    pages = recover_pdf_pages(pdf_path, temp_dir)
+    if pages:
+        return pages
+    
+    # Last attempt: Try to extract text from binary and create a text PDF
+    log.info(f"          🔄 Attempting binary text extraction as last resort...")
+    try:
+        # Scan the file through mmap with a bytes regex - no decode of the whole PDF.
+        # Only the first BINARY_EXTRACT_LIMIT bytes: text past that would be cut anyway.
+        with open(pdf_path, 'rb') as f, \
+             mmap.mmap(f.fileno(), min(os.fstat(f.fileno()).st_size, BINARY_EXTRACT_LIMIT),
+                       access=mmap.ACCESS_READ) as mm:
+            # Find sequences of printable characters (words) in one pass, stopping
+            # once we have the 200 sentences the PDF will show (or 1 MB of text)
+            pieces = []
+            size = 0
+            sentences = 0
+            for match in _PRINTABLE_BYTES_RE.finditer(mm):
+                # Clean up excessive whitespace per piece; joining with ' ' below
+                # gives the same text as collapsing the whole join afterwards
+                piece = _WS_BYTES_RE.sub(b' ', match.group()).strip()
+                if not piece:
+                    continue
+                pieces.append(piece)
+                size += len(piece) + 1
+                sentences += piece.count(b'. ') + piece.endswith(b'.')
+                if sentences >= 200 or size >= 1024 * 1024:
+                    break
+        
+        # Only the surviving ASCII runs get decoded
+        extracted_text = b' '.join(pieces).decode('ascii', 'ignore')
+        
+        if len(extracted_text.strip()) > 100:  # Only if we got meaningful content
+            out = os.path.join(temp_dir, f"extracted_text_{name}.pdf")
+            
+            # Create a PDF with the extracted text
+            if REPORTLAB_AVAILABLE:
+                doc = SimpleDocTemplate(out, pagesize=letter,
+                                      leftMargin=1*inch, rightMargin=1*inch,
+                                      topMargin=1*inch, bottomMargin=1*inch)
+                style = STYLE_NORMAL
                 
-                result = subprocess.run(cmd, env=env, capture_output=True,
-                                      timeout=LIBREOFFICE_TIMEOUT * 2)  # Double timeout for PDFs
+                story = []
+                story.append(Paragraph(f"Extracted Text from: {name}", STYLE_HEADER))
+                story.append(Spacer(1, 0.2*inch))
+                story.append(Paragraph("(Original PDF could not be parsed - showing extracted text)", style))
+                story.append(Spacer(1, 0.1*inch))
                 
-                # LibreOffice might output with different name pattern
-                possible_outputs = [
-                    os.path.join(temp_dir, f"{base}.pdf"),
-                    os.path.join(temp_dir, os.path.basename(pdf_path))
-                ]
+                # Split into lines and add
+                for line in extracted_text.split('. ')[:200]:  # Limit to 200 sentences
+                    if line.strip():
+                        safe = line.translate(_XML_ESCAPE)
+                        story.append(Paragraph(safe + '.', style))
                 
-                for possible in possible_outputs:
-                    if os.path.exists(possible) and os.path.getsize(possible) > 0:
-                        # Now try to split this repaired PDF
-                        try:
-                            repaired_reader = PdfReader(possible)
-                            repaired_total = len(repaired_reader.pages)
-                            
-                            if repaired_total > LARGE_PDF_THRESHOLD:
-                                print(f"          📚 Large PDF after repair: {repaired_total} pages - adding directly")
-                                return [possible]
-                            
-                            page_paths = []
-                            for j, repaired_page in enumerate(repaired_reader.pages):
-                                writer = PdfWriter()
-                                writer.add_page(repaired_page)
-                                out = os.path.join(temp_dir, f"pdf_page_{j+1:04d}_repaired.pdf")
-                                with open(out, 'wb') as f:
-                                    writer.write(f)
-                                page_paths.append(out)
-                            
-                            if page_paths:
-                                print(f"          ✅ LibreOffice repaired and split PDF into {len(page_paths)} pages")
-                                return page_paths
-                        except:
-                            # If splitting fails, return the repaired PDF as-is
-                            print(f"          ✅ LibreOffice repaired PDF (returning as single file)")
-                            return [possible]
-                            
-                print(f"          ⚠️ LibreOffice PDF import produced no output")
-            else:
-                print(f"          ⚠️ LibreOffice not available")
+                doc.build(story)
                 
-        except subprocess.TimeoutExpired:
-            print(f"          ⚠️ LibreOffice timed out on PDF import")
-        except Exception as e3:
-            print(f"          ⚠️ LibreOffice PDF import failed: {e3}")
-        
-        # Fourth attempt: Try to extract text from binary and create a text PDF
-        print(f"          🔄 Attempting binary text extraction as last resort...")
-        try:
-            # Read the file as binary
-            with open(pdf_path, 'rb') as f:
-                content = f.read()
-            
-            # Try to decode as text (ignoring errors)
-            text = content.decode('utf-8', errors='ignore')
-            
-            # Look for readable text (this is a very basic approach)
-            import re
-            # Find sequences of printable characters (words)
-            words = re.findall(r'[a-zA-Z0-9\s\.\,\;\:\-\_]+', text)
-            extracted_text = ' '.join(words)
-            
-            # Clean up excessive whitespace
-            extracted_text = re.sub(r'\s+', ' ', extracted_text)
+                if os.path.exists(out):
+                    log.info(f"          ✅ Created text-extracted PDF with {len(extracted_text)} characters")
+                    return [out]
+        else:
+            log.warning(f"          ⚠️ Not enough readable text found in binary")
             
-            if len(extracted_text.strip()) > 100:  # Only if we got meaningful content
-                out = os.path.join(temp_dir, f"extracted_text_{os.path.basename(pdf_path)}.pdf")
-                
-                # Create a PDF with the extracted text
-                if REPORTLAB_AVAILABLE:
-                    doc = SimpleDocTemplate(out, pagesize=letter,
-                                          leftMargin=1*inch, rightMargin=1*inch,
-                                          topMargin=1*inch, bottomMargin=1*inch)
-                    style = ParagraphStyle('Normal', fontName='Times-Roman', fontSize=8, leading=10)
-                    
-                    story = []
-                    story.append(Paragraph(f"Extracted Text from: {os.path.basename(pdf_path)}", 
-                                          ParagraphStyle('Header', fontName='Times-Bold', fontSize=10)))
-                    story.append(Spacer(1, 0.2*inch))
-                    story.append(Paragraph("(Original PDF could not be parsed - showing extracted text)", style))
-                    story.append(Spacer(1, 0.1*inch))
-                    
-                    # Split into lines and add
-                    for line in extracted_text.split('. ')[:200]:  # Limit to 200 sentences
-                        if line.strip():
-                            safe = line.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-                            story.append(Paragraph(safe + '.', style))
-                    
-                    doc.build(story)
-                    
-                    if os.path.exists(out):
-                        print(f"          ✅ Created text-extracted PDF with {len(extracted_text)} characters")
-                        return [out]
-            else:
-                print(f"          ⚠️ Not enough readable text found in binary")
-                
-        except Exception as e4:
-            print(f"          ⚠️ Binary extraction failed: {e4}")
-    
+    except Exception as e4:
+        log.warning(f"          ⚠️ Binary extraction failed: {e4}")
+
     # If we get here, all parsing attempts failed
-    error_msg = f"All PDF parsing attempts failed for {os.path.basename(pdf_path)}"
-    print(f"          ❌ {error_msg}")
+    error_msg = f"All PDF parsing attempts failed for {name}"
+    log.error(f"          ❌ {error_msg}")
     raise ConversionError(error_msg)
 
+def pdf_safe_image(img):
+    """Return img in a mode Pillow's PDF writer accepts, converting at most once."""
+    if img.mode in _PDF_SAFE_MODES:
+        return img
+    if img.mode in ('RGBA', 'LA', 'PA') or 'transparency' in img.info:
+        # Flatten transparency onto white instead of letting hidden pixels show through
+        rgba = img.convert('RGBA')
+        return Image.alpha_composite(Image.new('RGBA', rgba.size, 'white'), rgba).convert('RGB')
+    return img.convert('RGB')
+
+@cached_conversion()
 def convert_image_to_pdf_pages(image_path, temp_dir):
-    """Convert image to PDF pages with debug info"""
+    """Convert image to PDF pages"""
+    name = os.path.basename(image_path)
+    ext = os.path.splitext(name)[1].lower()
     try:
-        out = os.path.join(temp_dir, f"img_{os.path.basename(image_path)}.pdf")
-        print(f"          🔍 Opening image: {image_path}")
+        out = os.path.join(temp_dir, f"img_{name}.pdf")
+        
+        # JPEG/PNG: img2pdf embeds the original compressed stream - no decode/re-encode
+        if IMG2PDF_AVAILABLE and ext in IMG2PDF_EXTENSIONS:
+            try:
+                with open(out, 'wb') as f:
+                    img2pdf.convert(image_path, outputstream=f)
+                size = os.path.getsize(out) / 1024
+                log.info(f"          ✅ PDF created with img2pdf: {size:.1f} KB")
+                return [out]
+            except Exception as e:
+                # Unsupported colour space or a damaged header - Pillow is more forgiving
+                log.info(f"          🔍 img2pdf could not embed image ({e}) - using Pillow")
         
         if not PIL_AVAILABLE:
             raise ConversionError("Pillow library not available for image conversion")
             
         img = Image.open(image_path)
-        print(f"          🔍 Image mode: {img.mode}, size: {img.size}")
         
-        # Handle all image types
-        if img.mode in ['P', 'PA']:  # Palette modes
-            print(f"          🔍 Converting palette image to RGB")
-            img = img.convert('RGB')
-        elif img.mode not in ['RGB', 'L', 'CMYK']:
-            print(f"          🔍 Converting {img.mode} to RGB")
-            img = img.convert('RGB')
-        
-        # CMYK to RGB if needed
-        if img.mode == 'CMYK':
-            print(f"          🔍 Converting CMYK to RGB")
-            img = img.convert('RGB')
+        # Huge GIF/TIFF/BMP etc.: let img2pdf stream it rather than allocating a converted copy
+        if (IMG2PDF_AVAILABLE and img.width * img.height > LARGE_IMAGE_PIXELS
+                and ext not in IMG2PDF_EXTENSIONS):
+            try:
+                with open(out, 'wb') as f:
+                    img2pdf.convert(image_path, outputstream=f)
+                size = os.path.getsize(out) / 1024
+                log.info(f"          ✅ PDF created with img2pdf: {size:.1f} KB")
+                return [out]
+            except Exception:
+                pass  # Fall through to Pillow
         
-        print(f"          🔍 Saving to PDF: {out}")
-        img.save(out, format='PDF', quality=85, optimize=True)
+        pdf_safe_image(img).save(out, format='PDF', quality=85)
         
         # Verify file was created
-        if os.path.exists(out):
-            size = os.path.getsize(out) / 1024
-            print(f"          ✅ PDF created: {size:.1f} KB")
+        size = output_size_kb(out)
+        if size is not None:
+            log.info(f"          ✅ PDF created: {size:.1f} KB")
             return [out]
         else:
             error_msg = f"PDF file not created for {image_path}"
-            print(f"          ❌ {error_msg}")
+            log.error(f"          ❌ {error_msg}")
             raise ConversionError(error_msg)
             
     except ConversionError:
         raise
     except Exception as e:
         error_msg = f"Image conversion failed for {image_path}: {e}"
-        print(f"          ❌ {error_msg}")
+        log.error(f"          ❌ {error_msg}")
         import traceback
         traceback.print_exc()
         raise ConversionError(error_msg) from e
 
-def convert_office_with_libreoffice(input_path, temp_dir, file_ext):
-    soffice = get_soffice_path()
-    if not soffice:
-        raise ConversionError("LibreOffice not found")
-    
-    base = os.path.splitext(os.path.basename(input_path))[0]
-    pdf_path = os.path.join(temp_dir, f"{base}.pdf")
-    
-    # Use absolute paths
-    abs_input = os.path.abspath(input_path)
-    abs_outdir = os.path.abspath(temp_dir)
+def convert_images_to_pdf_pages(image_paths, temp_dir):
+    """
+    Convert several JPEG/PNG images into ONE multipage PDF (one page per image),
+    avoiding a separate PDF container per image. Returns a PageRef per input, in order.
+    """
+    out = os.path.join(temp_dir, "images_batch.pdf")
+    try:
+        if IMG2PDF_AVAILABLE:
+            # Streamed straight into the file - the whole PDF is never held in memory
+            with open(out, 'wb') as f:
+                img2pdf.convert(image_paths, outputstream=f)
+        elif PIL_AVAILABLE:
+            frames = []
+            for path in image_paths:
+                with Image.open(path) as img:
+                    frame = pdf_safe_image(img)
+                    frames.append(frame.copy() if frame is img else frame)
+            frames[0].save(out, format='PDF', save_all=True, append_images=frames[1:], quality=85)
+        else:
+            raise ConversionError("No image library available for image conversion")
+        
+        # Page i must be image i, otherwise the refs below would be wrong
+        pages = len(get_pdf_reader(out).pages)
+        if pages != len(image_paths):
+            raise ConversionError(f"Expected {len(image_paths)} pages, got {pages}")
+    except ConversionError:
+        raise
+    except Exception as e:
+        raise ConversionError(f"Batch image conversion failed: {e}") from e
     
+    log.info(f"          ✅ Combined {len(image_paths)} images into one PDF")
+    return [PageRef(out, i, False) for i in range(len(image_paths))]
+
+def _is_pdf(path):
+    """True if path exists and starts with the %PDF magic."""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(4) == b'%PDF'
+    except OSError:
+        return False
+
+def run_soffice_convert(soffice, abs_inputs, abs_outdir, temp_dir, timeout=LIBREOFFICE_TIMEOUT):
+    """Run one `soffice --convert-to pdf` over one or more inputs. Returns the exit code (None on error)."""
     env = os.environ.copy()
     env.update({
         'HOME': temp_dir,
@@ -475,33 +1279,164 @@ def convert_office_with_libreoffice(input_path, temp_dir, file_ext):
         '--norestore',
         '--convert-to', 'pdf',
         '--outdir', abs_outdir,
-        abs_input
+        *abs_inputs
     ]
     
-    print(f"          🔄 Running: {' '.join(cmd)}")
+    # Parallel workers each get their own profile so concurrent soffice runs don't collide
+    profile = getattr(_worker_state, 'profile', None)
+    if profile:
+        profile_url = Path(profile).as_uri()
+        cmd.insert(1, f'-env:UserInstallation={profile_url}')
+        env['UserInstallation'] = profile_url
+    
+    log.debug(f"          🔄 Running: {' '.join(cmd)}")
     try:
-        result = subprocess.run(cmd, env=env, capture_output=True, timeout=200, check=False)
-        print(f"          Return code: {result.returncode}")
-        if result.stdout:
-            print(f"          stdout: {result.stdout.decode('utf-8', errors='ignore')[:200]}")
-        if result.stderr:
-            print(f"          stderr: {result.stderr.decode('utf-8', errors='ignore')[:200]}")
-        
-        if result.returncode == 0 and os.path.exists(pdf_path):
-            with open(pdf_path, 'rb') as f:
-                if f.read(4) == b'%PDF':
-                    return pdf_path
+        # soffice can emit hundreds of KB of VCL warnings: send stderr to a temp file
+        # on disk instead of buffering it in memory, and only read 2KB back on failure
+        with tempfile.TemporaryFile() as errlog:
+            proc = start_soffice(cmd, env=env, stdout=subprocess.DEVNULL, stderr=errlog)
+            try:
+                proc.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                # Kill only this invocation - sibling workers' soffice keep running
+                kill_soffice(proc)
+                log.warning(f"          ⚠️ LibreOffice timed out after {timeout}s")
+            if proc.returncode != 0:
+                errlog.seek(0)
+                stderr = errlog.read(2048)
+                log.info(f"          Return code: {proc.returncode}")
+                if stderr:
+                    log.info(f"          stderr: {stderr.decode('utf-8', errors='ignore')[:200]}")
+        return proc.returncode
     except Exception as e:
-        print(f"          Exception: {e}")
+        log.info(f"          Exception: {e}")
+        return None
+
+@cached_conversion(returns_list=False)
+def convert_office_with_libreoffice(input_path, temp_dir, file_ext):
+    soffice = get_soffice_path()
+    if not soffice:
+        raise ConversionError("LibreOffice not found")
+    
+    base = os.path.splitext(os.path.basename(input_path))[0]
+    pdf_path = os.path.join(temp_dir, f"{base}.pdf")
+    
+    # Use absolute paths
+    abs_input = os.path.abspath(input_path)
+    abs_outdir = os.path.abspath(temp_dir)
     
-    # Kill lingering processes
-    subprocess.run(['taskkill', '/f', '/im', 'soffice.exe'], capture_output=True)
+    # Preferred: hand the job to the persistent server (no per-file startup)
+    server = get_lo_server()
+    if server:
+        try:
+            result_pdf = server.convert(abs_input, abs_outdir)
+            if result_pdf and _is_pdf(result_pdf):
+                return result_pdf
+            log.warning(f"          ⚠️ LibreOffice server produced no PDF - retrying with soffice")
+        except Exception as e:
+            log.warning(f"          ⚠️ LibreOffice server conversion failed: {e}")
+            restart_lo_server()
+    
+    returncode = run_soffice_convert(soffice, [abs_input], abs_outdir, temp_dir)
+    if returncode == 0 and _is_pdf(pdf_path):
+        return pdf_path
     return None
 
+def _office_batches(paths, size):
+    """
+    Split paths into batches of at most `size`. soffice names each output <stem>.pdf,
+    so two inputs with the same stem never share a batch.
+    """
+    batches = []
+    for path in paths:
+        stem = os.path.splitext(os.path.basename(path))[0].lower()
+        for batch in batches:
+            if len(batch) < size and stem not in batch:
+                batch[stem] = path
+                break
+        else:
+            batches.append({stem: path})
+    return [list(batch.values()) for batch in batches]
+
+def convert_office_batch(input_paths, temp_dir):
+    """
+    Convert many office documents with one soffice launch per LIBREOFFICE_BATCH_SIZE files
+    instead of one per file. Returns {input_path: pdf_path} for the documents that converted;
+    the rest are left for convert_office_document to retry and report.
+    """
+    soffice = get_soffice_path()
+    if not soffice or not input_paths:
+        return {}
+    
+    results = {}
+    cache_keys = {}
+    for path in input_paths:
+        key, hit = _cache_lookup('convert_office_with_libreoffice', path, temp_dir)
+        if hit:
+            results[path] = hit
+        else:
+            cache_keys[path] = key
+    pending = list(cache_keys)
+    # Absolute input path and expected output name, resolved once per document
+    abs_inputs = {path: os.path.abspath(path) for path in pending}
+    pdf_names = {path: os.path.splitext(os.path.basename(path))[0] + '.pdf' for path in pending}
+    
+    def run_batch(batch):
+        out_dir = tempfile.mkdtemp(dir=temp_dir)
+        server = get_lo_server()
+        if server:
+            # The persistent server has no startup cost to amortize - feed it one by one
+            for path in batch:
+                try:
+                    server.convert(abs_inputs[path], out_dir)
+                except Exception as e:
+                    log.warning(f"          ⚠️ LibreOffice server conversion failed: {e}")
+                    restart_lo_server()
+        else:
+            run_soffice_convert(soffice, [abs_inputs[p] for p in batch], out_dir, temp_dir,
+                                timeout=min(LIBREOFFICE_TIMEOUT * len(batch), LIBREOFFICE_BATCH_TIMEOUT))
+        done = {}
+        for path in batch:
+            pdf_path = os.path.join(out_dir, pdf_names[path])
+            if _is_pdf(pdf_path):
+                done[path] = pdf_path
+        return done
+    
+    batches = _office_batches(pending, LIBREOFFICE_BATCH_SIZE)
+    if len(batches) <= 1:
+        converted = run_batch(batches[0]) if batches else {}
+    else:
+        # Several batches: run them side by side, each with its own LibreOffice profile
+        workers = max(1, min(CONVERSION_WORKERS, len(batches)))
+        profiles = queue.Queue()
+        for profile in _get_worker_profiles(workers):
+            profiles.put(profile)
+        
+        def run_with_profile(batch):
+            profile = profiles.get()
+            _worker_state.profile = profile
+            try:
+                return run_batch(batch)
+            finally:
+                _worker_state.profile = None
+                profiles.put(profile)
+        
+        converted = {}
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for done in pool.map(run_with_profile, batches):
+                converted.update(done)
+    
+    for path, pdf_path in converted.items():
+        _cache_store(cache_keys[path], pdf_path)
+    results.update(converted)
+    log.info(f"      ✅ LibreOffice batch converted {len(results)}/{len(input_paths)} documents")
+    return results
+
 def convert_powerpoint_with_text(input_path, temp_dir):
     """Fallback for PowerPoint files: extract text and create PDF."""
+    name = os.path.basename(input_path)
+    base = os.path.splitext(name)[0]
     try:
-        base = os.path.splitext(os.path.basename(input_path))[0]
         pdf_path = os.path.join(temp_dir, f"{base}_ppt_text.pdf")
         
         if not REPORTLAB_AVAILABLE:
@@ -512,39 +1447,29 @@ def convert_powerpoint_with_text(input_path, temp_dir):
         # Method 1: Try textract if available
         if TEXTRACT_AVAILABLE:
             try:
-                text = textract.process(input_path).decode('utf-8', errors='ignore')
+                text = _textract().process(input_path).decode('utf-8', errors='ignore')
                 if text.strip():
-                    print(f"          ✅ Textract extracted {len(text)} characters from PowerPoint")
+                    log.info(f"          ✅ Textract extracted {len(text)} characters from PowerPoint")
             except Exception as e:
-                print(f"          ⚠️ Textract failed for PowerPoint: {e}")
+                log.warning(f"          ⚠️ Textract failed for PowerPoint: {e}")
         
         # Method 2: If textract failed, try catppt if available (Linux/Mac)
         if not text.strip():
-            try:
-                # Check if catppt is installed (part of catdoc package on some systems)
-                result = subprocess.run(['catppt', input_path], 
-                                      capture_output=True, timeout=30)
-                if result.returncode == 0:
-                    text = result.stdout.decode('utf-8', errors='ignore')
-                    print(f"          ✅ Catppt extracted {len(text)} characters")
-            except (subprocess.SubprocessError, FileNotFoundError):
-                pass
+            text = extract_text_with_tool('catppt', input_path)
+            if text:
+                log.info(f"          ✅ Catppt extracted {len(text)} characters")
         
         # Method 3: Last resort - try to extract any readable text from binary
         if not text.strip():
             try:
                 with open(input_path, 'rb') as f:
                     content = f.read()
-                    # Try to decode as latin-1 and extract printable chars
-                    raw_text = content.decode('latin-1')
-                    # Keep only printable characters and basic punctuation
-                    import string
-                    printable = set(string.printable)
-                    text = ''.join(c for c in raw_text if c in printable)
+                    # Keep only printable characters and basic punctuation - one C-level
+                    # translate on the raw bytes instead of a per-character Python loop
+                    text = content.translate(None, _NON_PRINTABLE_BYTES).decode('ascii')
                     # Look for text that might be slide content (words separated by spaces)
-                    # Clean up excessive whitespace and non-text
-                    text = re.sub(r'[^\x20-\x7E\n\r\t]', ' ', text)
-                    text = re.sub(r'\s+', ' ', text)
+                    # Clean up excessive whitespace (only \x0b/\x0c survive as "non-text")
+                    text = _WS_COLLAPSE_RE.sub(' ', text)
                     # Split into lines at reasonable intervals
                     words = text.split()
                     if len(words) > 10:  # Only if we got meaningful content
@@ -558,9 +1483,9 @@ def convert_powerpoint_with_text(input_path, temp_dir):
                         if current_line:
                             lines.append(' '.join(current_line))
                         text = '\n'.join(lines)
-                        print(f"          ✅ Binary extraction got {len(text)} characters")
+                        log.info(f"          ✅ Binary extraction got {len(text)} characters")
             except Exception as e:
-                print(f"          ⚠️ Binary extraction failed: {e}")
+                log.warning(f"          ⚠️ Binary extraction failed: {e}")
         
         if not text.strip():
             return None
@@ -569,61 +1494,123 @@ def convert_powerpoint_with_text(input_path, temp_dir):
         doc = SimpleDocTemplate(pdf_path, pagesize=letter,
                                 leftMargin=1*inch, rightMargin=1*inch,
                                 topMargin=1*inch, bottomMargin=1*inch)
-        style = ParagraphStyle('Normal', fontName='Times-Roman', fontSize=8, leading=10)
+        style = STYLE_NORMAL
         
         story = []
-        story.append(Paragraph(f"PowerPoint File: {os.path.basename(input_path)}", 
-                              ParagraphStyle('Header', fontName='Times-Bold', fontSize=10, leading=12)))
+        story.append(Paragraph(f"PowerPoint File: {name}", STYLE_HEADER))
         story.append(Spacer(1, 0.1*inch))
         story.append(Paragraph("(Extracted text content - slide formatting may be lost)", style))
         story.append(Spacer(1, 0.2*inch))
         
         # Add text content
-        lines = text.split('\n')
-        for line in lines[:300]:  # Limit to 300 lines
-            if line.strip():
-                safe = line.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-                story.append(Paragraph(safe, style))
+        lines, remaining = head_lines(text, 300)  # Limit to 300 lines
+        story.extend(text_block(lines, style))
         
-        if len(lines) > 300:
+        if remaining:
             story.append(Paragraph("... (content truncated)", style))
         
         doc.build(story)
         
-        if os.path.exists(pdf_path):
-            size = os.path.getsize(pdf_path) / 1024
-            print(f"          ✅ PowerPoint text PDF created: {size:.1f} KB")
+        size = output_size_kb(pdf_path)
+        if size is not None:
+            log.info(f"          ✅ PowerPoint text PDF created: {size:.1f} KB")
             return pdf_path
         else:
             return None
             
     except Exception as e:
-        print(f"          ⚠️ PowerPoint conversion error: {e}")
+        log.warning(f"          ⚠️ PowerPoint conversion error: {e}")
         return None
     
-def convert_excel_with_pandas(input_path, temp_dir):
-    """Fallback: use pandas to read Excel and create a simple PDF."""
+# Shared look for spreadsheet previews: 7pt body, bold header row
+EXCEL_TABLE_STYLE = [
+    ('FONT', (0, 0), (-1, -1), 'Times-Roman', 7),
+    ('FONT', (0, 0), (-1, 0), 'Times-Bold', 7),
+    ('LINEBELOW', (0, 0), (-1, 0), 0.5, '#000000'),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+]
+
+# pandas engine per extension, so each workbook is parsed once with the right reader
+PANDAS_EXCEL_ENGINES = {
+    '.xls': 'xlrd',
+    '.xlt': 'xlrd',
+    '.xlsx': 'openpyxl',
+    '.xlsm': 'openpyxl',
+    '.xltx': 'openpyxl',
+    '.xltm': 'openpyxl',
+    '.xlsb': 'pyxlsb',
+    '.ods': 'odf',
+}
+_EXCEL_FORMAT_ERRORS = (zipfile.BadZipFile,) + ((xlrd.XLRDError,) if XLRD_AVAILABLE else ())
+
+def read_sheet_previews(input_path, max_rows=50):
+    """
+    Read the first rows of every sheet as [(sheet_name, rows, total_data_rows)],
+    where rows[0] is the header and total_data_rows is None if unknown. .xlsx is streamed with openpyxl read-only and .xls
+    is loaded one sheet at a time with xlrd; pandas is only used for other formats.
+    """
+    ext = os.path.splitext(input_path)[1].lower()
+    sheets = []
+    
+    if OPENPYXL_AVAILABLE and PANDAS_EXCEL_ENGINES.get(ext) == 'openpyxl':
+        wb = _openpyxl().load_workbook(input_path, read_only=True, data_only=True)
+        try:
+            for ws in wb.worksheets:
+                rows = [['' if v is None else str(v) for v in row]
+                        for row in itertools.islice(ws.iter_rows(values_only=True), max_rows + 1)]
+                # max_row comes from the sheet's dimension record, which may be missing
+                total = (ws.max_row or len(rows)) - 1
+                sheets.append((ws.title, rows, max(total, len(rows) - 1)))
+        finally:
+            wb.close()
+        return sheets
+    
+    if XLRD_AVAILABLE and PANDAS_EXCEL_ENGINES.get(ext) == 'xlrd':
+        wb = xlrd.open_workbook(input_path, on_demand=True)
+        try:
+            for name in wb.sheet_names():
+                sheet = wb.sheet_by_name(name)
+                rows = [[str(v) for v in sheet.row_values(r)] for r in range(min(sheet.nrows, max_rows + 1))]
+                sheets.append((name, rows, max(sheet.nrows - 1, 0)))
+                wb.unload_sheet(name)  # keep only one sheet in memory at a time
+        finally:
+            wb.release_resources()
+        return sheets
+    
     if not PANDAS_AVAILABLE:
         return None
+    
+    # Pick the reader from the extension instead of trial-parsing with every engine.
+    # Only nrows+1 rows are parsed: the extra row tells us whether there is more.
+    if ext == '.csv':
+        df = _pandas().read_csv(input_path, nrows=max_rows + 1)
+        frames = [(os.path.basename(input_path), df)]
+    else:
+        engine = PANDAS_EXCEL_ENGINES.get(ext)  # None lets pandas sniff the content
+        try:
+            xls = _pandas().ExcelFile(input_path, engine=engine)
+        except _EXCEL_FORMAT_ERRORS:
+            if engine is None:
+                raise
+            # Extension lies about the format (e.g. an .xls that is really .xlsx)
+            xls = _pandas().ExcelFile(input_path)
+        with xls:
+            frames = [(name, xls.parse(name, nrows=max_rows + 1)) for name in xls.sheet_names]
+    
+    for sheet_name, df in frames:
+        total = len(df) if len(df) <= max_rows else None  # None: more rows than shown
+        rows = [[str(c) for c in df.columns]] + df.head(max_rows).astype(str).values.tolist()
+        sheets.append((sheet_name, rows, total))
+    return sheets
+
+def convert_excel_with_pandas(input_path, temp_dir):
+    """Fallback: read Excel sheet previews and create a simple PDF."""
     try:
         base = os.path.splitext(os.path.basename(input_path))[0]
         pdf_path = os.path.join(temp_dir, f"{base}_pandas.pdf")
         
-        # Try different engines
-        engines = []
-        if XLRD_AVAILABLE:
-            engines.append('xlrd')
-        if OPENPYXL_AVAILABLE:
-            engines.append('openpyxl')
-        engines.append(None)
-        
-        for engine in engines:
-            try:
-                df_dict = pd.read_excel(input_path, sheet_name=None, engine=engine)
-                break
-            except:
-                continue
-        else:
+        sheets = read_sheet_previews(input_path)
+        if sheets is None:
             return None
         
         if not REPORTLAB_AVAILABLE:
@@ -632,30 +1619,33 @@ def convert_excel_with_pandas(input_path, temp_dir):
         doc = SimpleDocTemplate(pdf_path, pagesize=letter,
                                 leftMargin=0.5*inch, rightMargin=0.5*inch,
                                 topMargin=0.5*inch, bottomMargin=0.5*inch)
-        style_normal = ParagraphStyle('Normal', fontName='Times-Roman', fontSize=7, leading=9)
-        style_bold = ParagraphStyle('Bold', fontName='Times-Bold', fontSize=8, leading=10)
+        style_normal = STYLE_TABLE_NORMAL
+        style_bold = STYLE_TABLE_BOLD
         
         story = []
-        for sheet_idx, (sheet_name, df) in enumerate(df_dict.items()):
+        for sheet_idx, (sheet_name, rows, total_rows) in enumerate(sheets):
             story.append(Paragraph(f"Sheet: {sheet_name}", style_bold))
             story.append(Spacer(1, 0.1*inch))
-            if not df.empty:
-                # Convert to text table (first 50 rows)
-                text = df.head(50).to_string(index=False, max_colwidth=20)
-                for line in text.split('\n'):
-                    if line.strip():
-                        safe = line.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-                        story.append(Paragraph(safe, style_normal))
-                if len(df) > 50:
-                    story.append(Paragraph(f"... and {len(df)-50} more rows", style_normal))
+            if len(rows) > 1 and rows[0]:
+                # Table flowable straight from the values (first 50 rows) - no to_string
+                # formatting and no per-line Paragraph markup parsing
+                data = [[v[:20] for v in row[:10]] for row in rows]
+                story.append(Table(data, style=EXCEL_TABLE_STYLE, hAlign='LEFT'))
+                ncols = max(len(row) for row in rows)
+                if ncols > 10:  # wider tables would run off the page
+                    story.append(Paragraph(f"... and {ncols-10} more columns", style_normal))
+                if total_rows is None:
+                    story.append(Paragraph("... and more rows", style_normal))
+                elif total_rows > 50:
+                    story.append(Paragraph(f"... and {total_rows-50} more rows", style_normal))
             else:
                 story.append(Paragraph("(Empty sheet)", style_normal))
-            if sheet_idx < len(df_dict)-1:
+            if sheet_idx < len(sheets)-1:
                 story.append(PageBreak())
         doc.build(story)
         return pdf_path
     except Exception as e:
-        print(f"          ⚠️ pandas conversion error: {e}")
+        log.warning(f"          ⚠️ Excel conversion error: {e}")
         return None
 
 def convert_excel_with_xlrd(input_path, temp_dir):
@@ -674,8 +1664,8 @@ def convert_excel_with_xlrd(input_path, temp_dir):
         doc = SimpleDocTemplate(pdf_path, pagesize=letter,
                                 leftMargin=0.5*inch, rightMargin=0.5*inch,
                                 topMargin=0.5*inch, bottomMargin=0.5*inch)
-        style_normal = ParagraphStyle('Normal', fontName='Times-Roman', fontSize=7, leading=9)
-        style_bold = ParagraphStyle('Bold', fontName='Times-Bold', fontSize=8, leading=10)
+        style_normal = STYLE_TABLE_NORMAL
+        style_bold = STYLE_TABLE_BOLD
         
         story = []
         for sheet_idx in range(min(wb.nsheets, 5)):
@@ -683,14 +1673,11 @@ def convert_excel_with_xlrd(input_path, temp_dir):
             story.append(Paragraph(f"Sheet: {sheet.name}", style_bold))
             story.append(Spacer(1, 0.1*inch))
             if sheet.nrows > 0:
-                # Headers
-                headers = [str(sheet.cell_value(0, c))[:15] for c in range(min(sheet.ncols, 10))]
-                story.append(Paragraph(" | ".join(headers), style_bold))
-                story.append(Paragraph("-"*60, style_normal))
-                # Data rows
-                for r in range(1, min(sheet.nrows, 51)):
-                    row = [str(sheet.cell_value(r, c))[:15] for c in range(min(sheet.ncols, 10))]
-                    story.append(Paragraph(" | ".join(row), style_normal))
+                # Header + first 50 data rows as one Table flowable
+                ncols = min(sheet.ncols, 10)
+                data = [[str(sheet.cell_value(r, c))[:15] for c in range(ncols)]
+                        for r in range(min(sheet.nrows, 51))]
+                story.append(Table(data, style=EXCEL_TABLE_STYLE, hAlign='LEFT'))
                 if sheet.nrows > 51:
                     story.append(Paragraph(f"... and {sheet.nrows-51} more rows", style_normal))
             else:
@@ -700,13 +1687,14 @@ def convert_excel_with_xlrd(input_path, temp_dir):
         doc.build(story)
         return pdf_path
     except Exception as e:
-        print(f"          ⚠️ xlrd error: {e}")
+        log.warning(f"          ⚠️ xlrd error: {e}")
         return None
 
 def convert_word_document(input_path, temp_dir):
     """Enhanced Word document conversion with multiple fallbacks."""
+    name = os.path.basename(input_path)
+    base = os.path.splitext(name)[0]
     try:
-        base = os.path.splitext(os.path.basename(input_path))[0]
         pdf_path = os.path.join(temp_dir, f"{base}_word.pdf")
         
         if not REPORTLAB_AVAILABLE:
@@ -717,51 +1705,37 @@ def convert_word_document(input_path, temp_dir):
         # Method 1: Try textract if available
         if TEXTRACT_AVAILABLE:
             try:
-                text = textract.process(input_path).decode('utf-8', errors='ignore')
+                text = _textract().process(input_path).decode('utf-8', errors='ignore')
                 if text.strip():
-                    print(f"          ✅ Textract extracted {len(text)} characters")
+                    log.info(f"          ✅ Textract extracted {len(text)} characters")
             except Exception as e:
-                print(f"          ⚠️ Textract failed: {e}")
+                log.warning(f"          ⚠️ Textract failed: {e}")
         
         # Method 2: If textract failed or returned empty, try antiword (if available)
         if not text.strip():
-            try:
-                # Check if antiword is installed (common on Linux/Mac for .doc files)
-                result = subprocess.run(['antiword', input_path], 
-                                      capture_output=True, timeout=30)
-                if result.returncode == 0:
-                    text = result.stdout.decode('utf-8', errors='ignore')
-                    print(f"          ✅ Antiword extracted {len(text)} characters")
-            except (subprocess.SubprocessError, FileNotFoundError):
-                pass
+            text = extract_text_with_tool('antiword', input_path)
+            if text:
+                log.info(f"          ✅ Antiword extracted {len(text)} characters")
         
         # Method 3: Try catdoc if available
         if not text.strip():
-            try:
-                result = subprocess.run(['catdoc', input_path], 
-                                      capture_output=True, timeout=30)
-                if result.returncode == 0:
-                    text = result.stdout.decode('utf-8', errors='ignore')
-                    print(f"          ✅ Catdoc extracted {len(text)} characters")
-            except (subprocess.SubprocessError, FileNotFoundError):
-                pass
+            text = extract_text_with_tool('catdoc', input_path)
+            if text:
+                log.info(f"          ✅ Catdoc extracted {len(text)} characters")
         
         # Method 4: Last resort - try to read as binary and extract any readable text
         if not text.strip():
             try:
                 with open(input_path, 'rb') as f:
                     content = f.read()
-                    # Try to decode as latin-1 (which never fails) and extract printable chars
-                    raw_text = content.decode('latin-1')
-                    # Keep only printable characters and basic punctuation
-                    import string
-                    printable = set(string.printable)
-                    text = ''.join(c for c in raw_text if c in printable)
+                    # Keep only printable characters - a C-level delete on the raw bytes
+                    # (what survives is pure ASCII) instead of a per-character Python loop
+                    text = content.translate(None, _NON_PRINTABLE_BYTES).decode('latin-1')
                     # Clean up excessive whitespace
-                    text = re.sub(r'\s+', ' ', text)
-                    print(f"          ✅ Binary extraction got {len(text)} characters")
+                    text = _WS_COLLAPSE_RE.sub(' ', text)
+                    log.info(f"          ✅ Binary extraction got {len(text)} characters")
             except Exception as e:
-                print(f"          ⚠️ Binary extraction failed: {e}")
+                log.warning(f"          ⚠️ Binary extraction failed: {e}")
         
         if not text.strip():
             return None
@@ -770,40 +1744,36 @@ def convert_word_document(input_path, temp_dir):
         doc = SimpleDocTemplate(pdf_path, pagesize=letter,
                                 leftMargin=1*inch, rightMargin=1*inch,
                                 topMargin=1*inch, bottomMargin=1*inch)
-        style = ParagraphStyle('Normal', fontName='Times-Roman', fontSize=8, leading=10)
+        style = STYLE_NORMAL
         
         story = []
-        story.append(Paragraph(f"File: {os.path.basename(input_path)}", 
-                              ParagraphStyle('Header', fontName='Times-Bold', fontSize=10, leading=12)))
+        story.append(Paragraph(f"File: {name}", STYLE_HEADER))
         story.append(Spacer(1, 0.1*inch))
         
         # Add text content line by line (limit to first 500 lines to avoid huge PDFs)
-        lines = text.split('\n')
-        for line in lines[:500]:
-            if line.strip():
-                safe = line.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-                story.append(Paragraph(safe, style))
+        lines, remaining = head_lines(text, 500)
+        story.extend(text_block(lines, style))
         
-        if len(lines) > 500:
-            story.append(Paragraph(f"... (text truncated, {len(lines)-500} more lines)", style))
+        if remaining:
+            story.append(Paragraph(f"... (text truncated, {remaining} more lines)", style))
         
         doc.build(story)
         
-        if os.path.exists(pdf_path):
-            size = os.path.getsize(pdf_path) / 1024
-            print(f"          ✅ Word PDF created: {size:.1f} KB")
+        size = output_size_kb(pdf_path)
+        if size is not None:
+            log.info(f"          ✅ Word PDF created: {size:.1f} KB")
             return pdf_path
         else:
             return None
             
     except Exception as e:
-        print(f"          ⚠️ Word conversion error: {e}")
+        log.warning(f"          ⚠️ Word conversion error: {e}")
         return None
     
 def convert_office_document(input_path, filename, temp_dir):
     """Main office conversion: tries LibreOffice first, then fallbacks."""
     ext = os.path.splitext(filename)[1].lower()
-    print(f"          🔄 Converting {ext} document with LibreOffice")
+    log.info(f"          🔄 Converting {ext} document with LibreOffice")
     
     # Try LibreOffice
     pdf = convert_office_with_libreoffice(input_path, temp_dir, ext)
@@ -812,46 +1782,83 @@ def convert_office_document(input_path, filename, temp_dir):
     
     # If LibreOffice fails, raise error
     error_msg = f"LibreOffice could not convert {ext} document: {filename}"
-    print(f"          ❌ {error_msg}")
+    log.error(f"          ❌ {error_msg}")
     raise ConversionError(error_msg)
 
+def head_lines(text, limit):
+    """
+    Return (first `limit` lines of text, number of lines after them). Only the head
+    is split; the rest is counted in C instead of being materialised as a list.
+    """
+    lines = text.split('\n', limit)
+    if len(lines) > limit:
+        return lines[:limit], lines[limit].count('\n') + 1
+    return lines, 0
+
+def text_block(lines, style):
+    """
+    Lay out text lines as ONE Preformatted flowable instead of a Paragraph per line
+    (no markup parse or per-paragraph layout). Preformatted does not wrap, so long
+    lines are word-wrapped to the 1-inch-margin letter frame up front. Blank lines
+    are skipped. Returns a list for story.extend().
+    """
+    width = letter[0] - 2 * inch - 12  # Frame pads 6pt on each side
+    wrapped = []
+    for line in lines:
+        line = line.strip().expandtabs(4)
+        if not line:
+            continue
+        if stringWidth(line, style.fontName, style.fontSize) <= width:
+            wrapped.append(line)
+        else:
+            wrapped.extend(simpleSplit(line, style.fontName, style.fontSize, width))
+    return [Preformatted('\n'.join(wrapped), style)] if wrapped else []
+
+def read_text_file(path):
+    """
+    Read a text attachment as UTF-8 (undecodable bytes dropped) with one read and
+    one bulk decode, instead of a text-mode file's incremental decoder.
+    """
+    with open(path, 'rb') as f:
+        text = f.read().decode('utf-8', 'ignore')
+    # Same newline translation text mode would have applied
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
 def convert_text_to_pdf_pages(text_path, temp_dir, font_size=8):
     """Convert a text file to PDF pages with specified font size."""
+    name = os.path.basename(text_path)
     try:
-        out = os.path.join(temp_dir, f"text_{os.path.basename(text_path)}.pdf")
-        print(f"          🔍 Reading text file: {text_path}")
+        out = os.path.join(temp_dir, f"text_{name}.pdf")
+        log.debug(f"          🔍 Reading text file: {text_path}")
         
         if not REPORTLAB_AVAILABLE:
             raise ConversionError("reportlab not available for text conversion")
         
         # Read the text file
-        with open(text_path, 'r', encoding='utf-8', errors='ignore') as f:
-            text_content = f.read()
+        text_content = read_text_file(text_path)
         
         # Create PDF with specified font size
         doc = SimpleDocTemplate(out, pagesize=letter,
                                 leftMargin=1*inch, rightMargin=1*inch,
                                 topMargin=1*inch, bottomMargin=1*inch)
-        style = ParagraphStyle('Normal', fontName='Times-Roman', fontSize=font_size, leading=font_size+2)
-        header_style = ParagraphStyle('Header', fontName='Times-Bold', fontSize=font_size+2, leading=font_size+4)
+        style, header_style = text_styles(font_size)
         
         story = []
         # Add filename as header
-        story.append(Paragraph(f"File: {os.path.basename(text_path)}", header_style))
+        story.append(Paragraph(f"File: {name}", header_style))
         story.append(Spacer(1, 0.1*inch))
         
-        # Add text content line by line
-        for line in text_content.split('\n'):
-            if line.strip():  # Skip empty lines
-                safe = line.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-                story.append(Paragraph(safe, style))
+        # Add text content (empty lines skipped)
+        story.extend(text_block(text_content.split('\n'), style))
         
         doc.build(story)
         
         # Verify file was created
-        if os.path.exists(out):
-            size = os.path.getsize(out) / 1024
-            print(f"          ✅ Text PDF created: {size:.1f} KB")
+        size = output_size_kb(out)
+        if size is not None:
+            log.info(f"          ✅ Text PDF created: {size:.1f} KB")
             return [out]
         else:
             raise ConversionError(f"PDF file not created for {text_path}")
@@ -860,174 +1867,59 @@ def convert_text_to_pdf_pages(text_path, temp_dir, font_size=8):
         raise
     except Exception as e:
         error_msg = f"Text conversion failed for {text_path}: {e}"
-        print(f"          ❌ {error_msg}")
+        log.error(f"          ❌ {error_msg}")
         raise ConversionError(error_msg) from e
 
-def convert_rtf_to_pdf_pages(rtf_path, temp_dir):
-    """Convert RTF file to PDF by extracting text content."""
-    try:
-        out = os.path.join(temp_dir, f"rtf_{os.path.basename(rtf_path)}.pdf")
-        print(f"          🔍 Reading RTF file: {rtf_path}")
-        
-        if not REPORTLAB_AVAILABLE:
-            raise ConversionError("reportlab not available for RTF conversion")
-        
-        text = ""
-        
-        # Method 1: Try textract if available
-        if TEXTRACT_AVAILABLE:
-            try:
-                text = textract.process(rtf_path).decode('utf-8', errors='ignore')
-                if text.strip():
-                    print(f"          ✅ Textract extracted {len(text)} characters from RTF")
-            except Exception as e:
-                print(f"          ⚠️ Textract failed for RTF: {e}")
-        
-        # Method 2: Try unrtf if available (common Linux/Mac tool)
-        if not text.strip():
-            try:
-                result = subprocess.run(['unrtf', '--text', rtf_path], 
-                                      capture_output=True, timeout=30)
-                if result.returncode == 0:
-                    text = result.stdout.decode('utf-8', errors='ignore')
-                    print(f"          ✅ UnRTF extracted {len(text)} characters")
-            except (subprocess.SubprocessError, FileNotFoundError):
-                pass
-        
-        # Method 3: Manual RTF stripping (basic)
-        if not text.strip():
-            try:
-                with open(rtf_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    rtf_content = f.read()
-                
-                # Very basic RTF tag stripping
-                # Remove RTF control words and groups
-                text = re.sub(r'\\[a-z]+[-\d]*', ' ', rtf_content)  # Remove control words
-                text = re.sub(r'\{[^}]*\}', ' ', text)  # Remove groups
-                text = re.sub(r'\\\'[a-f0-9]{2}', ' ', text)  # Remove hex escapes
-                text = re.sub(r'[{}]', ' ', text)  # Remove braces
-                # Clean up whitespace
-                text = re.sub(r'\s+', ' ', text)
-                text = re.sub(r'\n\s*\n', '\n\n', text)
-                
-                if text.strip():
-                    print(f"          ✅ Manual RTF stripping extracted {len(text)} characters")
-            except Exception as e:
-                print(f"          ⚠️ Manual RTF stripping failed: {e}")
-        
-        if not text.strip():
-            raise ConversionError(f"No text could be extracted from RTF file {rtf_path}")
-        
-        # Create PDF from extracted text
-        doc = SimpleDocTemplate(out, pagesize=letter,
-                                leftMargin=1*inch, rightMargin=1*inch,
-                                topMargin=1*inch, bottomMargin=1*inch)
-        style = ParagraphStyle('Normal', fontName='Times-Roman', fontSize=8, leading=10)
-        
-        story = []
-        story.append(Paragraph(f"RTF File: {os.path.basename(rtf_path)}", 
-                              ParagraphStyle('Header', fontName='Times-Bold', fontSize=10, leading=12)))
-        story.append(Spacer(1, 0.1*inch))
-        
-        # Add text content
-        lines = text.split('\n')
-        for line in lines[:500]:
-            if line.strip():
-                safe = line.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-                story.append(Paragraph(safe, style))
-        
-        if len(lines) > 500:
-            story.append(Paragraph("... (content truncated)", style))
-        
-        doc.build(story)
-        
-        if os.path.exists(out):
-            size = os.path.getsize(out) / 1024
-            print(f"          ✅ RTF PDF created: {size:.1f} KB")
-            return [out]
-        else:
-            raise ConversionError(f"PDF file not created for {rtf_path}")
-            
-    except ConversionError:
-        raise
-    except Exception as e:
-        error_msg = f"RTF conversion failed for {rtf_path}: {e}"
-        print(f"          ❌ {error_msg}")
-        raise ConversionError(error_msg) from e
-    
 def convert_html_to_pdf_pages(html_path, temp_dir):
     """Convert HTML file to PDF pages by extracting text content."""
+    name = os.path.basename(html_path)
     try:
-        out = os.path.join(temp_dir, f"html_{os.path.basename(html_path)}.pdf")
-        print(f"          🔍 Reading HTML file: {html_path}")
+        out = os.path.join(temp_dir, f"html_{name}.pdf")
+        log.debug(f"          🔍 Reading HTML file: {html_path}")
         
         if not REPORTLAB_AVAILABLE:
             raise ConversionError("reportlab not available for HTML conversion")
         
         # Read the HTML file
-        with open(html_path, 'r', encoding='utf-8', errors='ignore') as f:
-            html_content = f.read()
+        html_content = read_text_file(html_path)
         
         # Simple HTML tag stripping (basic approach)
-        import re
         # Remove scripts and style tags and their content
-        text = re.sub(r'<script.*?>.*?</script>', '', html_content, flags=re.DOTALL | re.IGNORECASE)
-        text = re.sub(r'<style.*?>.*?</style>', '', text, flags=re.DOTALL | re.IGNORECASE)
+        text = _HTML_SCRIPT_RE.sub('', html_content)
+        text = _HTML_STYLE_RE.sub('', text)
         # Remove HTML tags
-        text = re.sub(r'<[^>]+>', ' ', text)
-        # Decode HTML entities
-        text = re.sub(r'&nbsp;', ' ', text)
-        text = re.sub(r'&amp;', '&', text)
-        text = re.sub(r'&lt;', '<', text)
-        text = re.sub(r'&gt;', '>', text)
-        text = re.sub(r'&quot;', '"', text)
-        text = re.sub(r'&#39;', "'", text)
+        text = _HTML_TAG_RE.sub(' ', text)
+        # Decode HTML entities (named and numeric, one pass; &nbsp; is folded by the whitespace collapse)
+        text = html.unescape(text)
         # Clean up whitespace
-        text = re.sub(r'\s+', ' ', text)
-        text = re.sub(r'\n\s*\n', '\n\n', text)
+        text = _WS_COLLAPSE_RE.sub(' ', text)
+        text = _BLANK_LINES_RE.sub('\n\n', text)
         
-        # Split into lines for PDF
-        lines = text.split('\n')
+        # Limit total length (what 1000 lines of 200 chars used to allow), then split into lines
+        truncated = len(text) > HTML_TEXT_LIMIT
+        lines = text[:HTML_TEXT_LIMIT].split('\n')
         
         # Create PDF
         doc = SimpleDocTemplate(out, pagesize=letter,
                                 leftMargin=1*inch, rightMargin=1*inch,
                                 topMargin=1*inch, bottomMargin=1*inch)
-        style = ParagraphStyle('Normal', fontName='Times-Roman', fontSize=8, leading=10)
+        style = STYLE_NORMAL
         
         story = []
-        story.append(Paragraph(f"HTML File: {os.path.basename(html_path)}", 
-                              ParagraphStyle('Header', fontName='Times-Bold', fontSize=10, leading=12)))
+        story.append(Paragraph(f"HTML File: {name}", STYLE_HEADER))
         story.append(Spacer(1, 0.1*inch))
         
-        # Add text content
-        line_count = 0
-        for line in lines:
-            if line.strip():
-                # Limit line length to avoid PDF issues
-                line = line.strip()
-                if len(line) > 200:
-                    # Split long lines
-                    parts = [line[i:i+200] for i in range(0, len(line), 200)]
-                    for part in parts:
-                        safe = part.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-                        story.append(Paragraph(safe, style))
-                        line_count += 1
-                else:
-                    safe = line.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-                    story.append(Paragraph(safe, style))
-                    line_count += 1
-                
-                if line_count > 1000:  # Limit total lines
-                    story.append(Paragraph("... (content truncated due to length)", style))
-                    break
+        # Add text content - text_block word-wraps long lines to the page width
+        story.extend(text_block(lines, style))
+        if truncated:
+            story.append(Paragraph("... (content truncated due to length)", style))
         
         doc.build(story)
         
         # Verify file was created
-        if os.path.exists(out):
-            size = os.path.getsize(out) / 1024
-            print(f"          ✅ HTML PDF created: {size:.1f} KB")
+        size = output_size_kb(out)
+        if size is not None:
+            log.info(f"          ✅ HTML PDF created: {size:.1f} KB")
             return [out]
         else:
             raise ConversionError(f"PDF file not created for {html_path}")
@@ -1036,7 +1928,7 @@ def convert_html_to_pdf_pages(html_path, temp_dir):
         raise
     except Exception as e:
         error_msg = f"HTML conversion failed for {html_path}: {e}"
-        print(f"          ❌ {error_msg}")
+        log.error(f"          ❌ {error_msg}")
         raise ConversionError(error_msg) from e
     
 def handle_unconvertible_file(file_path, filename, temp_dir, file_type):
@@ -1046,8 +1938,8 @@ def handle_unconvertible_file(file_path, filename, temp_dir, file_type):
         doc = SimpleDocTemplate(out, pagesize=letter,
                                 leftMargin=1*inch, rightMargin=1*inch,
                                 topMargin=1*inch, bottomMargin=1*inch)
-        style = ParagraphStyle('Normal', fontName='Times-Roman', fontSize=8, leading=10)
-        bold = ParagraphStyle('Bold', fontName='Times-Bold', fontSize=9, leading=12)
+        style = STYLE_NORMAL
+        bold = STYLE_BOLD
         
         stat = os.stat(file_path)
         size_mb = stat.st_size / (1024 * 1024)
@@ -1106,30 +1998,65 @@ def handle_unconvertible_file(file_path, filename, temp_dir, file_type):
         doc.build(story)
         return [out]
     except Exception as e:
-        print(f"          ⚠️ Could not create skip summary: {e}")
+        log.warning(f"          ⚠️ Could not create skip summary: {e}")
         return None
 
+def ical_fields(block):
+    """Map property name -> first value (escaped for Paragraph) in one scan of an iCalendar/vCard block."""
+    fields = {}
+    for m in _ICAL_FIELDS_RE.finditer(block):
+        fields.setdefault(m.group(1).upper(), m.group(2).strip().translate(_XML_ESCAPE))
+    return fields
+
+def _vobject_value(value):
+    """Display string for a vobject property value (dates, vCard names, ORG lists...)."""
+    if isinstance(value, (list, tuple)):
+        return '; '.join(str(v) for v in value if v)
+    return ' '.join(str(value).split())
+
+def calendar_components(content):
+    """
+    Return {'VEVENT'|'VTODO'|'VJOURNAL'|'VCARD': [fields dict, ...]} for an iCalendar/vCard
+    file. Uses vobject when installed (one streaming parse that handles line folding and
+    escaped values); falls back to the regex scanner if it is missing or rejects the file.
+    """
+    if VOBJECT_AVAILABLE:
+        try:
+            found = {name: [] for name in _ICAL_COMPONENT_RE}
+            for top in vobject.readComponents(content):
+                for comp in ([top] if top.name in found else top.components()):
+                    if comp.name not in found:
+                        continue
+                    fields = {}
+                    for name in _ICAL_FIELD_NAMES:
+                        prop = comp.contents.get(name.lower())
+                        if prop:
+                            fields[name] = _vobject_value(prop[0].value).translate(_XML_ESCAPE)
+                    found[comp.name].append(fields)
+            return found
+        except Exception:
+            pass  # Malformed for vobject - the regex scanner is more lenient
+    return {name: [ical_fields(block) for block in pattern.findall(content)]
+            for name, pattern in _ICAL_COMPONENT_RE.items()}
+
 def convert_calendar_to_pdf_pages(cal_path, filename, temp_dir, ext):
     """Convert calendar/contact files to PDF."""
     try:
-        print(f"          📅 {ext.upper()} calendar/contact file detected - converting to text PDF")
+        log.info(f"          📅 {ext.upper()} calendar/contact file detected - converting to text PDF")
         
         out = os.path.join(temp_dir, f"calendar_{sanitize_filename(filename)}.pdf")
         
         # Read the file as text
-        with open(cal_path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
+        content = read_text_file(cal_path)
         
         if not REPORTLAB_AVAILABLE:
             raise ConversionError("reportlab not available for calendar conversion")
         
-        import re
-        
         doc = SimpleDocTemplate(out, pagesize=letter,
                               leftMargin=1*inch, rightMargin=1*inch,
                               topMargin=1*inch, bottomMargin=1*inch)
-        style = ParagraphStyle('Normal', fontName='Times-Roman', fontSize=8, leading=10)
-        bold = ParagraphStyle('Bold', fontName='Times-Bold', fontSize=9, leading=12)
+        style = STYLE_NORMAL
+        bold = STYLE_BOLD
         
         story = []
         story.append(Paragraph(f"Calendar/Contact File: {filename}", bold))
@@ -1137,11 +2064,12 @@ def convert_calendar_to_pdf_pages(cal_path, filename, temp_dir, ext):
         story.append(Spacer(1, 0.1*inch))
         
         # Handle different calendar formats
-        if ext in ['.ics', '.ical', '.icalendar', '.ifb', '.vcs', '.vcalendar']:
+        if ext in ICALENDAR_EXTENSIONS:
             # iCalendar format
-            events = re.findall(r'BEGIN:VEVENT(.*?)END:VEVENT', content, re.DOTALL | re.IGNORECASE)
-            todos = re.findall(r'BEGIN:VTODO(.*?)END:VTODO', content, re.DOTALL | re.IGNORECASE)
-            journals = re.findall(r'BEGIN:VJOURNAL(.*?)END:VJOURNAL', content, re.DOTALL | re.IGNORECASE)
+            components = calendar_components(content)
+            events = components['VEVENT']
+            todos = components['VTODO']
+            journals = components['VJOURNAL']
             
             story.append(Paragraph(f"Events: {len(events)}", bold))
             story.append(Paragraph(f"Tasks: {len(todos)}", bold))
@@ -1151,19 +2079,19 @@ def convert_calendar_to_pdf_pages(cal_path, filename, temp_dir, ext):
             # Process events
             if events:
                 story.append(Paragraph("EVENTS:", bold))
-                for i, event in enumerate(events[:30]):
-                    summary = re.search(r'SUMMARY[:\s]+(.*?)[\r\n]', event, re.IGNORECASE)
-                    dtstart = re.search(r'DTSTART[:\s]+(.*?)[\r\n]', event, re.IGNORECASE)
-                    dtend = re.search(r'DTEND[:\s]+(.*?)[\r\n]', event, re.IGNORECASE)
-                    location = re.search(r'LOCATION[:\s]+(.*?)[\r\n]', event, re.IGNORECASE)
+                for i, event_fields in enumerate(events[:30]):
+                    summary = event_fields.get('SUMMARY')
+                    dtstart = event_fields.get('DTSTART')
+                    dtend = event_fields.get('DTEND')
+                    location = event_fields.get('LOCATION')
                     
-                    story.append(Paragraph(f"  Event {i+1}: {summary.group(1) if summary else 'Unnamed'}", style))
+                    story.append(Paragraph(f"  Event {i+1}: {summary or 'Unnamed'}", style))
                     if dtstart:
-                        story.append(Paragraph(f"    Start: {dtstart.group(1)}", style))
+                        story.append(Paragraph(f"    Start: {dtstart}", style))
                     if dtend:
-                        story.append(Paragraph(f"    End: {dtend.group(1)}", style))
+                        story.append(Paragraph(f"    End: {dtend}", style))
                     if location:
-                        story.append(Paragraph(f"    Location: {location.group(1)}", style))
+                        story.append(Paragraph(f"    Location: {location}", style))
                     story.append(Spacer(1, 0.05*inch))
                 
                 if len(events) > 30:
@@ -1173,44 +2101,44 @@ def convert_calendar_to_pdf_pages(cal_path, filename, temp_dir, ext):
             if todos:
                 story.append(Spacer(1, 0.1*inch))
                 story.append(Paragraph("TASKS:", bold))
-                for i, todo in enumerate(todos[:20]):
-                    summary = re.search(r'SUMMARY[:\s]+(.*?)[\r\n]', todo, re.IGNORECASE)
-                    due = re.search(r'DUE[:\s]+(.*?)[\r\n]', todo, re.IGNORECASE)
-                    status = re.search(r'STATUS[:\s]+(.*?)[\r\n]', todo, re.IGNORECASE)
+                for i, todo_fields in enumerate(todos[:20]):
+                    summary = todo_fields.get('SUMMARY')
+                    due = todo_fields.get('DUE')
+                    status = todo_fields.get('STATUS')
                     
-                    story.append(Paragraph(f"  Task {i+1}: {summary.group(1) if summary else 'Unnamed'}", style))
+                    story.append(Paragraph(f"  Task {i+1}: {summary or 'Unnamed'}", style))
                     if due:
-                        story.append(Paragraph(f"    Due: {due.group(1)}", style))
+                        story.append(Paragraph(f"    Due: {due}", style))
                     if status:
-                        story.append(Paragraph(f"    Status: {status.group(1)}", style))
+                        story.append(Paragraph(f"    Status: {status}", style))
                     story.append(Spacer(1, 0.05*inch))
         
-        elif ext in ['.vcf', '.vcard']:
+        elif ext in VCARD_EXTENSIONS:
             # vCard contact format
-            contacts = re.findall(r'BEGIN:VCARD(.*?)END:VCARD', content, re.DOTALL | re.IGNORECASE)
+            contacts = calendar_components(content)['VCARD']
             
             story.append(Paragraph(f"Contacts: {len(contacts)}", bold))
             story.append(Spacer(1, 0.2*inch))
             
-            for i, contact in enumerate(contacts[:50]):
+            for i, contact_fields in enumerate(contacts[:50]):
                 # Extract contact details
-                fn = re.search(r'FN[:\s]+(.*?)[\r\n]', contact, re.IGNORECASE)
-                n = re.search(r'N[:\s]+(.*?)[\r\n]', contact, re.IGNORECASE)
-                email = re.search(r'EMAIL[:\s]+(.*?)[\r\n]', contact, re.IGNORECASE)
-                tel = re.search(r'TEL[:\s]+(.*?)[\r\n]', contact, re.IGNORECASE)
-                org = re.search(r'ORG[:\s]+(.*?)[\r\n]', contact, re.IGNORECASE)
+                fn = contact_fields.get('FN')
+                n = contact_fields.get('N')
+                email = contact_fields.get('EMAIL')
+                tel = contact_fields.get('TEL')
+                org = contact_fields.get('ORG')
                 
                 story.append(Paragraph(f"Contact {i+1}:", bold))
                 if fn:
-                    story.append(Paragraph(f"  Name: {fn.group(1)}", style))
+                    story.append(Paragraph(f"  Name: {fn}", style))
                 elif n:
-                    story.append(Paragraph(f"  Name: {n.group(1)}", style))
+                    story.append(Paragraph(f"  Name: {n}", style))
                 if email:
-                    story.append(Paragraph(f"  Email: {email.group(1)}", style))
+                    story.append(Paragraph(f"  Email: {email}", style))
                 if tel:
-                    story.append(Paragraph(f"  Phone: {tel.group(1)}", style))
+                    story.append(Paragraph(f"  Phone: {tel}", style))
                 if org:
-                    story.append(Paragraph(f"  Organization: {org.group(1)}", style))
+                    story.append(Paragraph(f"  Organization: {org}", style))
                 story.append(Spacer(1, 0.05*inch))
             
             if len(contacts) > 50:
@@ -1219,40 +2147,36 @@ def convert_calendar_to_pdf_pages(cal_path, filename, temp_dir, ext):
         else:
             # Fallback for unknown calendar formats - show raw text
             story.append(Paragraph("Raw calendar data:", bold))
-            lines = content.split('\n')[:100]
-            for line in lines:
-                if line.strip():
-                    safe = line.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-                    story.append(Paragraph(safe, style))
+            story.extend(text_block(head_lines(content, 100)[0], style))
         
         doc.build(story)
         
-        if os.path.exists(out):
-            size = os.path.getsize(out) / 1024
-            print(f"          ✅ Created calendar PDF: {size:.1f} KB")
+        size = output_size_kb(out)
+        if size is not None:
+            log.info(f"          ✅ Created calendar PDF: {size:.1f} KB")
             return [out]
         else:
             raise ConversionError(f"PDF file not created for {filename}")
             
     except Exception as e:
-        print(f"          ⚠️ Calendar conversion failed: {e}")
+        log.warning(f"          ⚠️ Calendar conversion failed: {e}")
         # Fall back to text conversion
         return convert_text_to_pdf_pages(cal_path, temp_dir)
 
 def convert_latex_to_pdf_pages(tex_path, temp_dir):
     """Convert LaTeX file to PDF."""
     try:
-        print(f"          📄 LaTeX file detected - converting to PDF")
+        log.info(f"          📄 LaTeX file detected - converting to PDF")
         
         # First try to compile with pdflatex if available
         import subprocess
         import shutil
         
         # Check if pdflatex is installed
-        pdflatex_path = shutil.which('pdflatex')
+        pdflatex_path = _which('pdflatex')
         
         if pdflatex_path:
-            print(f"          🔄 Attempting to compile with pdflatex...")
+            log.info(f"          🔄 Attempting to compile with pdflatex...")
             # Create a temporary directory for LaTeX compilation
             latex_temp = os.path.join(temp_dir, 'latex_compile')
             os.makedirs(latex_temp, exist_ok=True)
@@ -1262,282 +2186,252 @@ def convert_latex_to_pdf_pages(tex_path, temp_dir):
             tex_temp_path = os.path.join(latex_temp, tex_filename)
             shutil.copy2(tex_path, tex_temp_path)
             
-            # Run pdflatex (need to run twice for references)
-            for i in range(2):
+            # Run pdflatex twice for references. The first pass only has to write the
+            # .aux file, so -draftmode skips PDF output and image loading there
+            for i, draft in enumerate((['-draftmode'], [])):
                 result = subprocess.run(
-                    [pdflatex_path, '-interaction=nonstopmode', '-output-directory', latex_temp, tex_temp_path],
+                    [pdflatex_path, '-interaction=nonstopmode', *draft,
+                     '-output-directory', latex_temp, tex_temp_path],
                     cwd=latex_temp,
-                    capture_output=True,
+                    # pdflatex writes everything to its .log as well - don't pipe it back
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
                     timeout=60
                 )
                 if result.returncode != 0:
-                    print(f"          ⚠️ pdflatex run {i+1} had issues")
+                    log.warning(f"          ⚠️ pdflatex run {i+1} had issues")
             
             # Look for generated PDF
             pdf_name = os.path.splitext(tex_filename)[0] + '.pdf'
             pdf_path = os.path.join(latex_temp, pdf_name)
             
             if os.path.exists(pdf_path):
-                print(f"          ✅ LaTeX compilation successful")
+                log.info(f"          ✅ LaTeX compilation successful")
                 # Convert the PDF to pages
                 return convert_pdf_to_pdf_pages(pdf_path, temp_dir)
             else:
-                print(f"          ⚠️ pdflatex did not produce a PDF")
+                log.warning(f"          ⚠️ pdflatex did not produce a PDF")
                 
         # Fallback: treat as text file
-        print(f"          🔄 Falling back to text extraction")
+        log.info(f"          🔄 Falling back to text extraction")
         return convert_text_to_pdf_pages(tex_path, temp_dir)
         
     except Exception as e:
-        print(f"          ⚠️ LaTeX conversion failed: {e}")
+        log.warning(f"          ⚠️ LaTeX conversion failed: {e}")
         # Fallback to text
         return convert_text_to_pdf_pages(tex_path, temp_dir)
     
+# Extension -> (kind, handler), built once. The kind tells convert_attachment_to_pdf
+# which call shape to use. Later entries win, so the lowest-priority groups come first
+# (e.g. '.ini' is both "code" and "unconvertible" and is rendered as code).
+EXT_HANDLERS = {
+    **{ext: ('unconvertible', handle_unconvertible_file) for ext in UNCONVERTIBLE_EXTENSIONS},
+    **{ext: ('office', convert_office_document) for ext in OFFICE_TYPES},
+    '.html': ('text', convert_html_to_pdf_pages),
+    '.htm': ('text', convert_html_to_pdf_pages),
+    '.txt': ('text', convert_text_to_pdf_pages),
+    **{ext: ('code', convert_text_to_pdf_pages) for ext in CODE_EXTENSIONS},
+    '.tex': ('text', convert_latex_to_pdf_pages),
+    **{ext: ('calendar', convert_calendar_to_pdf_pages) for ext in CALENDAR_EXTENSIONS},
+    **{ext: ('image', convert_image_to_pdf_pages) for ext in IMAGE_EXTENSIONS},
+    **{ext: ('libreoffice', convert_office_with_libreoffice) for ext in VISIO_EXTENSIONS},
+    '.xps': ('libreoffice', convert_office_with_libreoffice),
+    '.pdf': ('pdf', convert_pdf_to_pdf_pages),
+}
+
 def convert_attachment_to_pdf(attachment_path, filename, temp_dir):
     """Route attachment to appropriate converter."""
     ext = os.path.splitext(filename)[1].lower()
     
     try:
-        # If no extension, try multiple formats in sequence
+        # No extension: sniff the content once and route to a single converter
         if not ext:
-            print(f"          🔍 No file extension detected - trying multiple formats")
-            
-            # Try these extensions in order
-            try_extensions = [
-                '.jpg', '.txt', '.xls', '.doc', '.docx', '.pdf', '.html', '.rtf', 
-                '.png', '.csv', '.ppt', '.xml', '.log', '.ics', '.vcs', '.vcf',
-                '.vsd', '.vsdx', '.vss', '.vst', '.vsw', '.vsdm', '.vssx', '.vssm', '.vstx', '.vstm',
-                '.tex', '.asc', '.odt', '.ods', '.odp', '.spv', '.sav', '.emz', '.mso',
-                '.py', '.js', '.java', '.c', '.cpp', '.sql', '.json', '.md'
-            ]
-            
-            for try_ext in try_extensions:
-                print(f"          🔄 Attempting as {try_ext} file...")
-                try:
-                    # Temporarily pretend the file has this extension
-                    if try_ext == '.jpg':
-                        # Try as image
-                        result = convert_image_to_pdf_pages(attachment_path, temp_dir)
-                        if result:
-                            print(f"          ✅ Successfully processed as image")
-                            return result
-                    elif try_ext == '.txt':
-                        # Try as text
-                        result = convert_text_to_pdf_pages(attachment_path, temp_dir)
-                        if result:
-                            print(f"          ✅ Successfully processed as text")
-                            return result
-                    elif try_ext in ['.xls', '.doc', '.ppt', '.csv', '.xml']:
-                        # Try as office document
-                        result = convert_office_document(attachment_path, filename + try_ext, temp_dir)
-                        if result:
-                            pdf_pages = convert_pdf_to_pdf_pages(result, temp_dir)
-                            if pdf_pages:
-                                print(f"          ✅ Successfully processed as office document")
-                                return pdf_pages
-                    elif try_ext == '.pdf':
-                        # Try as PDF
-                        result = convert_pdf_to_pdf_pages(attachment_path, temp_dir)
-                        if result:
-                            print(f"          ✅ Successfully processed as PDF")
-                            return result
-                    elif try_ext in ['.html', '.htm']:
-                        # Try as HTML
-                        result = convert_html_to_pdf_pages(attachment_path, temp_dir)
-                        if result:
-                            print(f"          ✅ Successfully processed as HTML")
-                            return result
-                    elif try_ext == '.rtf':
-                        # Try as RTF
-                        result = convert_rtf_to_pdf_pages(attachment_path, temp_dir)
-                        if result:
-                            print(f"          ✅ Successfully processed as RTF")
-                            return result
-                    elif try_ext in ['.ics', '.vcs', '.vcf', '.ifb', '.ical', '.icalendar', '.cal']:
-                        # Try as calendar/contact file
-                        result = convert_calendar_to_pdf_pages(attachment_path, filename, temp_dir, try_ext)
-                        if result:
-                            print(f"          ✅ Successfully processed as calendar/contact file")
-                            return result
-                    elif try_ext in ['.vsd', '.vsdx', '.vss', '.vst', '.vsw', '.vsdm', '.vssx', '.vssm', '.vstx', '.vstm']:
-                        # Try as Visio file
-                        result = convert_office_document(attachment_path, filename + try_ext, temp_dir)
-                        if result:
-                            pdf_pages = convert_pdf_to_pdf_pages(result, temp_dir)
-                            if pdf_pages:
-                                print(f"          ✅ Successfully processed as Visio diagram")
-                                return pdf_pages
-                    elif try_ext == '.tex':
-                        # Try as LaTeX file
-                        result = convert_latex_to_pdf_pages(attachment_path, temp_dir)
-                        if result:
-                            print(f"          ✅ Successfully processed as LaTeX document")
-                            return result
-                    elif try_ext in ['.py', '.js', '.java', '.c', '.cpp', '.sql', '.json', '.md']:
-                        # Try as code/text file
-                        result = convert_text_to_pdf_pages(attachment_path, temp_dir)
-                        if result:
-                            print(f"          ✅ Successfully processed as code/text file")
-                            return result
-                except Exception as e:
-                    print(f"          ⚠️ Failed as {try_ext}: {e}")
-                    continue
-            
-            # If all attempts fail, treat as .mp3 to trigger the unconvertible handler
-            print(f"          🔄 All format attempts failed - treating as audio file to trigger skip")
-            ext = '.mp3'
-        
-        # Regular extension handling
-        # PDF
-        if ext == '.pdf':
-            return convert_pdf_to_pdf_pages(attachment_path, temp_dir)
-        
-        # XPS files - handle with LibreOffice
-        if ext == '.xps':
-            print(f"          🔄 Converting XPS document with LibreOffice...")
-            # Try LibreOffice first
-            pdf = convert_office_with_libreoffice(attachment_path, temp_dir, ext)
-            if pdf:
-                return convert_pdf_to_pdf_pages(pdf, temp_dir)
-            
-            # If LibreOffice fails, create a summary
-            print(f"          ⚠️ Could not convert XPS document")
-            summary = handle_unconvertible_file(attachment_path, filename, temp_dir, ext)
-            if summary:
-                return summary
-            else:
-                raise ConversionError(f"Could not convert XPS document: {filename}")
+            ext = sniff_extension(attachment_path)
+            log.info(f"          🔍 No file extension - content looks like {ext}")
         
-        # Visio files
-        visio_extensions = ['.vsd', '.vsdx', '.vss', '.vst', '.vsw', '.vsdm', '.vssx', '.vssm', '.vstx', '.vstm']
+        kind, handler = EXT_HANDLERS.get(ext, (None, None))
         
-        if ext in visio_extensions:
-            print(f"          📊 Visio diagram file detected - attempting conversion with LibreOffice...")
-            # Try LibreOffice first (it can open some Visio files)
-            pdf = convert_office_with_libreoffice(attachment_path, temp_dir, ext)
+        if kind == 'pdf':
+            return handler(attachment_path, temp_dir)
+        
+        # XPS and Visio - LibreOffice can open them, otherwise create a summary
+        if kind == 'libreoffice':
+            label = 'XPS document' if ext == '.xps' else 'Visio diagram'
+            log.info(f"          🔄 Converting {label} with LibreOffice...")
+            pdf = handler(attachment_path, temp_dir, ext)
             if pdf:
                 return convert_pdf_to_pdf_pages(pdf, temp_dir)
             
-            # If LibreOffice fails, create a summary
-            print(f"          ⚠️ Could not convert Visio diagram")
+            log.warning(f"          ⚠️ Could not convert {label}")
             summary = handle_unconvertible_file(attachment_path, filename, temp_dir, ext)
             if summary:
                 return summary
-            else:
-                raise ConversionError(f"Could not convert Visio diagram: {filename}")
-        
- 
-        # Images - comprehensive list of all common image extensions
-        image_extensions = [
-            # JPEG variants
-            '.jpg', '.jpeg', '.jpe', '.jfif', '.jif', '.jfi',
-            # PNG and GIF
-            '.png', '.gif',
-            # BMP variants
-            '.bmp', '.dib', '.rle',
-            # TIFF variants
-            '.tiff', '.tif',
-            # WebP
-            '.webp',
-            # HEIC/HEIF (modern iPhone formats)
-            '.heic', '.heif', '.heics', '.heifs',
-            # Icons
-            '.ico', '.cur',
-            # Vector formats (may be handled as text/images)
-            '.svg', '.svgz', '.eps', '.ai', '.cdr',
-            # Photoshop and GIMP
-            '.psd', '.psb', '.xcf',
-            # Camera RAW formats
-            '.raw', '.cr2', '.cr3', '.nef', '.nrw', '.arw', '.srf', '.sr2',
-            '.dng', '.orf', '.ptx', '.pef', '.rw2', '.raf', '.3fr', '.kdc',
-            '.dcr', '.mrw', '.bay', '.erf', '.mef', '.mos', '.iiq',
-            # Other common image formats
-            '.jp2', '.j2k', '.jpf', '.jpx', '.jpm',  # JPEG 2000
-            '.pgm', '.ppm', '.pbm', '.pnm',  # Netpbm formats
-            '.pcx', '.tga', '.icns', '.hdp', '.jxr', '.wdp',  # Other formats
-            '.dds', '.dcm', '.dicm',  # Medical/texture formats
-            '.exr', '.hdr',  # HDR formats
-        ]
-        
-        if ext in image_extensions:
-            return convert_image_to_pdf_pages(attachment_path, temp_dir)
-        
-        # Calendar and contact files
-        calendar_extensions = [
-            '.ics', '.ical', '.icalendar', '.ifb', '.vcs',  # iCalendar formats
-            '.vcf', '.vcard',  # vCard contact formats
-            '.cal', '.calendar',  # Generic calendar
-            '.event', '.todo', '.task',  # Event formats
-            '.vcalendar',  # vCalendar
-            '.xcal', '.xcs',  # XML calendar formats
-        ]
-        
-        if ext in calendar_extensions:
-            return convert_calendar_to_pdf_pages(attachment_path, filename, temp_dir, ext)
+            raise ConversionError(f"Could not convert {label}: {filename}")
         
-        # LaTeX files
-        if ext == '.tex':
-            return convert_latex_to_pdf_pages(attachment_path, temp_dir)
+        if kind == 'image':
+            return handler(attachment_path, temp_dir)
         
-        # Python/Code files - treat as text
-        code_extensions = [
-            '.py', '.js', '.java', '.c', '.cpp', '.h', '.cs', '.php', '.rb', '.go',
-            '.rs', '.swift', '.kt', '.scala', '.pl', '.pm', '.tcl', '.lua', '.r',
-            '.m', '.sql', '.sh', '.bash', '.zsh', '.fish', '.ps1', '.bat', '.cmd',
-            '.xml', '.json', '.yaml', '.yml', '.toml', '.ini', '.cfg', '.conf',
-            '.css', '.scss', '.less', '.md', '.markdown', '.rst'
-        ]
-        
-        if ext in code_extensions:
-            print(f"          💻 Code file detected - converting as text")
-            return convert_text_to_pdf_pages(attachment_path, temp_dir, font_size=6)
+        if kind == 'calendar':
+            return handler(attachment_path, filename, temp_dir, ext)
         
-        # Text files
-        if ext == '.txt':
-            return convert_text_to_pdf_pages(attachment_path, temp_dir)
+        if kind == 'code':
+            log.info(f"          💻 Code file detected - converting as text")
+            return handler(attachment_path, temp_dir, font_size=6)
         
-        # HTML files
-        if ext in ['.html', '.htm']:
-            return convert_html_to_pdf_pages(attachment_path, temp_dir)
+        if kind == 'text':  # .txt, .html/.htm, .tex
+            return handler(attachment_path, temp_dir)
         
         # Office (including RTF)
-        if ext in OFFICE_TYPES:
-            pdf = convert_office_document(attachment_path, filename, temp_dir)
+        if kind == 'office':
+            pdf = handler(attachment_path, filename, temp_dir)
             if pdf:
                 return convert_pdf_to_pdf_pages(pdf, temp_dir)
         
         # Media files, signatures, and other unconvertible types - create skip summary
-        unconvertible_types = [
-            '.p7s', '.p7m', '.p7c', '.pub', '.sig', '.asc', '.spv', '.sav', '.emz', '.mso',  # Signatures & proprietary
-            '.mp3', '.mp4', '.wav', '.avi', '.mov', '.wmv', '.flv', '.mkv', '.opus', # Audio/Video
-            '.m4a', '.aac', '.ogg', '.flac', '.wma', '.pages', '.HEIC', # More audio
-            '.zip', '.zap', '.rar', '.7z', '.tar', '.gz', '.msg', '.rpmsg', # Archives & Installer packages
-            '.exe', '.dll', '.msi',  # Executables
-            '.iso', '.bin', '.dat', '.img',  # Disk images and binary files
-            '.cab', '.dmg', '.vhd', '.vmdk',  # More disk images
-            '.reg', '.ini', '.cfg', '.config',  # Configuration files
-            '.log', '.tmp', '.bak', '.old',  # Temporary/backup files
-        ]
-        
-        if ext in unconvertible_types:
-            print(f"          🔍 {ext.upper()} file detected - creating skip summary")
-            summary = handle_unconvertible_file(attachment_path, filename, temp_dir, ext)
+        if kind == 'unconvertible':
+            log.info(f"          🔍 {ext.upper()} file detected - creating skip summary")
+            summary = handler(attachment_path, filename, temp_dir, ext)
             if summary:
                 return summary
         
         # Unknown file type
         error_msg = f"Unsupported file type: {ext}"
-        print(f"          ⚠️ {error_msg}")
+        log.warning(f"          ⚠️ {error_msg}")
         raise ConversionError(error_msg)
         
     except ConversionError:
         raise
     except Exception as e:
         error_msg = f"Unexpected error converting {filename}: {e}"
-        print(f"          ❌ {error_msg}")
+        log.error(f"          ❌ {error_msg}")
         raise ConversionError(error_msg) from e
 
     
+# ========== PARALLEL CONVERSION ==========
+
+_worker_state = threading.local()  # .profile = LibreOffice profile dir of the current worker
+_WORKER_PROFILES = []
+
+def _get_worker_profiles(workers):
+    """Return `workers` LibreOffice profile dirs, creating them once per run."""
+    while len(_WORKER_PROFILES) < workers:
+        i = len(_WORKER_PROFILES)
+        _WORKER_PROFILES.append(tempfile.mkdtemp(prefix=f"lo_prof_{i}_", dir=SCRATCH_DIR))
+    return _WORKER_PROFILES[:workers]
+
+def _cleanup_worker_profiles():
+    for profile in _WORKER_PROFILES:
+        shutil.rmtree(profile, ignore_errors=True)
+
+atexit.register(_cleanup_worker_profiles)
+
+_PROCESS_POOL = None
+_PROCESS_LOG_LISTENER = None
+_PROCESS_PROFILE_ROOT = None  # set in pool workers: parent dir for their threads' profiles
+_THREAD_POOL = None
+
+def _init_conversion_process(log_queue, profile_root):
+    """Per-process setup for pool workers: own LibreOffice profile, logging back to the parent."""
+    global _LO_SERVER, _LO_SERVER_FAILED, _PROCESS_PROFILE_ROOT
+    # The persistent server listens on a fixed port - only the parent may own it.
+    # Drop the copy of the parent's server that fork handed us, never drive it from here.
+    _LO_SERVER = None
+    _LO_SERVER_FAILED = True
+    # Workers convert their own attachments (on threads, see get_thread_pool), never via the pool
+    _worker_state.in_pool = True
+    _PROCESS_PROFILE_ROOT = profile_root
+    _worker_state.profile = tempfile.mkdtemp(prefix='lo_prof_', dir=profile_root)
+    log.handlers[:] = [logging.handlers.QueueHandler(log_queue)]
+
+def get_process_pool():
+    """Return the shared attachment conversion pool, starting it on first use."""
+    global _PROCESS_POOL, _PROCESS_LOG_LISTENER
+    if _PROCESS_POOL is None:
+        log_queue = multiprocessing.Queue()
+        _PROCESS_LOG_LISTENER = logging.handlers.QueueListener(log_queue, _log_console)
+        _PROCESS_LOG_LISTENER.start()
+        profile_root = tempfile.mkdtemp(prefix='lo_prof_pool_', dir=SCRATCH_DIR)
+        _WORKER_PROFILES.append(profile_root)
+        _PROCESS_POOL = ProcessPoolExecutor(max_workers=CONVERSION_WORKERS,
+                                            initializer=_init_conversion_process,
+                                            initargs=(log_queue, profile_root))
+    return _PROCESS_POOL
+
+def shutdown_process_pool():
+    global _PROCESS_POOL, _PROCESS_LOG_LISTENER
+    if _PROCESS_POOL is not None:
+        _PROCESS_POOL.shutdown(wait=True, cancel_futures=True)
+        _PROCESS_POOL = None
+    if _PROCESS_LOG_LISTENER is not None:
+        _PROCESS_LOG_LISTENER.stop()
+        _PROCESS_LOG_LISTENER = None
+
+atexit.register(shutdown_process_pool)
+
+def _init_attachment_thread():
+    _worker_state.profile = tempfile.mkdtemp(prefix='lo_prof_', dir=_PROCESS_PROFILE_ROOT)
+
+def get_thread_pool():
+    """
+    Return this pool worker's attachment threads, starting them on first use. Threads overlap
+    the subprocess and disk waits of one email's attachments; each keeps its own LibreOffice profile.
+    """
+    global _THREAD_POOL
+    if _THREAD_POOL is None:
+        _THREAD_POOL = ThreadPoolExecutor(max_workers=ATTACHMENT_THREADS,
+                                          initializer=_init_attachment_thread)
+    return _THREAD_POOL
+
+def run_in_pool(fn, items, pool=None):
+    """
+    Run fn(item) for every item in the worker processes (or the given executor).
+    Yields (item, result) as each one finishes; the first error is re-raised
+    after cancelling the jobs that have not started.
+    """
+    pool = pool or get_process_pool()
+    futures = {pool.submit(fn, item): item for item in items}
+    try:
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    except BrokenProcessPool as e:
+        # A worker died (e.g. a native crash in a PDF library) - start fresh next time
+        shutdown_process_pool()
+        raise ConversionError(f"Conversion worker crashed: {e}") from e
+    finally:
+        for future in futures:
+            future.cancel()
+
+def _convert_job(job):
+    path, filename, out_dir = job
+    return convert_attachment_to_pdf(path, filename, out_dir)
+
+def convert_attachments_batch(jobs):
+    """
+    Convert (path, filename, temp_dir) jobs in the worker processes.
+    Yields (path, pages) as each one finishes.
+    """
+    for job, pages in run_in_pool(_convert_job, jobs):
+        yield job[0], pages
+
+def convert_many(paths, temp_dir):
+    """
+    Convert several attachments concurrently - in the worker processes, or on this
+    worker's threads when already inside one. Returns {path: pages}.
+    The first ConversionError is re-raised after cancelling pending work.
+    """
+    if not paths:
+        return {}
+    if len(paths) == 1:
+        # Not worth a round trip through a pool
+        path = paths[0]
+        return {path: convert_attachment_to_pdf(path, os.path.basename(path),
+                                                tempfile.mkdtemp(dir=temp_dir))}
+    # Own output dir per attachment - converters use fixed names like pdf_page_0001.pdf
+    jobs = [(path, os.path.basename(path), tempfile.mkdtemp(dir=temp_dir)) for path in paths]
+    if getattr(_worker_state, 'in_pool', False):
+        return {job[0]: pages for job, pages in run_in_pool(_convert_job, jobs, get_thread_pool())}
+    return dict(convert_attachments_batch(jobs))
+
 def create_file_summary_page(file_path, filename, temp_dir):
     """Create a simple PDF summary when conversion fails."""
     try:
@@ -1545,8 +2439,8 @@ def create_file_summary_page(file_path, filename, temp_dir):
         doc = SimpleDocTemplate(out, pagesize=letter,
                                 leftMargin=1*inch, rightMargin=1*inch,
                                 topMargin=1*inch, bottomMargin=1*inch)
-        style = ParagraphStyle('Normal', fontName='Times-Roman', fontSize=8, leading=10)
-        bold = ParagraphStyle('Bold', fontName='Times-Bold', fontSize=9, leading=12)
+        style = STYLE_NORMAL
+        bold = STYLE_BOLD
         
         stat = os.stat(file_path)
         mime = get_file_type(file_path)
@@ -1568,20 +2462,38 @@ def create_file_summary_page(file_path, filename, temp_dir):
         return None
 
 def sanitize_filename(filename):
-    filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
-    filename = re.sub(r'_+', '_', filename)
+    filename = _UNDERSCORES_RE.sub('_', filename.translate(_FILENAME_TABLE))
     return filename.strip(' .') or "unnamed"
 
 # ========== EMAIL PROCESSING ==========
 
+def load_json(path):
+    """Read a JSON file (orjson when available)."""
+    if ORJSON_AVAILABLE:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def dump_json(obj, path):
+    """Write obj as indented UTF-8 JSON (orjson when available)."""
+    if ORJSON_AVAILABLE:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(obj, option=orjson.OPT_INDENT_2))
+        return
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(obj, f, indent=2, ensure_ascii=False)
+
+# Gmail system labels that are not user tags
+SYSTEM_LABELS = frozenset({'Inbox', 'Sent', 'Draft', 'Spam', 'Trash', 'Important', 'Starred', 'Chat'})
+
 def extract_tags(message):
     """Extract Gmail labels from X-Gmail-Labels header."""
     tags = []
     x_labels = message.get('X-Gmail-Labels', '')
     if x_labels:
         raw = [t.strip() for t in x_labels.split(',')]
-        exclude = ['Inbox', 'Sent', 'Draft', 'Spam', 'Trash', 'Important', 'Starred', 'Chat']
-        tags = [t for t in raw if t not in exclude and not t.startswith('Category_')]
+        tags = [t for t in raw if t not in SYSTEM_LABELS and not t.startswith('Category_')]
     return tags or ['Unfiled']
 
 def parse_email_date(date_str):
@@ -1604,33 +2516,40 @@ def parse_email_date(date_str):
             continue
     return datetime.now()
 
+def decode_text_part(part):
+    """Decode a text part's payload using its declared charset (UTF-8 if missing or unknown)."""
+    payload = part.get_payload(decode=True)
+    if not payload:
+        return ''
+    charset = part.get_content_charset() or 'utf-8'
+    try:
+        return payload.decode(charset, errors='ignore')
+    except LookupError:
+        return payload.decode('utf-8', errors='ignore')
+
 def extract_email_body(message):
     """Extract plain text body from email."""
-    body = ""
-    if message.is_multipart():
-        for part in message.walk():
-            if part.get_content_type() == "text/plain":
-                try:
-                    payload = part.get_payload(decode=True)
-                    if payload:
-                        body += payload.decode('utf-8', errors='ignore')
-                except:
-                    pass
-    else:
+    if not message.is_multipart():
         try:
-            payload = message.get_payload(decode=True)
-            if payload:
-                body += payload.decode('utf-8', errors='ignore')
+            return decode_text_part(message)
         except:
-            pass
-    return body
+            return ""
+    parts = []
+    for part in message.walk():
+        # A text/plain attachment is not body text - don't decode it just to include it
+        if part.get_content_type() == "text/plain" and part.get_content_disposition() != 'attachment':
+            try:
+                parts.append(decode_text_part(part))
+            except:
+                pass
+    return ''.join(parts)
 
 def create_email_pdf(email_body, metadata, output_path):
     """Create PDF for email body (8pt Times New Roman)."""
     doc = SimpleDocTemplate(output_path, pagesize=letter,
                             leftMargin=1*inch, rightMargin=1*inch,
                             topMargin=1*inch, bottomMargin=1*inch)
-    style = ParagraphStyle('Normal', fontName='Times-Roman', fontSize=8, leading=10)
+    style = STYLE_NORMAL
     story = []
     story.append(Paragraph(f"From: {metadata['from']}", style))
     story.append(Paragraph(f"To: {metadata['to']}", style))
@@ -1638,203 +2557,338 @@ def create_email_pdf(email_body, metadata, output_path):
     story.append(Paragraph(f"Subject: {metadata['subject']}", style))
     story.append(Paragraph(f"Tags: {', '.join(metadata['tags'])}", style))
     story.append(Spacer(1, 0.2*inch))
-    for line in email_body.split('\n'):
-        if line.strip():
-            safe = line.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-            story.append(Paragraph(safe, style))
+    # Body as one Preformatted block (plain text, so no escaping) instead of a Paragraph per line
+    story.extend(text_block(email_body.split('\n'), style))
     doc.build(story)
 
-def process_month(source_month_path, dest_month_path):
-    """Process one month: combine all emails into PDFs + consolidated JSON."""
-    month_name = os.path.basename(source_month_path)
-    print(f"\n📁 Processing month: {month_name}")
-    os.makedirs(dest_month_path, exist_ok=True)
-    
-    # Find email subfolders
-    email_folders = [os.path.join(source_month_path, d) for d in os.listdir(source_month_path)
-                     if os.path.isdir(os.path.join(source_month_path, d)) and not d.startswith('_')]
-    if not email_folders:
-        print("  No email folders found.")
-        return
-    print(f"  Found {len(email_folders)} email folders")
-    
-    consolidated = []
-    
+def month_office_attachments(email_folders):
+    """Office attachments (small enough to convert) across all of a month's email folders."""
+    paths = []
     for folder_path in email_folders:
-        folder_name = os.path.basename(folder_path)
-        print(f"\n    Processing: {folder_name}")
-        
-        with tempfile.TemporaryDirectory() as tmp:
-            # Find JSON metadata
-            json_files = [f for f in os.listdir(folder_path) if f.endswith('.json')]
-            if not json_files:
-                print(f"      ⚠️ No JSON found, skipping")
-                continue
-            json_path = os.path.join(folder_path, json_files[0])
-            with open(json_path, 'r', encoding='utf-8') as f:
-                meta = json.load(f)
+        with os.scandir(folder_path) as it:
+            for entry in it:
+                if (os.path.splitext(entry.name)[1].lower() in OFFICE_TYPES
+                        and entry.stat().st_size / (1024*1024) <= MAX_EMBED_SIZE_MB):
+                    paths.append(entry.path)
+    return paths
+
+@contextlib.contextmanager
+def log_buffered():
+    """Hold log lines back until the block ends, then write them out together.
+    Errors (and a full buffer) flush straight away so failures are never delayed."""
+    target = log.handlers[0]
+    buffer = logging.handlers.MemoryHandler(LOG_BUFFER_LINES, flushLevel=logging.ERROR,
+                                            target=target)
+    log.handlers[:] = [buffer]
+    try:
+        yield
+    finally:
+        log.handlers[:] = [target]
+        buffer.close()  # flushes what is left
+
+def process_email_folder(folder_path, dest_month_path, office_pdfs):
+    """Build one email's PDF (see _process_email_folder), its progress printed as one
+    block so emails built in parallel don't interleave."""
+    with log_buffered():
+        return _process_email_folder(folder_path, dest_month_path, office_pdfs)
+
+def _process_email_folder(folder_path, dest_month_path, office_pdfs):
+    """
+    Build <folder>_complete.pdf for one email folder: the email, an ATTACHMENTS separator,
+    then every attachment converted and embedded. office_pdfs holds the month-wide office
+    batch results. Returns the email's metadata for the consolidated JSON (None if skipped).
+    """
+    folder_name = os.path.basename(folder_path)
+    log.info(f"\n    Processing: {folder_name}")
+    
+    with tempfile.TemporaryDirectory(dir=SCRATCH_DIR, prefix='gmailconv_') as tmp:
+        # One directory scan: file name -> size (scandir hands back the stat on Windows)
+        with os.scandir(folder_path) as it:
+            sizes = {entry.name: entry.stat().st_size for entry in it}
+        
+        # Find JSON metadata
+        json_files = [f for f in sizes if f.endswith('.json')]
+        if not json_files:
+            log.warning(f"      ⚠️ No JSON found, skipping")
+            return None
+        json_path = os.path.join(folder_path, json_files[0])
+        meta = load_json(json_path)
+        
+        # Find email PDF
+        pdf_files = [f for f in sizes if f.endswith('.pdf')]
+        email_pdf = None
+        for pf in pdf_files:
+            if pf.startswith(folder_name[:8]):
+                email_pdf = pf
+                break
+        if not email_pdf and pdf_files:
+            email_pdf = pdf_files[0]
+        if not email_pdf:
+            log.warning(f"      ⚠️ No PDF found")
+            return None
+        email_pdf_path = os.path.join(folder_path, email_pdf)
+        
+        # List attachments (everything except JSON and email PDF)
+        attachments = [f for f in sizes
+                       if not f.endswith('.json') and f != email_pdf]
+        log.info(f"      Found {len(attachments)} attachment(s)")
+        
+        # Create new PDF for this email
+        new_pdf_name = f"{folder_name}_complete.pdf"
+        new_pdf_path = os.path.join(dest_month_path, new_pdf_name)
+        writer = PdfWriter()
+        
+        # Add email PDF
+        try:
+            reader = PdfReader(email_pdf_path)
+            writer.append(reader, import_outline=False)
+            log.info(f"      ✅ Added email ({len(reader.pages)} pages)")
+        except Exception as e:
+            error_msg = f"Could not read email PDF {email_pdf_path}: {e}"
+            log.error(f"      ❌ {error_msg}")
+            raise ConversionError(error_msg) from e
+        
+        # Add attachments - ONLY if there are attachments
+        if attachments:
+            # Separator page
+            writer.add_page(separator_reader().pages[0])
             
-            # Find email PDF
-            pdf_files = [f for f in os.listdir(folder_path) if f.endswith('.pdf')]
-            email_pdf = None
-            for pf in pdf_files:
-                if pf.startswith(folder_name[:8]):
-                    email_pdf = pf
-                    break
-            if not email_pdf and pdf_files:
-                email_pdf = pdf_files[0]
-            if not email_pdf:
-                print(f"      ⚠️ No PDF found")
-                continue
-            email_pdf_path = os.path.join(folder_path, email_pdf)
+            # Convert everything small enough up front, in parallel
+            to_convert = [os.path.join(folder_path, att_file) for att_file in attachments
+                          if sizes[att_file] / (1024*1024) <= MAX_EMBED_SIZE_MB]
+            converted_pages = {}
             
-            # List attachments (everything except JSON and email PDF)
-            attachments = [f for f in os.listdir(folder_path)
-                           if not f.endswith('.json') and f != email_pdf]
-            print(f"      Found {len(attachments)} attachment(s)")
+            # JPEG/PNG images go into a single multipage PDF together
+            images = [p for p in to_convert
+                      if os.path.splitext(p)[1].lower() in IMG2PDF_EXTENSIONS]
+            if len(images) > 1:
+                try:
+                    refs = convert_images_to_pdf_pages(images, tmp)
+                    for path, ref in zip(images, refs):
+                        converted_pages[path] = [ref]
+                    to_convert = [p for p in to_convert if p not in converted_pages]
+                except ConversionError as e:
+                    log.warning(f"      ⚠️ Image batch failed ({e}) - converting images one by one")
             
-            # Create new PDF for this email
-            new_pdf_name = f"{folder_name}_complete.pdf"
-            new_pdf_path = os.path.join(dest_month_path, new_pdf_name)
-            writer = PdfWriter()
+            # Office documents were converted by the month-wide batch above;
+            # failures go through the normal path
+            for path in to_convert:
+                if path in office_pdfs:
+                    pages = convert_pdf_to_pdf_pages(office_pdfs[path], tmp)
+                    if pages:
+                        converted_pages[path] = pages
+            to_convert = [p for p in to_convert if p not in converted_pages]
             
-            # Add email PDF
-            try:
-                reader = PdfReader(email_pdf_path)
-                for page in reader.pages:
-                    writer.add_page(page)
-                print(f"      ✅ Added email ({len(reader.pages)} pages)")
-            except Exception as e:
-                error_msg = f"Could not read email PDF {email_pdf_path}: {e}"
-                print(f"      ❌ {error_msg}")
-                raise ConversionError(error_msg) from e
+            converted_pages.update(convert_many(to_convert, tmp))
             
-            # Add attachments - ONLY if there are attachments
-            if attachments:
-                # Separator page
-                sep = io.BytesIO()
-                sep_doc = SimpleDocTemplate(sep, pagesize=letter)
-                sep_doc.build([Paragraph("ATTACHMENTS", ParagraphStyle('H', fontName='Times-Bold', fontSize=10))])
-                sep.seek(0)
-                writer.add_page(PdfReader(sep).pages[0])
+            # Process attachments (in original order)
+            converted = 0
+            for att_file in attachments:
+                att_path = os.path.join(folder_path, att_file)
+                log.info(f"        Processing: {att_file}")
                 
-                # Process attachments
-                converted = 0
-                for att_file in attachments:
-                    att_path = os.path.join(folder_path, att_file)
-                    print(f"        Processing: {att_file}")
-                    
-                    # Size check
-                    size_mb = os.path.getsize(att_path) / (1024*1024)
-                    if size_mb > MAX_EMBED_SIZE_MB:
-                        print(f"          ⚠️ Large file ({size_mb:.1f}MB) - embedding only")
-                        with open(att_path, 'rb') as f:
-                            writer.add_attachment(filename=att_file, data=f.read())
-                        continue
-                    
-                    try:
-                        # Try conversion
-                        pages = convert_attachment_to_pdf(att_path, att_file, tmp)
-                        if pages:
-                            for p in pages:
-                                try:
-                                    if p == att_path:  # original PDF
-                                        r = PdfReader(p)
-                                        for page in r.pages:
-                                            writer.add_page(page)
-                                        converted += len(r.pages)
-                                    else:
-                                        r = PdfReader(p)
-                                        for page in r.pages:
-                                            writer.add_page(page)
-                                        converted += 1
-                                except Exception as e:
-                                    error_msg = f"Error adding page from {p}: {e}"
-                                    print(f"          ❌ {error_msg}")
-                                    raise ConversionError(error_msg) from e
-                        else:
-                            # This should not happen - convert_attachment_to_pdf should raise exception
-                            error_msg = f"Conversion returned None without raising exception for {att_file}"
-                            print(f"          ❌ {error_msg}")
-                            raise ConversionError(error_msg)
-                            
-                    except ConversionError:
-                        # Re-raise to stop processing
-                        raise
-                    except Exception as e:
-                        error_msg = f"Unexpected error processing {att_file}: {e}"
-                        print(f"          ❌ {error_msg}")
-                        raise ConversionError(error_msg) from e
-                    
-                    # Always embed original (even if conversion succeeded)
+                # Size check
+                size_mb = sizes[att_file] / (1024*1024)
+                if size_mb > MAX_EMBED_SIZE_MB:
+                    log.warning(f"          ⚠️ Large file ({size_mb:.1f}MB) - embedding only")
                     with open(att_path, 'rb') as f:
                         writer.add_attachment(filename=att_file, data=f.read())
+                    continue
                 
-                if converted:
-                    print(f"      ✅ Added {converted} attachment pages")
-            
-            # Save final PDF
-            with open(new_pdf_path, 'wb') as f:
-                writer.write(f)
-            final_size = os.path.getsize(new_pdf_path) / (1024*1024)
-            print(f"      ✅ Created: {new_pdf_name} ({final_size:.1f} MB)")
+                try:
+                    pages = converted_pages[att_path]
+                    if pages:
+                        added = add_converted_pages(writer, pages, att_path)
+                        if added is None:
+                            # Pages are read lazily, so a broken one only shows up here -
+                            # keep this attachment as an embedded file instead
+                            pages = None
+                        else:
+                            converted += added
+                    else:
+                        # This should not happen - convert_attachment_to_pdf should raise exception
+                        error_msg = f"Conversion returned None without raising exception for {att_file}"
+                        log.error(f"          ❌ {error_msg}")
+                        raise ConversionError(error_msg)
+                        
+                except ConversionError:
+                    # Re-raise to stop processing
+                    raise
+                except Exception as e:
+                    error_msg = f"Unexpected error processing {att_file}: {e}"
+                    log.error(f"          ❌ {error_msg}")
+                    raise ConversionError(error_msg) from e
+                
+                # Always embed original (even if conversion succeeded) - unless it is a PDF whose
+                # own pages were all just added, which would store the same content twice
+                if pages and not EMBED_PDF_ORIGINALS and is_whole_source_pdf(pages, att_path):
+                    continue
+                with open(att_path, 'rb') as f:
+                    writer.add_attachment(filename=att_file, data=f.read())
             
-            # Add to consolidated metadata
-            meta['pdf_file'] = new_pdf_name
-            meta['original_folder'] = folder_name
-            meta['attachments'] = attachments
-            consolidated.append(meta)
+            if converted:
+                log.info(f"      ✅ Added {converted} attachment pages")
+        
+        try:
+            final_size = write_merged_pdf(writer, new_pdf_path)
+        except Exception as e:
+            # A source object that only breaks while being written - don't lose the email
+            # over it: save its own pages with every attachment embedded as a file
+            log.error(f"      ❌ Could not write merged PDF ({e}) - saving email with attachments embedded only")
+            writer = PdfWriter()
+            writer.append(PdfReader(email_pdf_path), import_outline=False)
+            for att_file in attachments:
+                with open(os.path.join(folder_path, att_file), 'rb') as f:
+                    writer.add_attachment(filename=att_file, data=f.read())
+            final_size = write_merged_pdf(writer, new_pdf_path)
+        # Readers point into this email's temp dir, which is about to go away
+        _cached_pdf_reader.cache_clear()
+        log.info(f"      ✅ Created: {new_pdf_name} ({final_size:.1f} MB)")
+        
+        # Add to consolidated metadata
+        meta['pdf_file'] = new_pdf_name
+        meta['original_folder'] = folder_name
+        meta['attachments'] = attachments
+        return meta
+
+def is_whole_source_pdf(pages, att_path):
+    """
+    True if pages are every page of the PDF att_path itself. Not when the forgiving
+    parse dropped unreadable pages - the original is the only full copy then.
+    """
+    if pages == [att_path]:
+        return True  # large PDF added as a whole
+    if not all(isinstance(p, PageRef) and p.path == att_path for p in pages):
+        return False
+    try:
+        return len(pages) == len(get_pdf_reader(att_path, pages[0].strict).pages)
+    except Exception:
+        return False
+
+def add_converted_pages(writer, pages, att_path):
+    """
+    Append an attachment's converted pages to writer. Returns the number of pages it
+    counts as (an original PDF counts its pages, a converted file counts once), or None
+    if they could not be added - then writer is left untouched.
+    """
+    # Assemble the attachment in a scratch writer first: PyPDF2's writer.pages doesn't
+    # support deleting, so a half-appended attachment could not be taken out of writer again
+    scratch = PdfWriter()
+    added = 0
+    try:
+        # Runs of PageRefs into the same source PDF go in with one bulk append
+        runs = itertools.groupby(pages, key=lambda p: (p.path, p.strict)
+                                 if isinstance(p, PageRef) else (p, None))
+        for (p, strict), group in runs:
+            if strict is not None:  # pages of a source PDF
+                indices = [ref.index for ref in group]
+                scratch.append(get_pdf_reader(p, strict), pages=indices, import_outline=False)
+                added += len(indices)
+            else:
+                r = get_pdf_reader(p)
+                scratch.append(r, import_outline=False)
+                added += len(r.pages) if p == att_path else 1
+    except Exception as e:
+        log.error(f"          ❌ Error adding pages from {os.path.basename(att_path)}: {e} - embedding it instead")
+        return None
+    for page in scratch.pages:
+        writer.add_page(page)
+    return added
+
+def write_merged_pdf(writer, path):
+    """Write the merged PDF to path; returns its size in MB."""
+    # Share identical fonts/images/streams between the merged files (pypdf >= 4.3)
+    if hasattr(writer, 'compress_identical_objects'):
+        writer.compress_identical_objects(remove_identicals=True, remove_orphans=True)
+    
+    # Large buffer coalesces PyPDF2's per-object writes
+    with open(path, 'wb', buffering=PDF_WRITE_BUFFER) as f:
+        writer.write(f)
+        return f.tell() / (1024*1024)
+
+def process_month(source_month_path, dest_month_path):
+    """Process one month: combine all emails into PDFs + consolidated JSON."""
+    month_name = os.path.basename(source_month_path)
+    log.info(f"\n📁 Processing month: {month_name}")
+    os.makedirs(dest_month_path, exist_ok=True)
+    
+    # Find email subfolders
+    with os.scandir(source_month_path) as it:
+        email_folders = [e.path for e in it if e.is_dir() and not e.name.startswith('_')]
+    if not email_folders:
+        log.info("  No email folders found.")
+        return
+    log.info(f"  Found {len(email_folders)} email folders")
+    
+    # Office attachments of the whole month share soffice launches (LIBREOFFICE_BATCH_SIZE
+    # documents each) instead of one launch per email. Their PDFs live until the month is done,
+    # and are removed even when a ConversionError stops the run.
+    with tempfile.TemporaryDirectory(prefix='office_month_', dir=SCRATCH_DIR) as office_tmp:
+        office_pdfs = convert_office_batch(month_office_attachments(email_folders), office_tmp)
+        
+        # Emails are independent - build them in the worker processes, one email per task.
+        # Collected by folder so the consolidated JSON does not depend on completion order.
+        build = functools.partial(process_email_folder, dest_month_path=dest_month_path,
+                                  office_pdfs=office_pdfs)
+        if len(email_folders) > 1:
+            results = dict(run_in_pool(build, email_folders))
+        else:
+            results = {folder_path: build(folder_path) for folder_path in email_folders}
+    consolidated = [results[path] for path in email_folders if results[path] is not None]
     
     # Save consolidated JSON
     if consolidated:
         consolidated.sort(key=lambda x: x.get('date', ''))
         json_out = os.path.join(dest_month_path, f"{month_name}_consolidated.json")
-        with open(json_out, 'w', encoding='utf-8') as f:
-            json.dump({
-                'month': month_name,
-                'generated': datetime.now().isoformat(),
-                'total_emails': len(consolidated),
-                'emails': consolidated
-            }, f, indent=2, ensure_ascii=False)
-        print(f"\n  ✅ Consolidated JSON saved")
+        dump_json({
+            'month': month_name,
+            'generated': datetime.now().isoformat(),
+            'total_emails': len(consolidated),
+            'emails': consolidated
+        }, json_out)
+        log.info(f"\n  ✅ Consolidated JSON saved")
 
 def process_all_months(source_dir, dest_dir):
     """Walk through all month folders."""
-    print("="*70)
-    print("📧 EMAIL ARCHIVE CONSOLIDATION - COMPLETE EDITION")
-    print("="*70)
-    print(f"Source: {source_dir}")
-    print(f"Destination: {dest_dir}")
-    print("-"*70)
+    log.info("="*70)
+    log.info("📧 EMAIL ARCHIVE CONSOLIDATION - COMPLETE EDITION")
+    log.info("="*70)
+    log.info(f"Source: {source_dir}")
+    log.info(f"Destination: {dest_dir}")
+    log.info("-"*70)
     
     # Check dependencies
-    print("\n🔍 Dependency check:")
+    log.info("\n🔍 Dependency check:")
     soffice = get_soffice_path()
     if soffice:
-        print(f"  ✅ LibreOffice: {soffice}")
+        log.info(f"  ✅ LibreOffice: {soffice}")
     else:
-        print("  ⚠️ LibreOffice not found - Office docs will be embedded only")
+        log.warning("  ⚠️ LibreOffice not found - Office docs will be embedded only")
     
-    print(f"  ✅ PyPDF2: {'yes' if PDF_AVAILABLE else 'no'}")
-    print(f"  ✅ reportlab: {'yes' if REPORTLAB_AVAILABLE else 'no'}")
-    print(f"  ✅ Pillow: {'yes' if PIL_AVAILABLE else 'no'}")
-    print(f"  ✅ img2pdf: {'yes' if IMG2PDF_AVAILABLE else 'no'}")
-    print(f"  ✅ pandas: {'yes' if PANDAS_AVAILABLE else 'no'}")
-    print(f"  ✅ xlrd: {'yes' if XLRD_AVAILABLE else 'no'}")
-    print(f"  ✅ openpyxl: {'yes' if OPENPYXL_AVAILABLE else 'no'}")
-    print(f"  ✅ textract: {'yes' if TEXTRACT_AVAILABLE else 'no'}")
-    print("-"*70)
+    log.info(f"  ✅ PDF library: {PDF_LIBRARY or 'no'}")
+    log.info(f"  ✅ pikepdf: {'yes' if PIKEPDF_AVAILABLE else 'no'}")
+    log.info(f"  ✅ reportlab: {'yes' if REPORTLAB_AVAILABLE else 'no'}")
+    log.info(f"  ✅ Pillow: {'yes' if PIL_AVAILABLE else 'no'}")
+    log.info(f"  ✅ img2pdf: {'yes' if IMG2PDF_AVAILABLE else 'no'}")
+    log.info(f"  ✅ pandas: {'yes' if PANDAS_AVAILABLE else 'no'}")
+    log.info(f"  ✅ xlrd: {'yes' if XLRD_AVAILABLE else 'no'}")
+    log.info(f"  ✅ openpyxl: {'yes' if OPENPYXL_AVAILABLE else 'no'}")
+    log.info(f"  ✅ textract: {'yes' if TEXTRACT_AVAILABLE else 'no'}")
+    log.info(f"  ✅ vobject: {'yes' if VOBJECT_AVAILABLE else 'no'}")
+    log.info(f"  ✅ orjson: {'yes' if ORJSON_AVAILABLE else 'no'}")
+    log.info("-"*70)
     
     os.makedirs(dest_dir, exist_ok=True)
     
     # Find month folders (YYYY-Mon)
-    month_folders = []
-    for item in os.listdir(source_dir):
-        path = os.path.join(source_dir, item)
-        if os.path.isdir(path) and re.match(r'\d{4}-[A-Z][a-z]{2}', item):
-            month_folders.append(path)
-    month_folders.sort()
-    print(f"\nFound {len(month_folders)} month folders")
+    with os.scandir(source_dir) as it:
+        month_folders = sorted(e.path for e in it
+                               if e.is_dir() and _MONTH_FOLDER_RE.match(e.name))
+    log.info(f"\nFound {len(month_folders)} month folders")
+    
+    # Start the shared LibreOffice server up front so its startup is paid once, not on the first document
+    if soffice and get_lo_server():
+        log.info("  ✅ LibreOffice server running")
     
     try:
         for mpath in month_folders:
@@ -1842,17 +2896,20 @@ def process_all_months(source_dir, dest_dir):
             dest_m = os.path.join(dest_dir, mname)
             process_month(mpath, dest_m)
     except ConversionError as e:
-        print("\n" + "="*70)
-        print(f"❌ CONVERSION FAILED - STOPPING")
-        print("="*70)
-        print(f"Error: {e}")
-        print("\nPlease fix the issue and run the program again.")
-        print(f"Failed while processing: {mpath if 'mpath' in locals() else 'unknown folder'}")
+        log.info("\n" + "="*70)
+        log.error(f"❌ CONVERSION FAILED - STOPPING")
+        log.info("="*70)
+        log.info(f"Error: {e}")
+        log.info("\nPlease fix the issue and run the program again.")
+        log.info(f"Failed while processing: {mpath if 'mpath' in locals() else 'unknown folder'}")
         sys.exit(1)
+    finally:
+        shutdown_lo_server()
+        prune_conversion_cache()
     
-    print("\n" + "="*70)
-    print("✅ CONSOLIDATION COMPLETE")
-    print("="*70)
+    log.info("\n" + "="*70)
+    log.info("✅ CONSOLIDATION COMPLETE")
+    log.info("="*70)
 
 # ========== MAIN ==========
 if __name__ == "__main__":
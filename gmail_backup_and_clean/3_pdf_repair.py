@@ -1,5 +1,10 @@
+import contextlib
+import functools
+import importlib.util
+import io
 import os
 import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import sys
 import subprocess
@@ -9,6 +14,7 @@ from PyPDF2 import PdfReader, PdfWriter
 SOURCE_DIR = "gmail_consolidated"
 DEST_DIR = "gmail_pdf_fixed"
 BASE_DIR = "C:/Users/ajipoynter/Desktop/BP/projects/study/gmail_mbox/"
+WORKERS = os.cpu_count() or 1  # PDFs fixed in parallel, one process each
 # =================
 
 def install_package(package):
@@ -25,10 +31,33 @@ def ensure_directory_exists(path):
     """Create directory if it doesn't exist"""
     Path(path).mkdir(parents=True, exist_ok=True)
 
+def scan_files(root, suffix):
+    """Yield the DirEntry of every file under root whose name ends with suffix (any case)"""
+    stack = [str(root)]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.lower().endswith(suffix):
+                    yield entry
+
+def find_files(root, suffix):
+    """Yield every file under root whose name ends with suffix (any case) - one scandir walk"""
+    for entry in scan_files(root, suffix):
+        yield Path(entry.path)
+
+def existing_outputs(root, suffix):
+    """{path relative to root: size in bytes} of the files already under root"""
+    return {Path(entry.path).relative_to(root): entry.stat().st_size
+            for entry in scan_files(root, suffix)}
+
 def fix_pdf_with_pypdf2(input_path, output_path):
     """
     Fix PDF by re-saving it with PyPDF2.
     This preserves text and formatting.
+    Like every fix method, returns (success, has_text); has_text is None when
+    the method doesn't look at the text.
     """
     try:
         # Read the original PDF
@@ -44,11 +73,11 @@ def fix_pdf_with_pypdf2(input_path, output_path):
         with open(output_path, 'wb') as output_file:
             writer.write(output_file)
         
-        return True
+        return True, None
         
     except Exception as e:
         print(f"  PyPDF2 error: {e}")
-        return False
+        return False, None
 
 def fix_pdf_with_pikepdf(input_path, output_path):
     """
@@ -65,11 +94,11 @@ def fix_pdf_with_pikepdf(input_path, output_path):
         pdf.save(output_path, compress_streams=True)
         pdf.close()
         
-        return True
+        return True, None
         
     except Exception as e:
         print(f"  pikepdf error: {e}")
-        return False
+        return False, None
 
 def fix_pdf_with_pymupdf(input_path, output_path):
     """
@@ -80,21 +109,26 @@ def fix_pdf_with_pymupdf(input_path, output_path):
         import fitz  # PyMuPDF
         
         # Open the PDF
-        doc = fitz.open(input_path)
+        with fitz.open(input_path) as doc:
+            # The text check done here saves reopening the output in verify_pdf_quality
+            has_text = page_has_text(doc)
+            
+            # Save with optimization options that preserve text
+            doc.save(output_path, 
+                    garbage=4,  # Remove unused objects
+                    deflate=True,  # Compress streams
+                    clean=True,  # Clean and sanitize
+                    linear=True)  # Linearize for web viewing
         
-        # Save with optimization options that preserve text
-        doc.save(output_path, 
-                garbage=4,  # Remove unused objects
-                deflate=True,  # Compress streams
-                clean=True,  # Clean and sanitize
-                linear=True)  # Linearize for web viewing
-        doc.close()
-        
-        return True
+        return True, has_text
         
     except Exception as e:
         print(f"  PyMuPDF error: {e}")
-        return False
+        return False, None
+
+def page_has_text(doc):
+    """True if the first page of an open PyMuPDF document has text"""
+    return len(doc) > 0 and len(doc[0].get_text().strip()) > 0
 
 def verify_pdf_quality(pdf_path):
     """
@@ -102,20 +136,71 @@ def verify_pdf_quality(pdf_path):
     """
     try:
         import fitz
-        doc = fitz.open(pdf_path)
-        
-        # Check first page for text
-        if len(doc) > 0:
-            page = doc[0]
-            text = page.get_text()
-            has_text = len(text.strip()) > 0
-            doc.close()
-            return has_text
-        doc.close()
-        return False
+        with fitz.open(pdf_path) as doc:
+            return page_has_text(doc)
     except:
         return False
 
+# Try different libraries in order of preference: (name, module, fix method)
+FIX_METHODS = [
+    ("PyMuPDF", "fitz", fix_pdf_with_pymupdf),
+    ("pikepdf", "pikepdf", fix_pdf_with_pikepdf),
+    ("PyPDF2", "PyPDF2", fix_pdf_with_pypdf2)
+]
+
+@functools.lru_cache(maxsize=None)
+def installed_fix_methods():
+    """(name, fix method) for the FIX_METHODS whose library is installed - checked once per process"""
+    return [(name, method) for name, module, method in FIX_METHODS
+            if importlib.util.find_spec(module) is not None]
+
+def process_one(task):
+    """
+    Fix one PDF (runs in a worker process).
+    Returns (rel_path, success, method_used, low_quality, output) where output is
+    everything printed along the way, so main() can show each file as one block.
+    """
+    input_path, output_path, rel_path = task
+    success = False
+    method_used = None
+    low_quality = False
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        print(f"  Input: {input_path}")
+        print(f"  Output: {output_path}")
+        
+        # Create subdirectory in destination if needed
+        ensure_directory_exists(output_path.parent)
+        
+        # Try each fix method until one works
+        has_text = None
+        for method_name, fix_method in installed_fix_methods():
+            try:
+                print(f"  Trying {method_name}...")
+                success, has_text = fix_method(input_path, output_path)
+                if success:
+                    method_used = method_name
+                    break
+            except Exception as e:
+                print(f"  {method_name} failed: {e}")
+                continue
+        
+        if success and output_path.exists() and output_path.stat().st_size > 1024:
+            print(f"  ✅ Successfully saved using {method_used}")
+            
+            # Check quality (unless the fix method already did)
+            if has_text is None:
+                has_text = verify_pdf_quality(output_path)
+            if has_text:
+                print(f"  ✅ Text is selectable")
+            else:
+                print(f"  ⚠️  Warning: Text may not be selectable")
+                low_quality = True
+        else:
+            success = False
+            print(f"  ❌ All methods failed for: {rel_path}")
+    return rel_path, success, method_used, low_quality, out.getvalue()
+
 def main():
     # Install required packages
     install_package("pypdf2")
@@ -146,18 +231,19 @@ def main():
     ensure_directory_exists(dst)
     
     # Get all PDFs recursively
-    all_pdfs = list(src.rglob("*.pdf")) + list(src.rglob("*.PDF"))
+    all_pdfs = list(find_files(src, ".pdf"))
     print(f"Found {len(all_pdfs)} total PDF files")
     
     # Filter out files that have already been processed
     pdfs_to_process = []
     already_done = []
+    done = existing_outputs(dst, ".pdf")  # one walk instead of a stat per source PDF
     
     for pdf in all_pdfs:
         rel_path = pdf.relative_to(src)
         output_path = dst / rel_path
         
-        if output_path.exists() and output_path.stat().st_size > 1024:
+        if done.get(rel_path, 0) > 1024:
             already_done.append(pdf)
             print(f"  ✅ Already exists: {rel_path}")
         else:
@@ -171,6 +257,9 @@ def main():
         print("\nAll files already fixed! Nothing to do.")
         return
     
+    importlib.invalidate_caches()  # see libraries install_package added
+    print(f"\nFix methods: {', '.join(name for name, _ in installed_fix_methods())}")
+    
     print("\n" + "="*60)
     print("Starting processing...")
     print("="*60)
@@ -180,49 +269,18 @@ def main():
     failed_files = []
     low_quality_files = []
     
-    # Try different libraries in order of preference
-    fix_methods = [
-        ("PyMuPDF", fix_pdf_with_pymupdf),
-        ("pikepdf", fix_pdf_with_pikepdf),
-        ("PyPDF2", fix_pdf_with_pypdf2)
-    ]
-    
-    for i, (input_path, output_path, rel_path) in enumerate(pdfs_to_process, 1):
-        print(f"\n[{i}/{len(pdfs_to_process)}] Processing: {rel_path}")
-        print(f"  Input: {input_path}")
-        print(f"  Output: {output_path}")
-        
-        # Create subdirectory in destination if needed
-        ensure_directory_exists(output_path.parent)
-        
-        # Try each fix method until one works
-        success = False
-        method_used = None
-        
-        for method_name, fix_method in fix_methods:
-            try:
-                print(f"  Trying {method_name}...")
-                if fix_method(input_path, output_path):
-                    success = True
-                    method_used = method_name
-                    break
-            except Exception as e:
-                print(f"  {method_name} failed: {e}")
-                continue
-        
-        if success and output_path.exists() and output_path.stat().st_size > 1024:
-            processed_count += 1
-            print(f"  ✅ Successfully saved using {method_used}")
-            
-            # Check quality
-            if verify_pdf_quality(output_path):
-                print(f"  ✅ Text is selectable")
+    # Every PDF is independent - fix them in parallel, reporting in input order
+    with ProcessPoolExecutor(max_workers=WORKERS) as executor:
+        results = executor.map(process_one, pdfs_to_process, chunksize=4)
+        for i, (rel_path, success, method_used, low_quality, output) in enumerate(results, 1):
+            print(f"\n[{i}/{len(pdfs_to_process)}] Processing: {rel_path}")
+            print(output, end='')
+            if success:
+                processed_count += 1
+                if low_quality:
+                    low_quality_files.append(rel_path)
             else:
-                print(f"  ⚠️  Warning: Text may not be selectable")
-                low_quality_files.append(rel_path)
-        else:
-            print(f"  ❌ All methods failed for: {rel_path}")
-            failed_files.append(rel_path)
+                failed_files.append(rel_path)
     
     # Final summary
     print("\n" + "="*60)
@@ -1,11 +1,23 @@
+import argparse
+import functools
 import os
 import subprocess
 import shutil
+import tempfile
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import sys
 
+# pikepdf (QPDF) recompresses small PDFs in-process, no Ghostscript run needed
+try:
+    import pikepdf
+    PIKEPDF_AVAILABLE = True
+except ImportError:
+    pikepdf = None
+    PIKEPDF_AVAILABLE = False
+
 # ===== CONFIG =====
 SOURCE_DIR = "gmail_pdf_fixed"
 OUTPUT_DIR = "gmail_pdf_compressed"
@@ -13,12 +25,37 @@ BASE_DIR = "C:/Users/ajipoynter/Desktop/BP/projects/study/gmail_mbox/"
 
 COMPRESSION_LEVEL = "ebook"
 ALWAYS_KEEP_SMALLEST = True
+MIN_COMPRESS_MB = 0.1  # PDFs smaller than this are copied as they are
+PIKEPDF_MAX_MB = 2  # PDFs up to this size without images are compressed with pikepdf (Ghostscript otherwise)
 TIMEOUT_SECONDS = 60  # Maximum seconds to wait for Ghostscript
+JOBS = os.cpu_count() or 1  # Ghostscript processes run at once (each uses one core)
+GS_VM_THRESHOLD = 500_000_000  # bytes Ghostscript may allocate before garbage collecting
 # =================
 
 def ensure_directory_exists(path):
     Path(path).mkdir(parents=True, exist_ok=True)
 
+def scan_files(root, suffix):
+    """Yield the DirEntry of every file under root whose name ends with suffix (any case)"""
+    stack = [str(root)]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.lower().endswith(suffix):
+                    yield entry
+
+def find_files(root, suffix):
+    """Yield every file under root whose name ends with suffix (any case) - one scandir walk"""
+    for entry in scan_files(root, suffix):
+        yield Path(entry.path)
+
+def existing_outputs(root, suffix):
+    """{path relative to root: size in bytes} of the files already under root"""
+    return {Path(entry.path).relative_to(root): entry.stat().st_size
+            for entry in scan_files(root, suffix)}
+
 def get_file_size_mb(file_path):
     return file_path.stat().st_size / (1024 * 1024)
 
@@ -48,7 +85,7 @@ def find_ghostscript():
     
     return None
 
-def run_with_timeout(cmd, timeout_seconds):
+def run_with_timeout(cmd, timeout_seconds, out=print):
     """Run a command with timeout, returns (success, stdout, stderr)"""
     
     process = None
@@ -67,7 +104,7 @@ def run_with_timeout(cmd, timeout_seconds):
         return process.returncode == 0, stdout, stderr
         
     except subprocess.TimeoutExpired:
-        print(f"  ⏰ Ghostscript timed out after {timeout_seconds} seconds")
+        out(f"  ⏰ Ghostscript timed out after {timeout_seconds} seconds")
         if process:
             try:
                 process.terminate()
@@ -78,60 +115,328 @@ def run_with_timeout(cmd, timeout_seconds):
         return False, "", "Timeout expired"
         
     except Exception as e:
-        print(f"  Error running Ghostscript: {e}")
+        out(f"  Error running Ghostscript: {e}")
         return False, "", str(e)
 
-def compress_with_ghostscript(input_path, output_path, level="ebook", timeout=60):
+def ghostscript_options(level):
+    """pdfwrite options shared by single-file and batch runs"""
+    settings_map = {
+        "screen": "screen",
+        "ebook": "ebook",
+        "printer": "printer",
+        "prepress": "prepress"
+    }
+    
+    gs_settings = settings_map.get(level, "ebook")
+    
+    return [
+        "-sDEVICE=pdfwrite",
+        f"-dPDFSETTINGS=/{gs_settings}",
+        "-dCompatibilityLevel=1.4",
+        "-dNOPAUSE",
+        "-dQUIET",
+        "-dBATCH",
+        "-dDetectDuplicateImages",
+        "-dCompressFonts=true",
+        "-dEmbedAllFonts=true",
+        "-dSubsetFonts=true",
+        "-dAutoRotatePages=/None",
+    ]
+
+def ghostscript_vm_setup():
+    """PostScript run before the input: a higher VM threshold means fewer garbage
+    collections on image-heavy PDFs. -f ends the -c code."""
+    return ["-c", f"{GS_VM_THRESHOLD} setvmthreshold", "-f"]
+
+def ps_string(path):
+    """A path as a PostScript string literal"""
+    escaped = Path(path).as_posix().replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+    return f"({escaped})"
+
+def compress_with_ghostscript(input_path, output_path, level="ebook", timeout=60, out=print):
     """
-    Compress PDF using Ghostscript with timeout
+    Compress PDF using Ghostscript with timeout.
+    Messages go to out (print by default).
     """
     try:
         gs_exe = find_ghostscript()
         if not gs_exe:
-            print("  ❌ Ghostscript not found")
+            out("  ❌ Ghostscript not found")
             return False
         
-        settings_map = {
-            "screen": "screen",
-            "ebook": "ebook",
-            "printer": "printer",
-            "prepress": "prepress"
-        }
-        
-        gs_settings = settings_map.get(level, "ebook")
-        
         cmd = [
             gs_exe,
-            "-sDEVICE=pdfwrite",
-            f"-dPDFSETTINGS=/{gs_settings}",
-            "-dCompatibilityLevel=1.4",
-            "-dNOPAUSE",
-            "-dQUIET",
-            "-dBATCH",
-            "-dDetectDuplicateImages",
-            "-dCompressFonts=true",
-            "-dEmbedAllFonts=true",
-            "-dSubsetFonts=true",
-            "-dAutoRotatePages=/None",
+            *ghostscript_options(level),
             "-sOutputFile=" + str(output_path),
+            *ghostscript_vm_setup(),
             str(input_path)
         ]
         
         # Run with timeout
-        success, stdout, stderr = run_with_timeout(cmd, timeout)
+        success, stdout, stderr = run_with_timeout(cmd, timeout, out)
         
         if not success:
             if "Timeout" not in stderr:  # Don't show timeout as error
-                print(f"  Ghostscript error: {stderr}")
+                out(f"  Ghostscript error: {stderr}")
             return False
         
         return True
         
     except Exception as e:
-        print(f"  Error: {e}")
+        out(f"  Error: {e}")
+        return False
+
+class GhostscriptServer:
+    """
+    A long-lived Ghostscript process that compresses PDFs sent to it as
+    PostScript on stdin, so the interpreter, fonts and ICC profiles are set up
+    once instead of for every file. Not thread-safe - one per worker thread.
+    """
+    SENTINEL = "%%JOB_DONE"
+    # Ghostscript reads the bytes of file-name strings as UTF-8, whatever the locale
+    ENCODING = "utf-8"
+    
+    def __init__(self, gs_exe, level, permit_dirs):
+        self.gs_exe = gs_exe
+        self.level = level
+        self.permit_dirs = permit_dirs
+        self.process = None
+        self.jobs = 0
+        # pdfwrite only finishes an output file when switched to the next one,
+        # so after every job it is pointed back at this scratch file
+        fd, self.idle_output = tempfile.mkstemp(prefix='gs_idle_', suffix='.pdf')
+        os.close(fd)
+    
+    def start(self):
+        cmd = [
+            self.gs_exe,
+            *ghostscript_options(self.level),
+            *[f"--permit-file-all={Path(d).as_posix()}/" for d in self.permit_dirs],
+            f"--permit-file-all={Path(self.idle_output).as_posix()}",
+            "-sOutputFile=" + self.idle_output,
+            *ghostscript_vm_setup(),
+            "-"  # read PostScript from stdin until it is closed
+        ]
+        self.process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT
+        )
+    
+    def compress(self, input_path, output_path, timeout=60):
+        """
+        Compress one PDF. Returns (success, timed_out, messages); after a
+        failure the process is stopped and restarted on the next call.
+        """
+        if self.process is None or self.process.poll() is not None:
+            self.start()
+        self.jobs += 1
+        done = f"{self.SENTINEL} {self.jobs}"
+        done_bytes = done.encode(self.ENCODING)
+        # 'stopped' catches PostScript errors so one bad PDF can't end the server
+        job = (f"{{ << /OutputFile {ps_string(output_path)} >> setpagedevice "
+               f"{ps_string(input_path)} run }} stopped "
+               f"<< /OutputFile {ps_string(self.idle_output)} >> setpagedevice "
+               f"{{ (FAILED ) }} {{ (OK ) }} ifelse print ({done}\\n) print flush\n")
+        
+        killed = threading.Event()
+        process = self.process
+        watchdog = threading.Timer(timeout, lambda: (killed.set(), process.kill()))
+        watchdog.start()
+        messages = []
+        success = False
+        try:
+            self.process.stdin.write(job.encode(self.ENCODING))
+            self.process.stdin.flush()
+            for line in self.process.stdout:
+                if done_bytes in line:
+                    success = line.startswith(b"OK")
+                    break
+                messages.append(line.decode(self.ENCODING, errors='replace').rstrip())
+        except Exception as e:
+            messages.append(str(e))
+        finally:
+            watchdog.cancel()
+        
+        timed_out = killed.is_set()
+        if not success:
+            self.stop()
+        return success, timed_out, "\n".join(messages)
+    
+    def stop(self):
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=10)
+        except Exception:
+            self.process.kill()
+        self.process = None
+    
+    def close(self):
+        self.stop()
+        try:
+            os.unlink(self.idle_output)
+        except OSError:
+            pass
+
+# One server per worker thread, all stopped when main() is done
+_thread_state = threading.local()
+_servers = []
+_servers_lock = threading.Lock()
+
+def get_server(src, dst):
+    """This thread's Ghostscript server (None if Ghostscript is missing)"""
+    server = getattr(_thread_state, 'server', None)
+    if server is None:
+        gs_exe = find_ghostscript()
+        if not gs_exe:
+            return None
+        server = GhostscriptServer(gs_exe, COMPRESSION_LEVEL, [src, dst])
+        _thread_state.server = server
+        with _servers_lock:
+            _servers.append(server)
+    return server
+
+def stop_servers():
+    with _servers_lock:
+        for server in _servers:
+            server.close()
+        _servers.clear()
+
+def compress_with_server(input_path, output_path, src, dst, timeout=60, out=print):
+    """
+    Compress a PDF on this thread's Ghostscript server. Anything it fails on
+    (other than a timeout) gets one more try in a fresh Ghostscript process.
+    """
+    server = get_server(src, dst)
+    if server is not None:
+        try:
+            success, timed_out, messages = server.compress(input_path, output_path, timeout)
+        except Exception as e:
+            success, timed_out, messages = False, False, str(e)
+        if success:
+            return True
+        if timed_out:
+            out(f"  ⏰ Ghostscript timed out after {timeout} seconds")
+            return False
+        if messages:
+            out(f"  Ghostscript server error: {messages}")
+    return compress_with_ghostscript(input_path, output_path, COMPRESSION_LEVEL, timeout, out)
+
+def compress_with_pikepdf(input_path, output_path, out=print):
+    """
+    Compress a PDF in-process with pikepdf: recompressed streams, object streams,
+    linearized. Unlike Ghostscript it leaves images as they are, so PDFs with
+    images are refused (returns False) and left to Ghostscript's downsampling.
+    """
+    try:
+        with pikepdf.open(input_path) as pdf:
+            if any(isinstance(obj, pikepdf.Stream) and obj.get('/Subtype') == '/Image'
+                   for obj in pdf.objects):
+                out(f"  🖼️  Contains images - using Ghostscript")
+                return False
+            pdf.save(output_path,
+                     compress_streams=True,
+                     recompress_flate=True,
+                     object_stream_mode=pikepdf.ObjectStreamMode.generate,
+                     linearize=True)
+        return True
+    except Exception as e:
+        out(f"  pikepdf error: {e} - trying Ghostscript")
         return False
 
-def main():
+def compress_one(pdf_path, src, dst, done):
+    """
+    Compress one PDF into dst (runs on a worker thread). done maps the
+    relative paths already in dst to their size in bytes.
+    Returns a stats dict: rel_path, original_size, final_size, the result
+    ('smaller', 'kept', 'timed_out' or 'failed') and the progress lines.
+    """
+    lines = []
+    out = lines.append
+    rel_path = pdf_path.relative_to(src)
+    output_path = dst / rel_path
+    stats = {'rel_path': rel_path, 'lines': lines}
+    
+    ensure_directory_exists(output_path.parent)
+    
+    original_size = get_file_size_mb(pdf_path)
+    stats['original_size'] = original_size
+    
+    out(f"  Original: {format_size(original_size)}")
+    
+    if rel_path in done:
+        final_size = done[rel_path] / (1024 * 1024)
+        out(f"  ⏭️  Output already exists: {format_size(final_size)}")
+        stats['final_size'] = final_size
+        stats['result'] = 'smaller' if final_size < original_size else 'kept'
+        return stats
+    
+    if original_size < MIN_COMPRESS_MB:
+        # Too small for Ghostscript to save anything worth its run time
+        shutil.copy2(pdf_path, output_path)
+        out(f"  ℹ️  Under {format_size(MIN_COMPRESS_MB)}, copied original")
+        stats['final_size'] = original_size
+        stats['result'] = 'kept'
+        return stats
+    
+    temp_path = output_path.with_suffix('.temp.pdf')
+    
+    out(f"  ⏳ Compressing (timeout: {TIMEOUT_SECONDS}s)...")
+    start_time = time.time()
+    success = (PIKEPDF_AVAILABLE and original_size <= PIKEPDF_MAX_MB
+               and compress_with_pikepdf(pdf_path, temp_path, out))
+    if not success:
+        success = compress_with_server(pdf_path, temp_path, src, dst, TIMEOUT_SECONDS, out)
+    elapsed = time.time() - start_time
+    
+    if success and temp_path.exists():
+        compressed_size = get_file_size_mb(temp_path)
+        out(f"  ⏱️  Compression took {elapsed:.1f} seconds")
+        
+        if compressed_size < original_size or not ALWAYS_KEEP_SMALLEST:
+            shutil.move(temp_path, output_path)
+            stats['final_size'] = compressed_size
+            
+            if compressed_size < original_size:
+                stats['result'] = 'smaller'
+                out(f"  ✅ Compressed: {format_size(compressed_size)} (saved {((original_size - compressed_size)/original_size*100):.1f}%)")
+            else:
+                stats['result'] = 'kept'
+                out(f"  ⚠️  Compressed: {format_size(compressed_size)} (larger than original, but saved anyway)")
+        else:
+            # Compressed version is larger, keep original
+            shutil.copy2(pdf_path, output_path)
+            stats['final_size'] = original_size
+            stats['result'] = 'kept'
+            
+            out(f"  ℹ️  Compressed was larger ({format_size(compressed_size)}), kept original")
+            if temp_path.exists():
+                temp_path.unlink()
+        
+        out(f"  📁 Saved to: {output_path.relative_to(Path(BASE_DIR))}")
+        
+    else:
+        # Compression failed or timed out, copy original
+        if elapsed >= TIMEOUT_SECONDS:
+            stats['result'] = 'timed_out'
+            out(f"  ⏰ Timed out after {TIMEOUT_SECONDS}s, copying original...")
+        else:
+            stats['result'] = 'failed'
+            out(f"  ❌ Compression failed, copying original...")
+        
+        shutil.copy2(pdf_path, output_path)
+        stats['final_size'] = original_size
+        out(f"  📁 Copied original to: {output_path.relative_to(Path(BASE_DIR))}")
+        
+        if temp_path.exists():
+            temp_path.unlink()
+    
+    return stats
+
+def main(jobs=JOBS):
     src = Path(BASE_DIR) / SOURCE_DIR
     dst = Path(BASE_DIR) / OUTPUT_DIR
     
@@ -143,7 +448,11 @@ def main():
     print(f"Destination: {dst}")
     print(f"Compression level: {COMPRESSION_LEVEL}")
     print(f"Always keep smallest: {ALWAYS_KEEP_SMALLEST}")
+    print(f"Copied without compressing: under {format_size(MIN_COMPRESS_MB)}")
+    if PIKEPDF_AVAILABLE:
+        print(f"Compressed with pikepdf: up to {format_size(PIKEPDF_MAX_MB)}")
     print(f"Timeout: {TIMEOUT_SECONDS} seconds")
+    print(f"Parallel jobs: {jobs}")
     print("-"*70)
     
     if not src.exists():
@@ -164,7 +473,7 @@ def main():
     ensure_directory_exists(dst)
     print(f"✅ Destination directory ready: {dst}")
     
-    all_pdfs = list(src.rglob("*.pdf")) + list(src.rglob("*.PDF"))
+    all_pdfs = list(find_files(src, ".pdf"))
     print(f"\nFound {len(all_pdfs)} PDF files to process")
     
     if not all_pdfs:
@@ -179,83 +488,34 @@ def main():
     compressed_smaller = 0
     timed_out = 0
     
-    for i, pdf_path in enumerate(all_pdfs, 1):
-        rel_path = pdf_path.relative_to(src)
-        output_path = dst / rel_path
-        
-        ensure_directory_exists(output_path.parent)
-        
-        original_size = get_file_size_mb(pdf_path)
-        total_original_size += original_size
-        
-        print(f"\n[{i}/{len(all_pdfs)}] Processing: {rel_path}")
-        print(f"  Original: {format_size(original_size)}")
-        
-        if output_path.exists():
-            final_size = get_file_size_mb(output_path)
-            print(f"  ⏭️  Output already exists: {format_size(final_size)}")
-            total_final_size += final_size
-            successful += 1
-            
-            if final_size < original_size:
-                compressed_smaller += 1
-            else:
-                kept_original += 1
-            continue
-        
-        temp_path = output_path.with_suffix('.temp.pdf')
-        
-        print(f"  ⏳ Compressing (timeout: {TIMEOUT_SECONDS}s)...")
-        start_time = time.time()
-        success = compress_with_ghostscript(pdf_path, temp_path, COMPRESSION_LEVEL, TIMEOUT_SECONDS)
-        elapsed = time.time() - start_time
-        
-        if success and temp_path.exists():
-            compressed_size = get_file_size_mb(temp_path)
-            print(f"  ⏱️  Compression took {elapsed:.1f} seconds")
+    # Each worker thread feeds its own Ghostscript server process (each uses
+    # one core), so threads are enough to keep every core busy
+    # Outputs from an earlier run, from one walk of dst instead of a stat per PDF
+    done = existing_outputs(dst, ".pdf")
+    compress = functools.partial(compress_one, src=src, dst=dst, done=done)
+    try:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            for i, stats in enumerate(executor.map(compress, all_pdfs), 1):
+                print(f"\n[{i}/{len(all_pdfs)}] Processing: {stats['rel_path']}")
+                for line in stats['lines']:
+                    print(line)
             
-            if compressed_size < original_size or not ALWAYS_KEEP_SMALLEST:
-                shutil.move(temp_path, output_path)
-                final_size = compressed_size
-                total_final_size += final_size
-                successful += 1
-                
-                if compressed_size < original_size:
-                    compressed_smaller += 1
-                    print(f"  ✅ Compressed: {format_size(compressed_size)} (saved {((original_size - compressed_size)/original_size*100):.1f}%)")
+                total_original_size += stats['original_size']
+                total_final_size += stats['final_size']
+                result = stats['result']
+                if result == 'timed_out':
+                    timed_out += 1
+                elif result == 'failed':
+                    failed += 1
                 else:
-                    kept_original += 1
-                    print(f"  ⚠️  Compressed: {format_size(compressed_size)} (larger than original, but saved anyway)")
-            else:
-                # Compressed version is larger, keep original
-                shutil.copy2(pdf_path, output_path)
-                final_size = original_size
-                total_final_size += final_size
-                successful += 1
-                kept_original += 1
-                
-                print(f"  ℹ️  Compressed was larger ({format_size(compressed_size)}), kept original")
-                if temp_path.exists():
-                    temp_path.unlink()
-            
-            print(f"  📁 Saved to: {output_path.relative_to(Path(BASE_DIR))}")
-            
-        else:
-            # Compression failed or timed out, copy original
-            if elapsed >= TIMEOUT_SECONDS:
-                timed_out += 1
-                print(f"  ⏰ Timed out after {TIMEOUT_SECONDS}s, copying original...")
-            else:
-                failed += 1
-                print(f"  ❌ Compression failed, copying original...")
-            
-            shutil.copy2(pdf_path, output_path)
-            final_size = original_size
-            total_final_size += final_size
-            print(f"  📁 Copied original to: {output_path.relative_to(Path(BASE_DIR))}")
-            
-            if temp_path.exists():
-                temp_path.unlink()
+                    successful += 1
+                    if result == 'smaller':
+                        compressed_smaller += 1
+                    else:
+                        kept_original += 1
+    finally:
+        # Never leave Ghostscript servers behind, even if a file blew up the run
+        stop_servers()
     
     # Summary
     print("\n" + "="*70)
@@ -283,4 +543,8 @@ def main():
     print("="*70)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Compress PDFs with Ghostscript")
+    parser.add_argument("--jobs", type=int, default=JOBS,
+                        help=f"Ghostscript processes to run in parallel (default: {JOBS})")
+    args = parser.parse_args()
+    main(jobs=max(1, args.jobs))
\ No newline at end of file
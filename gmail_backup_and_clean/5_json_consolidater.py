@@ -1,63 +1,146 @@
+import functools
 import json
+import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import sys
 from datetime import datetime
 
+# orjson parses several times faster than the json module - used when installed
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
 # ===== CONFIG =====
 SOURCE_DIR = "gmail_consolidated"  # Original directory with PDFs and JSONs
 DEST_DIR = "gmail_pdf_fixed"  # Compressed directory (where JSONs should go)
 BASE_DIR = "C:/Users/ajipoynter/Desktop/BP/projects/study/gmail_mbox/"  # Parent directory
 
 MASTER_JSON_NAME = "master_metadata.json"  # Name of the master JSON file
+COPY_THREADS = 32  # JSON files read and copied at once (the work is all file I/O)
 # =================
 
 def ensure_directory_exists(path):
     """Create directory if it doesn't exist"""
     Path(path).mkdir(parents=True, exist_ok=True)
 
+def find_files(root, suffix):
+    """Yield every file under root whose name ends with suffix (any case) - one scandir walk"""
+    stack = [str(root)]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.lower().endswith(suffix):
+                    yield Path(entry.path)
+
 def find_json_files(directory):
     """Find all JSON files in directory structure"""
-    return list(Path(directory).rglob("*.json"))
+    return list(find_files(directory, ".json"))
 
-def load_json_file(json_path):
-    """Load and parse a JSON file"""
+def load_json_file(json_path, out=print, raw=None):
+    """Load and parse a JSON file (orjson when available). raw: its bytes, if already read"""
     try:
+        if raw is not None:
+            # Only BOM-less UTF-8 counts as valid (like the text-mode reader below):
+            # create_master_json splices these bytes into a UTF-8 file as they are.
+            # json.loads(bytes) would also accept a BOM or UTF-16; orjson never does
+            return orjson.loads(raw) if ORJSON_AVAILABLE else json.loads(raw.decode('utf-8'))
+        if ORJSON_AVAILABLE:
+            with open(json_path, 'rb') as f:
+                return orjson.loads(f.read())
         with open(json_path, 'r', encoding='utf-8') as f:
             return json.load(f)
     except Exception as e:
-        print(f"  ⚠️  Error loading {json_path}: {e}")
+        out(f"  ⚠️  Error loading {json_path}: {e}")
         return None
 
 def get_relative_path(file_path, base_path):
     """Get path relative to base directory"""
     return file_path.relative_to(base_path)
 
-def create_master_json(all_metadata, output_path):
-    """Create a master JSON file with all metadata"""
-    
-    # Organize metadata by relative path
-    master_data = {
+def create_master_json(sources, output_path):
+    """
+    Create a master JSON file with all metadata.
+    sources is a list of (rel_path, json_path) for already-validated JSON files;
+    each file's bytes are copied straight in rather than parsed and re-serialized.
+    """
+    header = {
         "generated": datetime.now().isoformat(),
         "source_directory": SOURCE_DIR,
         "destination_directory": DEST_DIR,
-        "total_json_files": len(all_metadata),
-        "files": {}
+        "total_json_files": len(sources),
     }
     
-    # Add each file's metadata
-    for rel_path, metadata in all_metadata.items():
-        master_data["files"][str(rel_path)] = metadata
-    
     # Save master JSON
     try:
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(master_data, f, indent=2, ensure_ascii=False)
+        with open(output_path, 'wb') as f:
+            # The header fields, then a "files" object keyed by relative path
+            f.write(json.dumps(header, indent=2, ensure_ascii=False)[:-2].encode('utf-8'))
+            f.write(b',\n  "files": {')
+            for i, (rel_path, json_path) in enumerate(sources):
+                key = json.dumps(str(rel_path), ensure_ascii=False)
+                f.write(f'{"," if i else ""}\n    {key}: '.encode('utf-8'))
+                with open(json_path, 'rb') as src:
+                    shutil.copyfileobj(src, f)
+            f.write(b'\n  }\n}')
         return True
     except Exception as e:
         print(f"  ❌ Error creating master JSON: {e}")
         return False
 
+def process_one_json(json_path, src, dst):
+    """
+    Check one JSON parses and copy it into dst (runs on a worker thread).
+    Returns (rel_path, valid, status, lines): status is 'copied', 'skipped' or
+    'error', lines the progress messages.
+    """
+    lines = []
+    out = lines.append
+    
+    # Get relative path
+    rel_path = json_path.relative_to(src)
+    
+    # Construct destination path
+    dest_path = dst / rel_path
+    
+    # Read the file once: the same bytes are parsed and written to the destination
+    try:
+        with open(json_path, 'rb') as f:
+            raw = f.read()
+    except OSError:
+        raw = None  # load_json_file reports it, copy2 gets a second chance
+    
+    # Check the JSON parses before it goes into the master JSON
+    valid = bool(load_json_file(json_path, out, raw))
+    
+    # Check if destination already exists
+    if dest_path.exists():
+        out(f"  ⏭️  Already exists in destination, skipping...")
+        return rel_path, valid, 'skipped', lines
+    
+    # Create subdirectory in destination if needed
+    ensure_directory_exists(dest_path.parent)
+    
+    try:
+        # Copy JSON file (contents already in memory, then timestamps/permissions)
+        if raw is None:
+            shutil.copy2(json_path, dest_path)
+        else:
+            with open(dest_path, 'wb') as f:
+                f.write(raw)
+            shutil.copystat(json_path, dest_path)
+        out(f"  ✅ Copied to: {dest_path.relative_to(Path(BASE_DIR))}")
+        return rel_path, valid, 'copied', lines
+    except Exception as e:
+        out(f"  ❌ Error copying: {e}")
+        return rel_path, valid, 'error', lines
+
 def main():
     # Setup paths
     src = Path(BASE_DIR) / SOURCE_DIR
@@ -93,40 +176,24 @@ def main():
     copied_count = 0
     skipped_count = 0
     error_count = 0
-    all_metadata = {}
-    
-    # Process each JSON file
-    for i, json_path in enumerate(json_files, 1):
-        # Get relative path
-        rel_path = json_path.relative_to(src)
-        
-        # Construct destination path
-        dest_path = dst / rel_path
-        
-        print(f"\n[{i}/{len(json_files)}] Processing: {rel_path}")
-        
-        # Load metadata for master JSON
-        metadata = load_json_file(json_path)
-        if metadata:
-            all_metadata[str(rel_path)] = metadata
-        
-        # Check if destination already exists
-        if dest_path.exists():
-            print(f"  ⏭️  Already exists in destination, skipping...")
-            skipped_count += 1
-            continue
-        
-        # Create subdirectory in destination if needed
-        ensure_directory_exists(dest_path.parent)
-        
-        try:
-            # Copy JSON file
-            shutil.copy2(json_path, dest_path)
-            copied_count += 1
-            print(f"  ✅ Copied to: {dest_path.relative_to(Path(BASE_DIR))}")
-        except Exception as e:
-            error_count += 1
-            print(f"  ❌ Error copying: {e}")
+    master_sources = []  # (rel_path, json_path) of every readable JSON
+    
+    # Process the JSON files on a thread pool (I/O overlaps); results come back in order
+    with ThreadPoolExecutor(max_workers=COPY_THREADS) as executor:
+        results = executor.map(functools.partial(process_one_json, src=src, dst=dst), json_files)
+        for i, (json_path, (rel_path, valid, status, lines)) in enumerate(zip(json_files, results), 1):
+            print(f"\n[{i}/{len(json_files)}] Processing: {rel_path}")
+            for line in lines:
+                print(line)
+            
+            if valid:
+                master_sources.append((rel_path, json_path))
+            if status == 'copied':
+                copied_count += 1
+            elif status == 'skipped':
+                skipped_count += 1
+            else:
+                error_count += 1
     
     # Create master JSON
     print("\n" + "-"*70)
@@ -134,9 +201,9 @@ def main():
     
     master_json_path = dst / MASTER_JSON_NAME
     
-    if create_master_json(all_metadata, master_json_path):
+    if create_master_json(master_sources, master_json_path):
         print(f"✅ Master JSON created: {master_json_path.relative_to(Path(BASE_DIR))}")
-        print(f"   Contains metadata for {len(all_metadata)} files")
+        print(f"   Contains metadata for {len(master_sources)} files")
     else:
         print("❌ Failed to create master JSON")
     
@@ -1,78 +1,235 @@
 import json
+import mmap
+import os
 import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+# Optional streaming parser - emails are read one file entry at a time
+# instead of loading the whole master JSON into memory
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    ijson = None
+    IJSON_AVAILABLE = False
+
+# Optional Aho-Corasick matcher - finds every search term in one pass over the text
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    ahocorasick = None
+    AHOCORASICK_AVAILABLE = False
 
 # ===== CONFIGURATION =====
 json_file = "C:/Users/ajipoynter/Desktop/BP/projects/study/gmail_mbox/master_metadata.json"  # Your input file
 search_terms = ["dcod", "ngc"]  # Change these to your keywords
+workers = os.cpu_count() or 1  # Processes searching in parallel (1 = search inline)
+shard_size = 50  # Master JSON file entries handed to a worker at a time
 # =========================
 
+_WHITESPACE_RE = re.compile(r'\s+')
+# A JSON string (escapes included) or a bracket - enough to find where values end
+_JSON_TOKEN_RE = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"|[{}\[\]]')
+
 def clean_text(text):
     """Remove extra whitespace and clean up text."""
     if not text:
         return ""
-    return re.sub(r'\s+', ' ', str(text)).strip()
+    return _WHITESPACE_RE.sub(' ', str(text)).strip()
+
+def iter_files(path):
+    """Yield (filename, file_data) for each entry of the master JSON's 'files' map."""
+    if IJSON_AVAILABLE:
+        with open(path, 'rb') as f:
+            yield from ijson.kvitems(f, 'files', use_float=True)
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            yield from json.load(f).get('files', {}).items()
+
+def iter_raw_files(path):
+    """
+    Yield (filename, raw JSON bytes) for each entry of the master JSON's 'files' map.
+    Only brackets are followed (strings are skipped whole by the regex), so nothing
+    is parsed until search_shard decides an entry is worth it.
+    """
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        depth = 0
+        in_files = False
+        last_key = key = start = None
+        for m in _JSON_TOKEN_RE.finditer(mm):
+            c = mm[m.start()]
+            if c == 0x22:  # a string
+                if depth == 1 and not in_files:
+                    last_key = m
+                elif depth == 2 and in_files and start is None:
+                    key = m
+            elif c in b'{[':
+                depth += 1
+                if depth == 2 and not in_files and c == 0x7b and last_key and last_key.group() == b'"files"':
+                    in_files = True
+                elif depth == 3 and in_files:
+                    start = m.start()
+            else:
+                depth -= 1
+                if in_files and depth == 2 and start is not None:
+                    yield json.loads(key.group()), mm[start:m.end()]
+                    key = start = None
+                elif in_files and depth == 1:
+                    return  # end of 'files'
 
-# Load the data
-try:
-    with open(json_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    print(f"Loaded file with {data.get('total_json_files', 0)} files")
-except Exception as e:
-    print(f"Error: {e}")
-    exit()
-
-# Create search string for filename
-search_string = "_".join(search_terms).replace(" ", "_")
-output_file = f"search_return_{search_string}.txt"
-
-matches = []
 search_terms_lower = [term.lower() for term in search_terms]
 
-# Navigate through the nested structure
-for filename, file_data in data.get('files', {}).items():
-    emails = file_data.get('emails', [])
+# Words that must all appear in a file entry's raw JSON for any of its emails to
+# match. Words JSON might escape (quotes, backslashes, non-ASCII...) are left out,
+# so the check can only let extra entries through, never drop a match.
+raw_filter_words = sorted({
+    word.encode('ascii')
+    for term in search_terms_lower
+    for word in term.split()
+    if word.isascii() and word.isprintable() and not set(word) & set('"\\/')
+})
+
+if AHOCORASICK_AVAILABLE:
+    automaton = ahocorasick.Automaton()
+    for term in search_terms_lower:
+        automaton.add_word(term, term)
+    automaton.make_automaton()
+    all_terms = set(search_terms_lower)
+
+def email_matches(email):
+    """True if ALL search terms appear in the email's text fields (AND logic)."""
+    fields = (
+        email.get('subject') or '',
+        email.get('body') or '',
+        email.get('from') or '',
+        email.get('to') or '',
+        ' '.join(email.get('tags') or [])
+    )
+    if AHOCORASICK_AVAILABLE:
+        # One sweep per field for all terms together, stopping once every term is seen
+        seen = set()
+        for field in fields:
+            seen.update(term for _, term in automaton.iter(field.lower()))
+            if seen >= all_terms:
+                return True
+        return False
     
-    # Search through emails in this file
-    for email in emails:
-        # Combine all text fields for searching
-        searchable = ' '.join([
-            email.get('subject', ''),
-            email.get('body', ''),
-            email.get('from', ''),
-            email.get('to', ''),
-            ' '.join(email.get('tags', []))
-        ]).lower()
-        
-        # Check if ALL terms are present (AND logic)
-        if all(term in searchable for term in search_terms_lower):
-            matches.append(email)
-
-# Write results to file
-with open(output_file, 'w', encoding='utf-8') as f:
-    f.write(f"Search Results for: {', '.join(search_terms)}\n")
-    f.write(f"Found: {len(matches)} matching emails\n")
-    f.write("=" * 80 + "\n\n")
+    # Lowercase each field once (no combined copy), stopping at the first missing term
+    lowered = [field.lower() for field in fields]
+    return all(any(term in field for field in lowered) for term in search_terms_lower)
+
+def search_shard(shard):
+    """Return the matching emails from a list of (filename, file_data) entries.
+    file_data may be raw JSON bytes (see iter_raw_files), parsed only if it can match."""
+    matches = []
+    for filename, file_data in shard:
+        if isinstance(file_data, bytes):
+            lowered = file_data.lower()
+            if not all(word in lowered for word in raw_filter_words):
+                continue
+            file_data = json.loads(file_data)
+        matches.extend(email for email in file_data.get('emails', []) if email_matches(email))
+    return matches
+
+def iter_shards(path):
+    """Group the master JSON's file entries into lists of shard_size."""
+    # Raw entries when the terms give something to prefilter on, parsed ones otherwise
+    entries = iter_raw_files(path) if raw_filter_words else iter_files(path)
+    while shard := list(islice(entries, shard_size)):
+        yield shard
+
+def file_has_all_words(path):
+    """True if every prefilter word appears somewhere in the file (any case).
+    One sequential pass per word over the memory-mapped file, no JSON parsing."""
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return all(re.search(re.escape(word), mm, re.IGNORECASE) for word in raw_filter_words)
+
+def search(path):
+    """
+    Search every email in the master JSON. Returns (file_count, matches);
+    file_count is None when a search term appears nowhere in the file.
+    """
+    # Rare terms are the common case - if one is missing from the whole file, stop here
+    if raw_filter_words and not file_has_all_words(path):
+        return None, []
     
-    for i, email in enumerate(matches, 1):
-        f.write(f"EMAIL {i}\n")
-        f.write("-" * 40 + "\n")
-        f.write(f"From:    {clean_text(email.get('from', 'N/A'))}\n")
-        f.write(f"To:      {clean_text(email.get('to', 'N/A'))}\n")
-        f.write(f"Date:    {email.get('date', 'N/A')}\n")
-        f.write(f"Subject: {clean_text(email.get('subject', 'N/A'))}\n")
-        
-        tags = email.get('tags', [])
-        if tags:
-            f.write(f"Tags:    {', '.join(tags)}\n")
-        
-        # Show attachment info if present
-        attachments = email.get('attachments', [])
-        if attachments:
-            f.write(f"Attachments: {len(attachments)} file(s)\n")
+    file_count = 0
+    matches = []
+    if workers <= 1:
+        for shard in iter_shards(path):
+            file_count += len(shard)
+            matches.extend(search_shard(shard))
+        return file_count, matches
+    
+    # Shards are searched in worker processes; only a couple per worker are in flight
+    # so a streamed master JSON never has to sit in memory whole. Results are
+    # collected in submission order so matches keep the file order.
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for shard in iter_shards(path):
+            file_count += len(shard)
+            pending.append(executor.submit(search_shard, shard))
+            if len(pending) >= 2 * workers:
+                matches.extend(pending.popleft().result())
+        while pending:
+            matches.extend(pending.popleft().result())
+    return file_count, matches
+
+def write_results(matches, output_file):
+    """Write the matching emails to the results text file."""
+    # Large buffer, and one write per email rather than one per line
+    with open(output_file, 'w', encoding='utf-8', buffering=1 << 20) as f:
+        f.write(f"Search Results for: {', '.join(search_terms)}\n")
+        f.write(f"Found: {len(matches)} matching emails\n")
+        f.write("=" * 80 + "\n\n")
         
-        f.write("\n" + "=" * 40 + " BODY " + "=" * 40 + "\n")
-        f.write(email.get('body', 'No body content'))
-        f.write("\n" + "=" * 80 + "\n\n")
+        for i, email in enumerate(matches, 1):
+            parts = [
+                f"EMAIL {i}\n",
+                "-" * 40 + "\n",
+                f"From:    {clean_text(email.get('from', 'N/A'))}\n",
+                f"To:      {clean_text(email.get('to', 'N/A'))}\n",
+                f"Date:    {email.get('date', 'N/A')}\n",
+                f"Subject: {clean_text(email.get('subject', 'N/A'))}\n",
+            ]
+            
+            tags = email.get('tags', [])
+            if tags:
+                parts.append(f"Tags:    {', '.join(tags)}\n")
+            
+            # Show attachment info if present
+            attachments = email.get('attachments', [])
+            if attachments:
+                parts.append(f"Attachments: {len(attachments)} file(s)\n")
+            
+            parts.append("\n" + "=" * 40 + " BODY " + "=" * 40 + "\n")
+            parts.append(email.get('body', 'No body content'))
+            parts.append("\n" + "=" * 80 + "\n\n")
+            f.write(''.join(parts))
+
+def main():
+    # Create search string for filename
+    search_string = "_".join(search_terms).replace(" ", "_")
+    output_file = f"search_return_{search_string}.txt"
+    
+    # Navigate through the nested structure (only matches are kept in memory)
+    try:
+        file_count, matches = search(json_file)
+    except Exception as e:
+        print(f"Error: {e}")
+        return
+    if file_count is None:
+        print("Search terms do not all appear in the file - nothing to parse")
+    else:
+        print(f"Searched {file_count} files")
+    
+    write_results(matches, output_file)
+    
+    print(f"\n✓ Found {len(matches)} matching emails")
+    print(f"✓ Results saved to: {output_file}")
 
-print(f"\n✓ Found {len(matches)} matching emails")
-print(f"✓ Results saved to: {output_file}")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -1,117 +1,284 @@
-import os, time, pandas as pd
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import Select
+import asyncio, os, re, pandas as pd
+import aiohttp
+import lxml.html
 import json
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from glob import glob
+from pandas.io.parsers import TextParser
+from urllib.parse import urljoin
+
+# orjson serializes several times faster than the json module - used when installed
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+# pyarrow gives read_csv a multithreaded parser - used when installed
+try:
+    import pyarrow
+    PYARROW_AVAILABLE = True
+except ImportError:
+    pyarrow = None
+    PYARROW_AVAILABLE = False
+
+LQA_URL = "https://allowances.state.gov/Web920/lqa_all.asp"
+MAX_CONCURRENT_REQUESTS = 10  # LQA pages being fetched at the same time
+REQUEST_TIMEOUT = 60  # seconds
+KEEPALIVE_TIMEOUT = 60  # seconds an idle connection stays open for the next request
+READ_WORKERS = 8  # scraped tables read at the same time
+
+_WHITESPACE_RE = re.compile(r'[\r\n]+|\s{2,}')
+
+def parse_lqa_form(html):
+    """Read the effective-date form off the LQA page: the URL it submits to,
+    its method (GET or POST), the other fields it sends and every date it offers"""
+    tree = lxml.html.fromstring(html)
+    form = tree.xpath("//select[@name='EffectiveDate']/ancestor::form")[0]
+    action = urljoin(LQA_URL, form.get('action') or '')
+    method = form.method  # upper-case, GET when the form doesn't say
+    fields = dict(form.form_values())
+    # form_values() leaves out submit buttons - send the one a browser would click
+    for button in form.xpath(".//input[@type='submit'][@name]")[:1]:
+        fields[button.get('name')] = button.get('value', '')
+    date_values = [opt.get('value') for opt in form.xpath(".//select[@name='EffectiveDate']/option")]
+    return action, method, fields, date_values
+
+def _carry_rowspans(row, spans):
+    """Append the cells that rowspans from earlier rows put at the end of row"""
+    while len(row) in spans:
+        rows_left, text = spans[len(row)]
+        if rows_left == 1:
+            del spans[len(row)]
+        else:
+            spans[len(row)] = (rows_left - 1, text)
+        row.append(text)
+
+def parse_first_table(html):
+    """First <table> on a page as a DataFrame, read the way pd.read_html would
+    (header rows, spans, thousands separators) but with lxml alone and
+    without building frames for every other table on the page. Columns
+    come back flat"""
+    tables = lxml.html.fromstring(html).xpath('//table')
+    if not tables:
+        raise ValueError("No tables found")
+    table = tables[0]
+    
+    rows = []
+    spans = {}  # column -> (rows still covered, text) of cells with a rowspan
+    trs = table.xpath('./thead/tr|./tbody/tr|./tr|./tfoot/tr')
+    header_rows = len(table.xpath('./thead/tr'))
+    if not header_rows:
+        # No <thead> - leading rows of only <th> cells are the header
+        while header_rows < len(trs) and all(cell.tag == 'th' for cell in trs[header_rows].xpath('./td|./th')):
+            header_rows += 1
+    
+    for tr in trs:
+        row = []
+        for cell in tr.xpath('./td|./th'):
+            _carry_rowspans(row, spans)
+            text = _WHITESPACE_RE.sub(' ', cell.text_content()).strip()
+            colspan = int(cell.get('colspan') or 1)
+            rowspan = int(cell.get('rowspan') or 1)
+            for _ in range(colspan):
+                if rowspan > 1:
+                    spans[len(row)] = (rowspan - 1, text)
+                row.append(text)
+        _carry_rowspans(row, spans)
+        rows.append(row)
+    if not rows:
+        raise ValueError("No rows found in table")
+    
+    # Pad ragged rows so every row has the full width
+    width = max(map(len, rows))
+    for row in rows:
+        row.extend([''] * (width - len(row)))
+    
+    if header_rows == 0:
+        header = None
+    elif header_rows == 1:
+        header = 0
+    else:
+        header = [i for i, row in enumerate(rows[:header_rows]) if any(row)]
+    with TextParser(rows, header=header, thousands=',') as parser:
+        df = parser.read()
+    
+    # Only several header rows give multi-index columns - flatten them to "top_sub"
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = ['_'.join(str(level) for level in col if pd.notna(level))
+                      for col in df.columns]
+    return df
+
+async def scrape_date(session, semaphore, action, method, fields, date_val):
+    """Submit the form for one effective date and save its table"""
+    csv_path = f"output/tables/{date_val}.csv"
+    payload = {**fields, 'EffectiveDate': date_val}
+    # Send it the way a browser would: GET forms put the fields in the query string
+    if method == 'GET':
+        request = session.get(action, params=payload)
+    else:
+        request = session.post(action, data=payload)
+    try:
+        async with semaphore, request as response:
+            response.raise_for_status()
+            html = await response.read()
+        
+        df = parse_first_table(html)
+        df.to_csv(csv_path, index=False)
+        print(f"Saved: {date_val} ({len(df)} rows)")
+    except Exception as e:
+        print(f"Failed {date_val}: {e}")
+
+async def scrape_all_dates():
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    # One session for every request: its pool keeps a kept-alive connection
+    # per concurrent request, so each request skips the TCP and TLS handshakes
+    connector = aiohttp.TCPConnector(limit=MAX_CONCURRENT_REQUESTS, keepalive_timeout=KEEPALIVE_TIMEOUT)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        async with session.get(LQA_URL) as response:
+            response.raise_for_status()
+            action, method, fields, date_values = parse_lqa_form(await response.read())
+
+        pending = []
+        for date_val in date_values:
+            # Check if CSV already exists
+            csv_path = f"output/tables/{date_val}.csv"
+            if os.path.exists(csv_path):
+                print(f"Skipping {date_val} - CSV already exists")
+                continue
+            pending.append(date_val)
+
+        # Plain form submissions - no browser needed, and many can be in flight at once
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        await asyncio.gather(*(scrape_date(session, semaphore, action, method, fields, date_val)
+                               for date_val in pending))
 
 def layer_0():
     os.makedirs("output/tables", exist_ok=True)
+    asyncio.run(scrape_all_dates())
 
-    driver = webdriver.Chrome()
-    driver.get("https://allowances.state.gov/Web920/lqa_all.asp")
 
-    # Get all date values
-    options = driver.find_elements(By.XPATH, "//select[@name='EffectiveDate']/option")
-    date_values = [opt.get_attribute('value') for opt in options]
+def clean_column(values):
+    """Strip thousands separators and &nbsp; from a column; values that are then
+    plain numbers become numbers, empty cells become None"""
+    text = (values.astype(str)
+            .str.replace(',', '', regex=False)
+            .str.replace('&nbsp;', '', regex=False)
+            .str.strip())
+    present = values.notna()
+    is_number = text.str.fullmatch(r'\d+\.?\d*|\.\d+') & present
+    is_int = is_number & ~text.str.contains('.', regex=False)
+    is_float = is_number & ~is_int
+    
+    cleaned = text.astype(object).where(present, None)
+    # (as object arrays, so pandas doesn't turn the ints into floats on the way in)
+    cleaned[is_int] = text[is_int].astype('int64').to_numpy(dtype=object)
+    cleaned[is_float] = text[is_float].astype(float).to_numpy(dtype=object)
+    # Same column types a DataFrame built from the values one by one would get
+    return cleaned.infer_objects()
 
-    for date_val in date_values:
-        # Check if CSV already exists
-        csv_path = f"output/tables/{date_val}.csv"
-        if os.path.exists(csv_path):
-            print(f"Skipping {date_val} - CSV already exists")
-            continue
-        
-        # Only navigate and scrape if file doesn't exist
-        driver.get("https://allowances.state.gov/Web920/lqa_all.asp")
-        Select(driver.find_element(By.NAME, 'EffectiveDate')).select_by_value(date_val)
-        driver.find_element(By.XPATH, "//input[@type='submit']").click()
-        time.sleep(1)
-        
-        try:
-            dfs = pd.read_html(driver.page_source)
-            if dfs:
-                df = dfs[0]
-                # Flatten multi-index columns if needed
-                if isinstance(df.columns, pd.MultiIndex):
-                    df.columns = [f"{col[0]}_{col[1]}" if pd.notna(col[1]) else col[0] 
-                                for col in df.columns.values]
-                df.to_csv(csv_path, index=False)
-                print(f"Saved: {date_val} ({len(df)} rows)")
-        except Exception as e:
-            print(f"Failed {date_val}: {e}")
+def read_table(csv_file):
+    """One scraped table, or None if it can't be read"""
+    try:
+        if PYARROW_AVAILABLE:
+            return pd.read_csv(csv_file, engine='pyarrow')
+        return pd.read_csv(csv_file)
+    except Exception as e:
+        print(f"Error reading {csv_file}: {e}")
+        return None
 
-    driver.quit()
+def load_all_tables():
+    """Read every scraped table once, keyed by its date, for the layers below to share"""
+    csv_files = glob("output/tables/*.csv")
+    # read_csv parses without holding the GIL, so the files are read side by side
+    with ThreadPoolExecutor(max_workers=READ_WORKERS) as executor:
+        frames = list(executor.map(read_table, csv_files))
+    
+    tables = {}
+    for csv_file, df in zip(csv_files, frames):
+        if df is not None:
+            # Extract date from filename
+            date_val = os.path.basename(csv_file).replace('.csv', '')
+            tables[date_val] = df
+    return tables
 
+def json_column(values):
+    """JSON values of a column: commas stripped, cells that are then plain
+    (possibly negative) numbers become int/float, empty cells become None"""
+    text = values.astype(str)
+    clean = text.str.replace(',', '', regex=False).str.strip()
+    # Looks numeric once one '.' and one '-' are dropped
+    numeric = (clean.str.replace('.', '', n=1, regex=False)
+                    .str.replace('-', '', n=1, regex=False)
+                    .str.isdigit())
+    has_point = clean.str.contains('.', regex=False)
+    is_int = numeric & ~has_point & clean.str.fullmatch(r'-?\d+')
+    is_float = numeric & has_point & clean.str.fullmatch(r'-?(?:\d+\.\d*|\.\d+)')
+    # Numeric-looking cells that still don't parse (like "12-") are kept as written
+    unparsed = numeric & ~is_int & ~is_float
+    
+    result = clean.astype(object)
+    result[unparsed] = text[unparsed].str.strip()
+    # (as object arrays, so pandas keeps them Python ints and floats)
+    result[is_int] = clean[is_int].map(int).to_numpy(dtype=object)
+    result[is_float] = clean[is_float].map(float).to_numpy(dtype=object)
+    return result.where(values.notna(), None)
+
+def is_germany(countries):
+    """Mask of the cells that are "GERMANY" in any case. Only 7-character
+    strings can be, so only those get upper-cased"""
+    if not (countries.dtype == object or pd.api.types.is_string_dtype(countries)):
+        return pd.Series(False, index=countries.index)
+    mask = countries.str.len().eq(7)
+    mask[mask] = countries[mask].str.upper().eq("GERMANY")
+    return mask
 
-def create_germany_csv():
+def create_germany_csv(tables):
     """Create a CSV with only Germany data across all dates"""
     
     os.makedirs("output/layer_2", exist_ok=True)
     
-    # Get all CSV files
-    csv_files = glob("output/tables/*.csv")
-    
-    if not csv_files:
+    if not tables:
         print("No CSV files found to process Germany data")
         return
     
-    # List to hold all Germany data rows
-    germany_data = []
+    # Germany rows of each file, the Date column in front
+    germany_frames = []
     
-    for csv_file in csv_files:
+    for date_val, df in tables.items():
         try:
-            # Extract date from filename
-            date_val = os.path.basename(csv_file).replace('.csv', '')
-            
-            # Read the CSV file
-            df = pd.read_csv(csv_file)
-            
             # Find Germany rows (case-insensitive)
             # Germany might appear as "GERMANY", "Germany", etc.
-            germany_mask = df.iloc[:, 0].astype(str).str.upper() == "GERMANY"
-            germany_rows = df[germany_mask]
+            germany_mask = is_germany(df.iloc[:, 0])
+            # Could be multiple posts in Germany; the country name column is dropped
+            germany_rows = df.loc[germany_mask, df.columns[1:]]
             
             if not germany_rows.empty:
-                # Process each Germany row (could be multiple posts in Germany)
-                for _, row in germany_rows.iterrows():
-                    # Create a row for the Germany CSV
-                    germany_row = {"Date": date_val}
-                    
-                    # Add all column values
-                    for col in df.columns:
-                        if col != df.columns[0]:  # Skip country name column
-                            value = row[col]
-                            # Clean numeric values
-                            if pd.notna(value):
-                                try:
-                                    clean_val = str(value).replace(',', '').replace('&nbsp;', '').strip()
-                                    if clean_val.replace('.', '', 1).isdigit():
-                                        germany_row[col] = float(clean_val) if '.' in clean_val else int(clean_val)
-                                    else:
-                                        germany_row[col] = clean_val
-                                except:
-                                    germany_row[col] = str(value).strip()
-                            else:
-                                germany_row[col] = None
-                    
-                    germany_data.append(germany_row)
-                
+                germany_rows.insert(0, "Date", date_val)
+                germany_frames.append(germany_rows)
                 print(f"Found {len(germany_rows)} Germany rows in {date_val}")
             else:
                 print(f"No Germany data found in {date_val}")
                 
         except Exception as e:
-            print(f"Error processing Germany data from {csv_file}: {e}")
+            print(f"Error processing Germany data from {date_val}: {e}")
     
-    if germany_data:
-        # Create DataFrame
-        germany_df = pd.DataFrame(germany_data)
+    if germany_frames:
+        # Columns in the order the files first introduce them
+        columns = list(dict.fromkeys(col for frame in germany_frames for col in frame.columns))
         
-        # Sort by date (newest first)
-        if 'Date' in germany_df.columns:
-            germany_df = germany_df.sort_values('Date', ascending=False)
+        # Sort by date (newest first) - each frame holds one date, so order
+        # the frames rather than sorting the concatenated rows
+        germany_frames.sort(key=lambda frame: frame["Date"].iat[0], reverse=True)
+        germany_df = pd.concat(germany_frames, ignore_index=True)
+        if list(germany_df.columns) != columns:
+            germany_df = germany_df[columns]
+        
+        # Clean numeric values, one whole column at a time
+        for col in germany_df.columns.drop("Date"):
+            germany_df[col] = clean_column(germany_df[col])
         
         # Save to CSV
         output_file = "output/layer_2/germany_data.csv"
@@ -133,7 +300,7 @@ def create_germany_csv():
     else:
         print("No Germany data found in any CSV files")
 
-def layer_1():
+def layer_1(tables):
     """Alternative: Include post names in the structure"""
     
     os.makedirs("output/layer_2", exist_ok=True)
@@ -141,12 +308,9 @@ def layer_1():
     json_filename = f"output/layer_2/state_dep_tables_with_posts_to_{today}.json"
     
     data_structure = {}
-    csv_files = glob("output/tables/*.csv")
     
-    for csv_file in csv_files:
+    for date_key, df in tables.items():
         try:
-            date_key = os.path.basename(csv_file).replace('.csv', '')
-            df = pd.read_csv(csv_file)
             data_structure[date_key] = {}
             
             # Find the Post Name column (usually second column)
@@ -159,75 +323,78 @@ def layer_1():
             if post_column is None and len(df.columns) > 1:
                 post_column = df.columns[1]  # Assume second column is post name
             
-            for _, row in df.iterrows():
-                country = row.iloc[0] if len(row) > 0 else "Unknown"
-                
-                if pd.isna(country) or str(country).strip() == "":
-                    continue
-                
-                # Get post name if available
-                post = row[post_column] if post_column else "Unknown"
-                
-                # Create unique key: Country + Post
-                country_post_key = f"{country} - {post}" if post != "Unknown" else country
-                
-                data_structure[date_key][country_post_key] = {}
-                
-                # Add all columns except country and post
-                columns_to_include = [col for col in df.columns if col not in [df.columns[0], post_column]]
-                
-                for column in columns_to_include:
-                    value = row[column]
-                    if pd.isna(value):
-                        data_structure[date_key][country_post_key][column] = None
-                    else:
-                        # Clean numeric values
-                        try:
-                            clean_val = str(value).replace(',', '').strip()
-                            if clean_val.replace('.', '', 1).replace('-', '', 1).isdigit():
-                                data_structure[date_key][country_post_key][column] = float(clean_val) if '.' in clean_val else int(clean_val)
-                            else:
-                                data_structure[date_key][country_post_key][column] = clean_val
-                        except:
-                            data_structure[date_key][country_post_key][column] = str(value).strip()
+            # Skip rows without a country
+            countries = df.iloc[:, 0]
+            keep = countries.notna() & (countries.astype(str).str.strip() != "")
+            df = df[keep]
+            
+            # Create unique key: Country + Post
+            countries = df.iloc[:, 0]
+            posts = df[post_column] if post_column else ["Unknown"] * len(df)
+            keys = [f"{country} - {post}" if post != "Unknown" else country
+                    for country, post in zip(countries, posts)]
             
-            print(f"Processed with posts: {csv_file}")
+            # Add all columns except country and post, numeric values cleaned
+            columns_to_include = [col for col in df.columns if col not in [df.columns[0], post_column]]
+            cleaned = pd.DataFrame({col: json_column(df[col]) for col in columns_to_include})
+            # (a frame with no columns gives no records, but each row still gets its entry)
+            records = cleaned.to_dict(orient='records') if columns_to_include else [{} for _ in keys]
+            
+            # (a repeated key keeps its first position and its last row, as assigning would)
+            data_structure[date_key] = dict(zip(keys, records))
+            
+            print(f"Processed with posts: {date_key}")
             
         except Exception as e:
-            print(f"Error processing {csv_file}: {e}")
+            print(f"Error processing {date_key}: {e}")
     
     # Save JSON
-    with open(json_filename, 'w', encoding='utf-8') as f:
-        json.dump(data_structure, f, indent=2, ensure_ascii=False)
+    if ORJSON_AVAILABLE:
+        with open(json_filename, 'wb') as f:
+            f.write(orjson.dumps(data_structure, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        with open(json_filename, 'w', encoding='utf-8') as f:
+            json.dump(data_structure, f, indent=2, ensure_ascii=False)
     
     print(f"\nAlternative JSON saved: {json_filename}")
 
-def create_consolidated_csv():
+def create_consolidated_csv(tables):
     """Bonus: Create a consolidated CSV with all dates"""
     
-    all_data = []
-    csv_files = glob("output/tables/*.csv")
+    if not tables:
+        return
     
-    for csv_file in csv_files:
-        try:
-            date_val = os.path.basename(csv_file).replace('.csv', '')
-            df = pd.read_csv(csv_file)
-            df['Date'] = date_val  # Add date column
-            all_data.append(df)
-        except Exception as e:
-            print(f"Error reading {csv_file}: {e}")
+    # The columns (and column types) concatenating every table would give:
+    # all columns in order of appearance, and integer columns that are
+    # float or missing (NaN) in some table written as floats
+    columns = list(dict.fromkeys(col for df in tables.values() for col in [*df.columns, 'Date']))
+    float_columns = []
+    for col in columns:
+        kinds = {df[col].dtype.kind if col in df.columns else 'f' for df in tables.values()}
+        if 'f' in kinds and kinds <= {'i', 'u', 'f'}:
+            float_columns.append(col)
+    
+    # Write one table at a time rather than building the whole frame
+    output_file = "output/layer_2/consolidated_all_dates.csv"
+    total_rows = 0
+    with open(output_file, 'w', newline='', encoding='utf-8') as f:
+        for i, (date_val, df) in enumerate(tables.items()):
+            # Add date column (to a copy - the tables are shared with the other layers)
+            df = df.assign(Date=date_val).reindex(columns=columns)
+            df = df.astype({col: float for col in float_columns if df[col].dtype.kind in 'iu'})
+            df.to_csv(f, index=False, header=(i == 0))
+            total_rows += len(df)
     
-    if all_data:
-        consolidated_df = pd.concat(all_data, ignore_index=True)
-        consolidated_df.to_csv("output/layer_2/consolidated_all_dates.csv", index=False)
-        print(f"Consolidated CSV saved: output/layer_2/consolidated_all_dates.csv")
-        print(f"Total rows: {len(consolidated_df)}")
+    print(f"Consolidated CSV saved: {output_file}")
+    print(f"Total rows: {total_rows}")
 
 if __name__ == "__main__":
     layer_0()
+    # Read the scraped tables once for everything below
+    tables = load_all_tables()
     # Create the main JSON structure
-    layer_1()
+    layer_1(tables)
     # Create Germany-specific CSV
-    create_germany_csv()
+    create_germany_csv(tables)
     # Create consolidated CSV (optional)
-    create_consolidated_csv()
\ No newline at end of file
+    create_consolidated_csv(tables)
\ No newline at end of file
@@ -1,16 +1,16 @@
 import pandas as pd
 
 df = pd.read_csv("output/germany_data.csv")
-df['year'] = df['Date'].astype(str).str[:4]
+year = df['Date'].astype(str).str[:4].rename('year')
 
 # Convert numeric columns
-for col in df.columns:
-    if col not in ['date', 'year', 'german post']:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
+numeric_cols = df.columns.difference(['date', 'german post'], sort=False)
+df[numeric_cols] = df[numeric_cols].apply(pd.to_numeric, errors='coerce')
 
-# Group by year, average numeric columns
-summary = df.groupby('year').mean(numeric_only=True).round(2)
-summary['count'] = df.groupby('year').size()
+# Group by year once, average numeric columns
+grouped = df.groupby(year)
+summary = grouped.mean(numeric_only=True).round(2)
+summary['count'] = grouped.size()
 
 summary.to_csv("output/germany_summary_yearly.csv")
 print("Saved to output/germany_summary_yearly.csv")